@@ -0,0 +1,206 @@
+"""
+Caché de respuestas - Endpoints de lectura que solo cambian con un scraping
+
+Cada respuesta se guarda ya serializada bajo una clave que incluye la versión
+de los ámbitos de datos de los que depende (tabla version_datos). Cuando un
+scraper o el job de alertas sube la versión, las claves cambian y lo anterior
+deja de usarse: no hace falta borrar nada, el LRU/TTL lo va desalojando.
+
+    - backend local: LRU con TTL en memoria del proceso
+    - backend compartido (opcional, CACHE_REDIS_URL): Redis, para varios workers
+    - ETag por clave: con If-None-Match igual se responde 304 sin consultar nada
+"""
+import sys
+sys.path.append('.')
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+from api.database import execute_query_async
+from config.settings import (
+    CACHE_HABILITADO, CACHE_MAX_ENTRADAS, CACHE_TTL_SEG, CACHE_VERSION_SEG, CACHE_REDIS_URL
+)
+from services.version_datos import SQL_VERSIONES, SQL_INCREMENTAR
+
+# redis es opcional: sin él (o sin CACHE_REDIS_URL) la caché es local al proceso
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class CacheLocal:
+    """LRU con TTL en memoria (thread-safe)"""
+
+    def __init__(self, max_entradas=CACHE_MAX_ENTRADAS, ttl=CACHE_TTL_SEG):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos = OrderedDict()   # clave -> (vence, valor)
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            if entrada[0] <= time.monotonic():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return entrada[1]
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + self.ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+
+class CacheRedis:
+    """Backend compartido entre procesos; la expiración la maneja Redis"""
+
+    def __init__(self, url=CACHE_REDIS_URL, ttl=CACHE_TTL_SEG, prefijo="wongprime:cache:"):
+        self.cliente = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefijo = prefijo
+
+    def obtener(self, clave):
+        try:
+            return self.cliente.get(self.prefijo + clave)
+        except redis.RedisError as e:
+            logger.warning(f"⚠️ Redis no disponible para la caché: {e}")
+            return None
+
+    def guardar(self, clave, valor):
+        try:
+            self.cliente.set(self.prefijo + clave, valor, ex=int(self.ttl))
+        except redis.RedisError as e:
+            logger.warning(f"⚠️ Redis no disponible para la caché: {e}")
+
+    def limpiar(self):
+        for clave in self.cliente.scan_iter(self.prefijo + "*"):
+            self.cliente.delete(clave)
+
+    def __len__(self):
+        return sum(1 for _ in self.cliente.scan_iter(self.prefijo + "*"))
+
+
+class VersionesDatos:
+    """Versiones de version_datos leídas como máximo cada `revision_seg` segundos"""
+
+    def __init__(self, revision_seg=CACHE_VERSION_SEG):
+        self.revision_seg = revision_seg
+        self.versiones = {}
+        self._leido = None
+        self._lock = asyncio.Lock()
+
+    async def actuales(self):
+        if self._leido is None or time.monotonic() - self._leido >= self.revision_seg:
+            async with self._lock:
+                if self._leido is None or time.monotonic() - self._leido >= self.revision_seg:
+                    filas = await execute_query_async(SQL_VERSIONES, fetchall=True)
+                    self.versiones = {fila['ambito']: fila['version'] for fila in filas}
+                    self._leido = time.monotonic()
+        return self.versiones
+
+    async def incrementar(self, ambito):
+        """Subir la versión tras una escritura de la propia API (se nota de inmediato)"""
+        await execute_query_async(SQL_INCREMENTAR, [ambito])
+        self._leido = None
+
+
+class CacheRespuestas:
+    """Caché de respuestas JSON con ETag y métricas de aciertos y latencia"""
+
+    def __init__(self, backend=None, versiones=None, habilitado=CACHE_HABILITADO):
+        if backend is None:
+            backend = CacheRedis() if CACHE_REDIS_URL and redis else CacheLocal()
+        self.backend = backend
+        self.versiones = versiones or VersionesDatos()
+        self.habilitado = habilitado
+        self.stats = {'aciertos': 0, 'fallos': 0, 'no_modificados': 0,
+                      'ms_aciertos': 0.0, 'ms_fallos': 0.0}
+
+    async def responder(self, request, clave, ambitos, producir, modelo=None):
+        """
+        Respuesta JSON para `clave`, producida con `await producir()` si no está cacheada
+
+        `ambitos` son los ámbitos de version_datos de los que depende el resultado;
+        `modelo` (p. ej. List[Marca]) valida y filtra los datos como el response_model.
+        """
+        inicio = time.perf_counter()
+        if not self.habilitado:
+            return Response(self._serializar(await producir(), modelo), media_type="application/json")
+
+        versiones = await self.versiones.actuales()
+        clave = clave + "|" + ",".join(f"{ambito}={versiones.get(ambito, 0)}" for ambito in ambitos)
+        etag = '"' + hashlib.sha1(clave.encode()).hexdigest()[:20] + '"'
+        cabeceras = {"ETag": etag, "Cache-Control": "no-cache"}
+
+        if etag in request.headers.get("if-none-match", ""):
+            self.stats['no_modificados'] += 1
+            return Response(status_code=304, headers=cabeceras)
+
+        cuerpo = self.backend.obtener(clave)
+        if cuerpo is not None:
+            self.stats['aciertos'] += 1
+            self.stats['ms_aciertos'] += (time.perf_counter() - inicio) * 1000
+            return Response(cuerpo, media_type="application/json", headers={**cabeceras, "X-Cache": "HIT"})
+
+        cuerpo = self._serializar(await producir(), modelo)
+        self.backend.guardar(clave, cuerpo)
+        self.stats['fallos'] += 1
+        self.stats['ms_fallos'] += (time.perf_counter() - inicio) * 1000
+        return Response(cuerpo, media_type="application/json", headers={**cabeceras, "X-Cache": "MISS"})
+
+    @staticmethod
+    def _serializar(datos, modelo):
+        if modelo is not None:
+            adaptador = TypeAdapter(modelo)
+            datos = adaptador.dump_python(adaptador.validate_python(datos), mode="json")
+        return json.dumps(jsonable_encoder(datos), ensure_ascii=False).encode("utf-8")
+
+    def metricas(self):
+        aciertos, fallos = self.stats['aciertos'], self.stats['fallos']
+        consultas = aciertos + fallos + self.stats['no_modificados']
+        return {
+            'backend': type(self.backend).__name__,
+            'entradas': len(self.backend),
+            'aciertos': aciertos,
+            'fallos': fallos,
+            'no_modificados': self.stats['no_modificados'],
+            'tasa_aciertos': round((aciertos + self.stats['no_modificados']) / consultas, 4) if consultas else 0.0,
+            'ms_promedio_acierto': round(self.stats['ms_aciertos'] / aciertos, 3) if aciertos else None,
+            'ms_promedio_fallo': round(self.stats['ms_fallos'] / fallos, 3) if fallos else None,
+            'versiones': self.versiones.versiones
+        }
+
+
+_cache = None
+
+
+def obtener_cache():
+    """Caché de respuestas del proceso de la API"""
+    global _cache
+    if _cache is None:
+        _cache = CacheRespuestas()
+    return _cache
@@ -1,14 +1,41 @@
 """
 Utilidades para la base de datos
+
+Las rutas async usan execute_query_async: la consulta corre en un executor
+acotado al tamaño del pool (el event loop no se bloquea), con timeout por
+consulta y cancelación en el servidor (SQLCancel) si el cliente se desconecta.
 """
+import asyncio
+import contextvars
+import functools
+import math
+import threading
 import pyodbc
 import sys
 sys.path.append('.')
-from config.settings import DATABASE_URL
+from concurrent.futures import ThreadPoolExecutor
+from starlette.requests import Request
+from config.settings import DATABASE_URL, DB_POOL_MAX, DB_QUERY_TIMEOUT, DB_DESCONEXION_SEG
+from api.pool import obtener_pool
+
+# Un hilo por conexión posible: más hilos solo esperarían en el pool
+_executor = ThreadPoolExecutor(max_workers=DB_POOL_MAX, thread_name_prefix="db")
+
+# Request en curso (lo fija RequestActualMiddleware) para detectar desconexiones
+request_actual = contextvars.ContextVar("request_actual", default=None)
+
+
+class ConsultaTimeout(TimeoutError):
+    """La consulta superó su timeout y se canceló"""
+
+
+class ClienteDesconectado(Exception):
+    """El cliente cerró la conexión; la consulta en curso se canceló"""
 
 
 def get_db_connection():
-    """Obtener conexión a la base de datos"""
+    """Obtener una conexión propia (fuera del pool) a la base de datos, p. ej. para
+    lecturas largas como la construcción del índice de búsqueda"""
     try:
         conn = pyodbc.connect(DATABASE_URL)
         return conn
@@ -16,34 +43,147 @@ def get_db_connection():
         raise Exception(f"Error conectando a la base de datos: {e}")
 
 
+def _filas(cursor):
+    columns = [column[0] for column in cursor.description] if cursor.description else []
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def _leer_resultado(cursor, fetchone, fetchall, fetchsets=False, fetchtuplas=False):
+    if fetchtuplas:
+        # Sin un dict por fila: (columnas, filas como tuplas) para api.respuestas
+        columnas = [column[0] for column in cursor.description]
+        return columnas, [tuple(row) for row in cursor.fetchall()]
+    if fetchsets:
+        # Lote de varios SELECT: una lista de filas por cada conjunto de resultados
+        conjuntos = []
+        while True:
+            if cursor.description:
+                conjuntos.append(_filas(cursor))
+            if not cursor.nextset():
+                return conjuntos
+    if fetchone:
+        return cursor.fetchone()
+    elif fetchall:
+        return _filas(cursor)
+    else:
+        # Las conexiones del pool están en autocommit
+        return cursor.rowcount
+
+
 def execute_query(query, params=None, fetchone=False, fetchall=False):
-    """Ejecutar query y retornar resultados"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
+    """Ejecutar query con una conexión del pool y retornar resultados (bloqueante)"""
+    with obtener_pool().conexion() as conn:
+        cursor = conn.cursor()
+        try:
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            return _leer_resultado(cursor, fetchone, fetchall)
+        finally:
+            cursor.close()
+
+
+class _Ejecucion:
+    """Estado compartido entre el hilo que ejecuta y la corrutina que espera"""
+
+    def __init__(self):
+        self.cursor = None
+        self.cancelada = False
+        self.lock = threading.Lock()
+
+    def cancelar(self):
+        with self.lock:
+            self.cancelada = True
+            if self.cursor is not None:
+                try:
+                    self.cursor.cancel()
+                except Exception:
+                    pass
+
+
+def _ejecutar(ejecucion, query, params, fetchone, fetchall, fetchsets, fetchtuplas, timeout):
+    with obtener_pool().conexion() as conn:
+        # Timeout del driver (SQL_ATTR_QUERY_TIMEOUT, segundos enteros) para los cursores nuevos
+        conn.timeout = math.ceil(timeout) if timeout else 0
+        cursor = conn.cursor()
+        try:
+            with ejecucion.lock:
+                if ejecucion.cancelada:
+                    return None
+                ejecucion.cursor = cursor
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            return _leer_resultado(cursor, fetchone, fetchall, fetchsets, fetchtuplas)
+        finally:
+            with ejecucion.lock:
+                ejecucion.cursor = None
+            cursor.close()
+            conn.timeout = 0
+
+
+async def _esperar_desconexion(request):
+    while not await request.is_disconnected():
+        await asyncio.sleep(DB_DESCONEXION_SEG)
+
+
+async def execute_query_async(query, params=None, fetchone=False, fetchall=False, fetchsets=False,
+                              fetchtuplas=False, timeout=DB_QUERY_TIMEOUT):
+    """
+    Ejecutar query sin bloquear el event loop
+
+    Con fetchsets=True la query puede ser un lote de varios SELECT (un solo viaje
+    a SQL Server) y se retorna una lista de filas por cada conjunto de resultados.
+    Con fetchtuplas=True se retorna (columnas, filas) con cada fila como tupla.
+
+    Lanza ConsultaTimeout si supera `timeout` segundos y ClienteDesconectado si
+    el cliente del request en curso se va; en ambos casos la consulta se cancela
+    en SQL Server y la conexión vuelve al pool.
+    """
+    ejecucion = _Ejecucion()
+    loop = asyncio.get_running_loop()
+    futuro = loop.run_in_executor(
+        _executor,
+        functools.partial(_ejecutar, ejecucion, query, params, fetchone, fetchall, fetchsets, fetchtuplas,
+                          timeout)
+    )
+    request = request_actual.get()
+    vigilante = asyncio.ensure_future(_esperar_desconexion(request)) if request is not None else None
+
     try:
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
-            
-        if fetchone:
-            result = cursor.fetchone()
-            return result
-        elif fetchall:
-            columns = [column[0] for column in cursor.description] if cursor.description else []
-            rows = cursor.fetchall()
-            return [dict(zip(columns, row)) for row in rows]
-        else:
-            conn.commit()
-            return cursor.rowcount
-            
-    except Exception as e:
-        conn.rollback()
-        raise e
+        esperando = {futuro} if vigilante is None else {futuro, vigilante}
+        listos, _ = await asyncio.wait(esperando, timeout=timeout or None,
+                                       return_when=asyncio.FIRST_COMPLETED)
+        if futuro in listos:
+            return futuro.result()
+        if vigilante is not None and vigilante in listos:
+            raise ClienteDesconectado("El cliente se desconectó durante la consulta")
+        raise ConsultaTimeout(f"La consulta superó {timeout}s")
     finally:
-        cursor.close()
-        conn.close()
+        if vigilante is not None:
+            vigilante.cancel()
+        if not futuro.done():
+            ejecucion.cancelar()
+            # El error de la consulta cancelada ya no le interesa a nadie
+            futuro.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+
+class RequestActualMiddleware:
+    """Middleware ASGI que deja el request en request_actual para execute_query_async"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = request_actual.set(Request(scope, receive))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_actual.reset(token)
 
 
 def row_to_dict(row, cursor):
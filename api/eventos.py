@@ -0,0 +1,214 @@
+"""
+Broker de eventos en vivo - Cambios de precio y scrapings terminados para SSE
+
+Un solo lector por proceso consulta eventos_precio (id > último visto) cada
+EVENTOS_REVISION_SEG mientras haya suscriptores, y reparte cada evento a las
+colas en memoria de los clientes cuyo filtro lo acepta (productos y/o
+categorías; los de scraping van a todos). Un cliente conectado sin eventos es
+una corrutina esperando su cola: no hace consultas ni ocupa hilos.
+
+Los IDENTITY se asignan al insertar pero la fila se ve recién con el commit,
+así que un lote puede aparecer después de que ya se leyó un id mayor. Por eso
+el lector también revisa los ids detrás del último visto hasta que tienen más
+de EVENTOS_GRACIA_SEG, y reparte los que llegaron tarde (sin repetir ninguno).
+"""
+import sys
+sys.path.append('.')
+
+import asyncio
+import json
+import logging
+from collections import deque
+
+from api.database import execute_query_async, request_actual
+from config.settings import EVENTOS_REVISION_SEG, EVENTOS_COLA_MAX, EVENTOS_GRACIA_SEG
+from services.eventos import TIPO_SCRAPING
+
+logger = logging.getLogger(__name__)
+
+SQL_ULTIMO = "SELECT ISNULL(MAX(id), 0) FROM eventos_precio"
+
+# Eventos por lectura; si vienen completos se vuelve a leer sin esperar
+LECTURA_MAX = 500
+
+SQL_EVENTOS = """
+    SELECT {top} e.id, e.tipo, e.producto_id, p.nombre as producto, c.nombre as categoria,
+           t.nombre as tienda, e.precio, e.precio_anterior, e.cantidad, e.fecha
+    FROM eventos_precio e
+    LEFT JOIN productos p ON e.producto_id = p.id
+    LEFT JOIN categorias c ON e.categoria_id = c.id
+    LEFT JOIN tiendas t ON e.tienda_id = t.id
+    WHERE {filtro}
+    ORDER BY e.id
+"""
+
+SQL_NUEVOS = SQL_EVENTOS.format(top=f"TOP ({LECTURA_MAX})", filtro="e.id > ?")
+
+SQL_TARDIOS = SQL_EVENTOS.format(top="", filtro="e.id IN (SELECT CAST(value AS BIGINT) FROM OPENJSON(?))")
+
+# Ids ya confirmados detrás del último visto, con su antigüedad según la BD
+SQL_VENTANA = """
+    SELECT id, DATEDIFF(millisecond, fecha, GETDATE()) as edad_ms
+    FROM eventos_precio
+    WHERE id > ? AND id <= ?
+    ORDER BY id
+"""
+
+# Eventos que se guardan para reenviar a un cliente que reconecta con Last-Event-ID
+RECIENTES_MAX = 1000
+
+
+def compactar(fila):
+    """Evento para el cliente, sin los campos vacíos"""
+    evento = {clave: valor for clave, valor in fila.items() if valor is not None}
+    for campo in ('precio', 'precio_anterior'):
+        if campo in evento:
+            evento[campo] = float(evento[campo])
+    if 'fecha' in evento:
+        evento['fecha'] = evento['fecha'].isoformat()
+    return evento
+
+
+class Suscripcion:
+    """Cola de un cliente con su filtro (conjuntos vacíos = todo)"""
+
+    def __init__(self, productos=(), categorias=(), cola_max=EVENTOS_COLA_MAX):
+        self.productos = set(productos)
+        self.categorias = {categoria.lower() for categoria in categorias}
+        self.cola = asyncio.Queue(maxsize=cola_max)
+        self.desfasada = False
+
+    def acepta(self, evento):
+        if evento['tipo'] == TIPO_SCRAPING:
+            return True
+        if not self.productos and not self.categorias:
+            return True
+        return (evento.get('producto_id') in self.productos
+                or (evento.get('categoria') or '').lower() in self.categorias)
+
+    def entregar(self, evento):
+        """Encolar el evento; False si el cliente quedó desfasado"""
+        try:
+            self.cola.put_nowait(evento)
+            return True
+        except asyncio.QueueFull:
+            # Cliente lento: se le pide que recargue en vez de acumularle eventos
+            self.desfasada = True
+            return False
+
+
+class BrokerEventos:
+    """Lector de eventos_precio compartido por todas las suscripciones del proceso"""
+
+    def __init__(self, revision_seg=EVENTOS_REVISION_SEG, gracia_seg=EVENTOS_GRACIA_SEG):
+        self.revision_seg = revision_seg
+        self.gracia_ms = gracia_seg * 1000
+        self.suscripciones = set()
+        self.recientes = deque(maxlen=RECIENTES_MAX)
+        self.ultimo_id = None
+        # Hasta `estable` ya no puede aparecer nada nuevo; los ids repartidos por encima
+        # quedan en `vistos` para no repetirlos al revisar la ventana
+        self.estable = None
+        self.vistos = set()
+        self._tarea = None
+        self.stats = {'lecturas': 0, 'eventos': 0, 'entregas': 0, 'descartados': 0, 'tardios': 0}
+
+    def suscribir(self, productos=(), categorias=(), desde_id=None):
+        """Nueva suscripción; con `desde_id` recibe primero los eventos recientes posteriores"""
+        suscripcion = Suscripcion(productos, categorias)
+        if desde_id is not None:
+            for evento in self.recientes:
+                if evento['id'] > desde_id and suscripcion.acepta(evento):
+                    suscripcion.entregar(evento)
+        self.suscripciones.add(suscripcion)
+        if self._tarea is None or self._tarea.done():
+            self._tarea = asyncio.create_task(self._leer())
+        return suscripcion
+
+    def desuscribir(self, suscripcion):
+        self.suscripciones.discard(suscripcion)
+
+    def publicar(self, evento):
+        """Repartir un evento a las suscripciones que lo aceptan"""
+        self.recientes.append(evento)
+        self.stats['eventos'] += 1
+        for suscripcion in list(self.suscripciones):
+            if suscripcion.acepta(evento):
+                if suscripcion.entregar(evento):
+                    self.stats['entregas'] += 1
+                else:
+                    self.stats['descartados'] += 1
+
+    def _repartir(self, filas):
+        """Publicar las filas que todavía no se repartieron"""
+        for fila in filas:
+            if fila['id'] not in self.vistos:
+                self.vistos.add(fila['id'])
+                self.publicar(compactar(fila))
+
+    async def _revisar_ventana(self):
+        """Repartir los eventos que confirmaron tarde y avanzar `estable`"""
+        ventana = await execute_query_async(SQL_VENTANA, [self.estable, self.ultimo_id], fetchall=True)
+        tardios = [fila['id'] for fila in ventana if fila['id'] not in self.vistos]
+        if tardios:
+            self.stats['tardios'] += len(tardios)
+            self._repartir(await execute_query_async(SQL_TARDIOS, [json.dumps(tardios)], fetchall=True))
+
+        # Se avanza solo sobre ids ya viejos: lo que falte antes de ellos no va a aparecer
+        for fila in ventana:
+            if fila['edad_ms'] < self.gracia_ms:
+                break
+            self.estable = fila['id']
+        self.vistos = {id_ for id_ in self.vistos if id_ > self.estable}
+
+    async def _leer(self):
+        # La tarea nace dentro de un request: que sus consultas no dependan de ese cliente
+        request_actual.set(None)
+        while self.suscripciones:
+            try:
+                if self.ultimo_id is None:
+                    self.ultimo_id = self.estable = (await execute_query_async(SQL_ULTIMO, fetchone=True))[0]
+                filas = await execute_query_async(SQL_NUEVOS, [self.ultimo_id], fetchall=True)
+                self.stats['lecturas'] += 1
+                self._repartir(filas)
+                if filas:
+                    self.ultimo_id = filas[-1]['id']
+                if len(filas) == LECTURA_MAX:
+                    continue
+                if self.estable < self.ultimo_id:
+                    await self._revisar_ventana()
+            except Exception as e:
+                logger.warning(f"⚠️ Error leyendo eventos de precio: {e}")
+            await asyncio.sleep(self.revision_seg)
+        # Sin suscriptores se deja de leer; el próximo arranca desde los eventos nuevos
+        self.ultimo_id = self.estable = None
+        self.vistos.clear()
+
+    async def cerrar(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._tarea = None
+
+    def metricas(self):
+        return {
+            'suscriptores': len(self.suscripciones),
+            'leyendo': self._tarea is not None and not self._tarea.done(),
+            'ultimo_id': self.ultimo_id,
+            'estable': self.estable,
+            **self.stats
+        }
+
+
+_broker = None
+
+
+def obtener_broker():
+    """Broker de eventos del proceso de la API"""
+    global _broker
+    if _broker is None:
+        _broker = BrokerEventos()
+    return _broker
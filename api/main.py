@@ -4,11 +4,41 @@ WongPrime API - FastAPI Application
 import sys
 sys.path.append('.')
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
-from api.routes import productos, alertas, estadisticas
-from config.settings import API_HOST, API_PORT, API_RELOAD
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+from api.routes import productos, alertas, estadisticas, exportar, eventos
+from api.database import RequestActualMiddleware, ConsultaTimeout, ClienteDesconectado
+from api.pool import obtener_pool, PoolAgotado
+from api.eventos import obtener_broker
+from config.settings import API_HOST, API_PORT, API_RELOAD, API_GZIP_MIN_BYTES
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Abrir las conexiones mínimas del pool al iniciar y cerrarlas al apagar"""
+    obtener_pool().calentar()
+    yield
+    await obtener_broker().cerrar()
+    obtener_pool().cerrar()
+
+
+class GZipSinEventos(GZipMiddleware):
+    """GZip salvo en /eventos: el stream SSE debe salir evento por evento, y las
+    versiones de Starlette que no excluyen text/event-stream lo comprimen y
+    acumulan en el buffer de gzip"""
+
+    def __init__(self, app, excluir=("/eventos",), **kwargs):
+        super().__init__(app, **kwargs)
+        self.excluir = excluir
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(self.excluir):
+            return await self.app(scope, receive, send)
+        await super().__call__(scope, receive, send)
+
 
 # Crear aplicación FastAPI
 app = FastAPI(
@@ -16,7 +46,8 @@ app = FastAPI(
     description="API REST para comparación de precios multi-tienda",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Configurar CORS
@@ -26,12 +57,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # paginación por cursor de /productos/
 )
 
+# Comprimir listados y exportaciones grandes si el cliente envía Accept-Encoding: gzip
+app.add_middleware(GZipSinEventos, minimum_size=API_GZIP_MIN_BYTES)
+
+# Request en curso para cancelar consultas si el cliente se desconecta
+app.add_middleware(RequestActualMiddleware)
+
+
+@app.exception_handler(ConsultaTimeout)
+async def consulta_timeout_handler(request: Request, exc: ConsultaTimeout):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+
+@app.exception_handler(PoolAgotado)
+async def pool_agotado_handler(request: Request, exc: PoolAgotado):
+    # El pool no entregó una conexión a tiempo
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+
+@app.exception_handler(ClienteDesconectado)
+async def cliente_desconectado_handler(request: Request, exc: ClienteDesconectado):
+    # Nadie va a leer la respuesta (499: convención de nginx para "cliente cerró la conexión")
+    return Response(status_code=499)
+
+
 # Incluir routers
 app.include_router(productos.router)
 app.include_router(alertas.router)
 app.include_router(estadisticas.router)
+app.include_router(exportar.router)
+app.include_router(eventos.router)
 
 
 @app.get("/", response_class=HTMLResponse)
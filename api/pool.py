@@ -0,0 +1,257 @@
+"""
+Pool de conexiones - Conexiones pyodbc reutilizables entre requests de la API
+
+Antes cada execute_query abría y cerraba su propia conexión (login, handshake y
+contexto de sesión en cada consulta). El pool mantiene entre DB_POOL_MIN y
+DB_POOL_MAX conexiones abiertas, las verifica antes de entregarlas si estuvieron
+inactivas un rato y cierra las que sobran después de DB_POOL_INACTIVIDAD.
+"""
+import sys
+sys.path.append('.')
+
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import pyodbc
+
+from config.settings import (
+    DATABASE_URL, DB_POOL_MIN, DB_POOL_MAX, DB_POOL_ESPERA,
+    DB_POOL_INACTIVIDAD, DB_POOL_VERIFICAR_SEG
+)
+
+logger = logging.getLogger(__name__)
+
+
+def crear_conexion():
+    """Conexión nueva en autocommit: cada sentencia confirma sola y la conexión
+    vuelve al pool sin transacciones abiertas (sin ROLLBACK en cada devolución)"""
+    try:
+        return pyodbc.connect(DATABASE_URL, autocommit=True)
+    except Exception as e:
+        raise Exception(f"Error conectando a la base de datos: {e}")
+
+
+class PoolAgotado(TimeoutError):
+    """No se liberó ninguna conexión dentro de DB_POOL_ESPERA"""
+
+
+class ConexionPooled:
+    """Conexión arrendada junto con sus marcas de tiempo"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.creada = time.monotonic()
+        self.devuelta = self.creada
+        self.usos = 0
+
+    def esta_sana(self):
+        """Verificar que la conexión sigue respondiendo"""
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def cerrar(self):
+        """Cerrar ignorando errores de una conexión ya caída"""
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+
+class ConexionPool:
+    """
+    Pool de conexiones a SQL Server con tamaño mínimo y máximo
+
+    Las conexiones libres se entregan en orden LIFO (la más reciente primero)
+    para que las que sobran queden quietas al fondo y se cierren por inactividad.
+    """
+
+    def __init__(self, minimo=DB_POOL_MIN, maximo=DB_POOL_MAX, espera=DB_POOL_ESPERA,
+                 inactividad=DB_POOL_INACTIVIDAD, verificar_seg=DB_POOL_VERIFICAR_SEG,
+                 factory=crear_conexion):
+        self.maximo = max(1, maximo)
+        self.minimo = min(max(0, minimo), self.maximo)
+        self.espera = espera
+        self.inactividad = inactividad
+        self.verificar_seg = verificar_seg
+        self.factory = factory
+        self._libres = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._creadas = 0
+        self._en_uso = 0
+        self._cerrado = False
+        self.stats = {
+            'arriendos': 0, 'creadas': 0, 'descartadas': 0, 'cerradas_inactivas': 0,
+            'esperas': 0, 'timeouts': 0, 'espera_total_ms': 0.0, 'espera_max_ms': 0.0
+        }
+
+    def _crear(self):
+        """Crear una conexión reservando su lugar en el pool (None si está lleno)"""
+        with self._lock:
+            if self._creadas >= self.maximo:
+                return None
+            self._creadas += 1
+
+        try:
+            conexion = ConexionPooled(self.factory())
+        except Exception:
+            with self._lock:
+                self._creadas -= 1
+            raise
+
+        self.stats['creadas'] += 1
+        logger.debug(f"🔌 Conexión creada en pool ({self._creadas}/{self.maximo})")
+        return conexion
+
+    def _descartar(self, conexion):
+        """Cerrar una conexión y liberar su lugar"""
+        conexion.cerrar()
+        with self._lock:
+            self._creadas -= 1
+
+    def calentar(self):
+        """Abrir las conexiones mínimas por adelantado"""
+        for _ in range(self.minimo - self._creadas):
+            try:
+                conexion = self._crear()
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo precalentar el pool de conexiones: {e}")
+                break
+            if conexion is None:
+                break
+            self._libres.put(conexion)
+
+    def _tomar_libre(self, timeout=None):
+        """Conexión libre lista para usar, o None si no hay ninguna"""
+        while True:
+            try:
+                conexion = self._libres.get(timeout=timeout) if timeout else self._libres.get_nowait()
+            except queue.Empty:
+                return None
+            timeout = None
+
+            inactiva = time.monotonic() - conexion.devuelta
+            if inactiva >= self.inactividad and self._creadas > self.minimo:
+                self.stats['cerradas_inactivas'] += 1
+                self._descartar(conexion)
+                continue
+            if inactiva >= self.verificar_seg and not conexion.esta_sana():
+                logger.warning("⚠️ Conexión sin respuesta descartada del pool")
+                self.stats['descartadas'] += 1
+                self._descartar(conexion)
+                continue
+            return conexion
+
+    def adquirir(self):
+        """Arrendar una conexión: libre, nueva si hay cupo, o esperar a que se devuelva otra"""
+        if self._cerrado:
+            raise RuntimeError("El pool de conexiones está cerrado")
+
+        inicio = time.monotonic()
+        conexion = self._tomar_libre() or self._crear()
+        if conexion is None:
+            self.stats['esperas'] += 1
+            limite = inicio + self.espera
+            while conexion is None:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    self.stats['timeouts'] += 1
+                    raise PoolAgotado(f"No hay conexiones libres tras {self.espera}s")
+                # Intervalos cortos: un descarte libera cupo sin devolver conexión
+                conexion = self._tomar_libre(timeout=min(1, restante)) or self._crear()
+
+            espera_ms = (time.monotonic() - inicio) * 1000
+            self.stats['espera_total_ms'] += espera_ms
+            self.stats['espera_max_ms'] = max(self.stats['espera_max_ms'], espera_ms)
+
+        with self._lock:
+            self._en_uso += 1
+        self.stats['arriendos'] += 1
+        conexion.usos += 1
+        return conexion
+
+    def liberar(self, conexion, fallida=False):
+        """Devolver una conexión; si la consulta falló y la conexión no responde, se descarta"""
+        with self._lock:
+            self._en_uso -= 1
+        if self._cerrado or (fallida and not conexion.esta_sana()):
+            if not self._cerrado:
+                self.stats['descartadas'] += 1
+            self._descartar(conexion)
+            return
+        conexion.devuelta = time.monotonic()
+        self._libres.put(conexion)
+        self._podar()
+
+    def _podar(self):
+        """Cerrar las conexiones del fondo que superaron la inactividad (sobre el mínimo)"""
+        ahora = time.monotonic()
+        viejas = []
+        with self._libres.mutex:
+            libres = self._libres.queue  # lista de la LifoQueue: el fondo es el índice 0
+            while (libres and self._creadas - len(viejas) > self.minimo
+                   and ahora - libres[0].devuelta >= self.inactividad):
+                viejas.append(libres.pop(0))
+        for conexion in viejas:
+            self.stats['cerradas_inactivas'] += 1
+            self._descartar(conexion)
+
+    @contextmanager
+    def conexion(self):
+        """Conexión pyodbc arrendada durante el bloque `with`"""
+        conexion = self.adquirir()
+        fallida = False
+        try:
+            yield conexion.conn
+        except Exception:
+            fallida = True
+            raise
+        finally:
+            self.liberar(conexion, fallida)
+
+    def cerrar(self):
+        """Cerrar todas las conexiones libres (las arrendadas se cierran al devolverse)"""
+        self._cerrado = True
+        while True:
+            try:
+                self._descartar(self._libres.get_nowait())
+            except queue.Empty:
+                break
+        logger.info(f"🧹 Pool de conexiones cerrado: {self.stats}")
+
+    def metricas(self):
+        """Estado actual y contadores de arriendo"""
+        esperas = self.stats['esperas']
+        return {
+            'minimo': self.minimo,
+            'maximo': self.maximo,
+            'abiertas': self._creadas,
+            'en_uso': self._en_uso,
+            'libres': self._libres.qsize(),
+            **self.stats,
+            'espera_promedio_ms': round(self.stats['espera_total_ms'] / esperas, 2) if esperas else 0.0,
+            'espera_total_ms': round(self.stats['espera_total_ms'], 2),
+            'espera_max_ms': round(self.stats['espera_max_ms'], 2)
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def obtener_pool():
+    """Pool del proceso de la API"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConexionPool()
+    return _pool
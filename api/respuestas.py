@@ -0,0 +1,75 @@
+"""
+Respuestas rápidas - Listados grandes sin validar fila por fila
+
+Con API_SERIALIZACION_RAPIDA las rutas de listados (/productos/, /historico)
+devuelven RespuestaRapida en vez de dejar que FastAPI valide cada fila contra
+el response_model y la pase por jsonable_encoder. Las filas llegan como tuplas
+(execute_query_async(fetchtuplas=True)) o dicts, se ajustan a los campos del
+modelo (mismo JSON que la ruta normal, con los defaults) y se serializan con
+orjson. El response_model sigue en el decorador, así que OpenAPI no cambia.
+"""
+import sys
+sys.path.append('.')
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+
+from fastapi.responses import Response
+
+# orjson es opcional: sin él se usa json de la librería estándar
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _por_defecto(valor):
+    """Tipos de pyodbc que orjson (Decimal) o json (fechas, Decimal) no serializan solos"""
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+def serializar(datos):
+    """JSON en bytes de listas/dicts con tipos de la base de datos"""
+    if orjson is not None:
+        return orjson.dumps(datos, default=_por_defecto)
+    return json.dumps(datos, default=_por_defecto, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class RespuestaRapida(Response):
+    media_type = "application/json"
+
+    def render(self, content):
+        return serializar(content)
+
+
+@lru_cache(maxsize=64)
+def _plan(modelo, columnas):
+    """[(campo, posición en la fila o None, default)] de `modelo` para esas columnas"""
+    plan = []
+    for campo, info in modelo.model_fields.items():
+        posicion = columnas.index(campo) if campo in columnas else None
+        plan.append((campo, posicion, None if info.is_required() else info.default))
+    return plan
+
+
+def filas_modelo(modelo, filas, columnas=None):
+    """
+    Ajustar filas a los campos de `modelo` sin validarlas
+
+    Con `columnas` las filas son tuplas en ese orden; si no, dicts. Las columnas
+    que el modelo no tiene se descartan y los campos que faltan toman su default.
+    """
+    if columnas is not None:
+        plan = _plan(modelo, tuple(columnas))
+        return [
+            {campo: fila[posicion] if posicion is not None else default for campo, posicion, default in plan}
+            for fila in filas
+        ]
+    plan = _plan(modelo, ())
+    return [{campo: fila.get(campo, default) for campo, _, default in plan} for fila in filas]
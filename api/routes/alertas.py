@@ -4,7 +4,9 @@ Rutas de Alertas
 from fastapi import APIRouter, HTTPException
 from typing import List
 from api.schemas.schemas import AlertaCreate, AlertaResponse, MessageResponse
-from api.database import execute_query
+from api.database import execute_query_async
+from api.cache import obtener_cache
+from services.version_datos import AMBITO_ALERTAS
 
 router = APIRouter(prefix="/alertas", tags=["Alertas"])
 
@@ -22,7 +24,7 @@ async def get_alertas(email: str = None):
         
     query += " ORDER BY fecha_creacion DESC"
     
-    alertas = execute_query(query, params if params else None, fetchall=True)
+    alertas = await execute_query_async(query, params if params else None, fetchall=True)
     return alertas
 
 
@@ -32,7 +34,7 @@ async def create_alerta(alerta: AlertaCreate):
     
     # Verificar que el producto existe
     producto_query = "SELECT id FROM productos WHERE id = ?"
-    producto = execute_query(producto_query, [alerta.producto_id], fetchone=True)
+    producto = await execute_query_async(producto_query, [alerta.producto_id], fetchone=True)
     
     if not producto:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
@@ -44,21 +46,15 @@ async def create_alerta(alerta: AlertaCreate):
         VALUES (?, ?, ?)
     """
     
-    from api.database import get_db_connection, row_to_dict
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute(query, [alerta.producto_id, alerta.email, alerta.precio_objetivo])
-        nueva_alerta = row_to_dict(cursor.fetchone(), cursor)
-        conn.commit()
-        return nueva_alerta
+        # OUTPUT INSERTED.* devuelve la fila creada (las conexiones del pool están en autocommit)
+        nueva_alerta = await execute_query_async(
+            query, [alerta.producto_id, alerta.email, alerta.precio_objetivo], fetchall=True
+        )
+        await obtener_cache().versiones.incrementar(AMBITO_ALERTAS)
+        return nueva_alerta[0]
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @router.delete("/{alerta_id}", response_model=MessageResponse)
@@ -66,11 +62,12 @@ async def delete_alerta(alerta_id: int):
     """Eliminar una alerta"""
     
     query = "DELETE FROM alertas WHERE id = ?"
-    rows_affected = execute_query(query, [alerta_id])
+    rows_affected = await execute_query_async(query, [alerta_id])
     
     if rows_affected == 0:
         raise HTTPException(status_code=404, detail="Alerta no encontrada")
-        
+    
+    await obtener_cache().versiones.incrementar(AMBITO_ALERTAS)
     return MessageResponse(message="Alerta eliminada correctamente")
 
 
@@ -79,9 +76,10 @@ async def desactivar_alerta(alerta_id: int):
     """Desactivar una alerta"""
     
     query = "UPDATE alertas SET activa = 0 WHERE id = ?"
-    rows_affected = execute_query(query, [alerta_id])
+    rows_affected = await execute_query_async(query, [alerta_id])
     
     if rows_affected == 0:
         raise HTTPException(status_code=404, detail="Alerta no encontrada")
-        
+    
+    await obtener_cache().versiones.incrementar(AMBITO_ALERTAS)
     return MessageResponse(message="Alerta desactivada correctamente")
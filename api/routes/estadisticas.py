@@ -1,49 +1,59 @@
 """
 Rutas de Estadísticas y Datos Generales
 """
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from typing import List
 from api.schemas.schemas import EstadisticasResponse
-from api.database import execute_query
+from api.database import execute_query_async
+from api.pool import obtener_pool
+from api.cache import obtener_cache
+from services.version_datos import AMBITO_CATALOGO, AMBITO_ALERTAS
 
 router = APIRouter(prefix="/estadisticas", tags=["Estadísticas"])
 
 
 @router.get("/", response_model=EstadisticasResponse)
-async def get_estadisticas():
+async def get_estadisticas(request: Request):
     """Obtener estadísticas generales del sistema"""
+    return await obtener_cache().responder(
+        request, "estadisticas", [AMBITO_CATALOGO, AMBITO_ALERTAS], calcular_estadisticas, EstadisticasResponse
+    )
+
+
+async def calcular_estadisticas():
+    """Totales y distribución de productos por tienda y categoría"""
     
     # Total productos
-    total_productos = execute_query("SELECT COUNT(*) FROM productos")[0]
+    total_productos = (await execute_query_async("SELECT COUNT(*) FROM productos", fetchone=True))[0]
     
     # Total tiendas
-    total_tiendas = execute_query("SELECT COUNT(*) FROM tiendas WHERE activo = 1")[0]
+    total_tiendas = (await execute_query_async("SELECT COUNT(*) FROM tiendas WHERE activo = 1", fetchone=True))[0]
     
     # Total categorías
-    total_categorias = execute_query("SELECT COUNT(*) FROM categorias WHERE activo = 1")[0]
+    total_categorias = (await execute_query_async("SELECT COUNT(*) FROM categorias WHERE activo = 1", fetchone=True))[0]
     
     # Total alertas activas
-    total_alertas = execute_query("SELECT COUNT(*) FROM alertas WHERE activa = 1")[0]
+    total_alertas = (await execute_query_async("SELECT COUNT(*) FROM alertas WHERE activa = 1", fetchone=True))[0]
     
     # Último scraping
-    ultimo_scraping_row = execute_query(
+    ultimo_scraping_row = await execute_query_async(
         "SELECT MAX(fecha) FROM scraping_logs", 
         fetchone=True
     )
     ultimo_scraping = ultimo_scraping_row[0] if ultimo_scraping_row and ultimo_scraping_row[0] else None
     
     # Productos por tienda
-    productos_tienda = execute_query("""
-        SELECT t.nombre, COUNT(DISTINCT pr.producto_id) as total
+    productos_tienda = await execute_query_async("""
+        SELECT t.nombre, COUNT(pr.producto_id) as total
         FROM tiendas t
-        LEFT JOIN precios pr ON t.id = pr.tienda_id
+        LEFT JOIN precios_actuales pr ON t.id = pr.tienda_id
         GROUP BY t.nombre
     """, fetchall=True)
     
     productos_por_tienda = {item['nombre']: item['total'] for item in productos_tienda}
     
     # Productos por categoría
-    productos_cat = execute_query("""
+    productos_cat = await execute_query_async("""
         SELECT c.nombre, COUNT(p.id) as total
         FROM categorias c
         LEFT JOIN productos p ON c.id = p.categoria_id
@@ -64,18 +74,39 @@ async def get_estadisticas():
 
 
 @router.get("/categorias")
-async def get_categorias():
+async def get_categorias(request: Request):
     """Obtener lista de categorías"""
-    return execute_query("SELECT * FROM categorias WHERE activo = 1", fetchall=True)
+    return await obtener_cache().responder(
+        request, "categorias", [AMBITO_CATALOGO],
+        lambda: execute_query_async("SELECT * FROM categorias WHERE activo = 1", fetchall=True)
+    )
 
 
 @router.get("/marcas")
-async def get_marcas():
+async def get_marcas(request: Request):
     """Obtener lista de marcas"""
-    return execute_query("SELECT * FROM marcas ORDER BY nombre", fetchall=True)
+    return await obtener_cache().responder(
+        request, "marcas", [AMBITO_CATALOGO],
+        lambda: execute_query_async("SELECT * FROM marcas ORDER BY nombre", fetchall=True)
+    )
 
 
 @router.get("/tiendas")
-async def get_tiendas():
+async def get_tiendas(request: Request):
     """Obtener lista de tiendas"""
-    return execute_query("SELECT * FROM tiendas WHERE activo = 1", fetchall=True)
+    return await obtener_cache().responder(
+        request, "tiendas", [AMBITO_CATALOGO],
+        lambda: execute_query_async("SELECT * FROM tiendas WHERE activo = 1", fetchall=True)
+    )
+
+
+@router.get("/conexiones")
+async def get_conexiones():
+    """Métricas del pool de conexiones de la API (arriendos, esperas, descartes)"""
+    return obtener_pool().metricas()
+
+
+@router.get("/cache")
+async def get_cache():
+    """Métricas de la caché de respuestas (tasa de aciertos, latencia, versiones de datos)"""
+    return obtener_cache().metricas()
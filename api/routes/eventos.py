@@ -0,0 +1,72 @@
+"""
+Rutas de Eventos - Canal en vivo de precios (Server-Sent Events)
+"""
+import asyncio
+import json
+from typing import List, Optional
+
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import StreamingResponse
+
+from api.eventos import obtener_broker
+from config.settings import EVENTOS_PING_SEG
+
+router = APIRouter(prefix="/eventos", tags=["Eventos"])
+
+# Milisegundos que espera EventSource antes de reconectar
+REINTENTO_MS = 5000
+
+
+def mensaje_sse(evento):
+    return f"id: {evento['id']}\nevent: {evento['tipo']}\ndata: {json.dumps(evento, ensure_ascii=False)}\n\n"
+
+
+async def flujo_eventos(broker, suscripcion, ping_seg=EVENTOS_PING_SEG):
+    """Mensajes SSE de una suscripción hasta que el cliente se desconecta"""
+    try:
+        yield f"retry: {REINTENTO_MS}\n\n"
+        while True:
+            if suscripcion.desfasada:
+                # Se perdieron eventos: el cliente recarga lo que muestra
+                while not suscripcion.cola.empty():
+                    suscripcion.cola.get_nowait()
+                suscripcion.desfasada = False
+                yield "event: resync\ndata: {}\n\n"
+            try:
+                evento = await asyncio.wait_for(suscripcion.cola.get(), timeout=ping_seg)
+            except asyncio.TimeoutError:
+                # Comentario SSE: mantiene viva la conexión a través de proxies
+                yield ": ping\n\n"
+                continue
+            yield mensaje_sse(evento)
+    finally:
+        broker.desuscribir(suscripcion)
+
+
+@router.get("/")
+async def get_eventos(
+    producto: List[int] = Query([]),
+    categoria: List[str] = Query([]),
+    last_event_id: Optional[int] = Header(None)
+):
+    """
+    Suscribirse a cambios de precio y scrapings terminados (text/event-stream)
+
+    Filtrar con `producto` y/o `categoria` (se pueden repetir); sin filtros llegan
+    todos los cambios. Eventos: `precio`, `scraping` y `resync` (recargar, se
+    perdieron eventos). Al reconectar, EventSource envía Last-Event-ID y se
+    reenvían los eventos recientes que faltan.
+    """
+    broker = obtener_broker()
+    suscripcion = broker.suscribir(producto, categoria, desde_id=last_event_id)
+    return StreamingResponse(
+        flujo_eventos(broker, suscripcion),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/metricas")
+async def get_metricas_eventos():
+    """Suscriptores conectados y eventos leídos/entregados por el broker"""
+    return obtener_broker().metricas()
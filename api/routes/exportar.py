@@ -0,0 +1,173 @@
+"""
+Rutas de Exportación - Histórico y precios actuales en streaming (NDJSON o CSV)
+
+Las filas se leen por bloques de EXPORT_LOTE_FILAS con fetchmany sobre un cursor
+forward-only (SQL Server las va entregando a medida que se piden) y cada bloque
+se escribe apenas se lee: la memoria no depende del total de filas y el cliente
+recibe las cabeceras y el primer bloque sin esperar al resto.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional
+
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from api.database import get_db_connection
+from config.settings import EXPORT_LOTE_FILAS
+
+router = APIRouter(prefix="/exportar", tags=["Exportar"])
+
+FORMATOS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _valor(valor):
+    """Tipos de pyodbc que json no serializa solo"""
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    return valor
+
+
+def _bloque_ndjson(columnas, filas):
+    return "".join(
+        json.dumps({col: _valor(v) for col, v in zip(columnas, fila)}, ensure_ascii=False) + "\n"
+        for fila in filas
+    ).encode("utf-8")
+
+
+def _bloque_csv(filas):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(
+        [_valor(v) for v in fila] for fila in filas
+    )
+    return buffer.getvalue().encode("utf-8")
+
+
+async def _filas_en_bloques(query, params, formato):
+    """Leer el resultado por bloques con una conexión propia y devolverlo ya codificado"""
+    # Conexión fuera del pool: una exportación puede tardar minutos y no debe
+    # quitarle conexiones a las consultas cortas de la API
+    conn = await run_in_threadpool(get_db_connection)
+    cursor = conn.cursor()
+    try:
+        await run_in_threadpool(cursor.execute, query, *params)
+        columnas = [columna[0] for columna in cursor.description]
+        if formato == "csv":
+            yield _bloque_csv([columnas])
+        while True:
+            filas = await run_in_threadpool(cursor.fetchmany, EXPORT_LOTE_FILAS)
+            if not filas:
+                break
+            yield _bloque_csv(filas) if formato == "csv" else _bloque_ndjson(columnas, filas)
+    finally:
+        # También si el cliente corta la descarga: se cancela lo que quede en el servidor
+        try:
+            cursor.cancel()
+        except Exception:
+            pass
+        cursor.close()
+        conn.close()
+
+
+def _exportar(query, params, formato, nombre):
+    return StreamingResponse(
+        _filas_en_bloques(query, params, formato),
+        media_type=FORMATOS[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}.{formato}"'}
+    )
+
+
+@router.get("/historico")
+async def exportar_historico(
+    formato: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    tienda: Optional[str] = None,
+    categoria: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None
+):
+    """
+    Exportar los intervalos de precio (uno por cambio de precio, con fecha y fecha_hasta)
+
+    `desde`/`hasta` devuelven los intervalos que se cruzan con ese rango. Sin ORDER BY
+    para no esperar a ordenar todo antes del primer byte.
+    """
+    query = """
+        SELECT pr.producto_id, p.nombre as producto, m.nombre as marca, c.nombre as categoria,
+               t.nombre as tienda, pr.precio, pr.precio_anterior, pr.descuento, pr.stock,
+               pr.fecha, pr.fecha_hasta
+        FROM vw_precios_historial pr
+        INNER JOIN productos p ON pr.producto_id = p.id
+        INNER JOIN tiendas t ON pr.tienda_id = t.id
+        LEFT JOIN marcas m ON p.marca_id = m.id
+        LEFT JOIN categorias c ON p.categoria_id = c.id
+        WHERE 1=1
+    """
+    params = []
+
+    if tienda:
+        query += " AND t.nombre = ?"
+        params.append(tienda)
+
+    if categoria:
+        query += " AND c.nombre = ?"
+        params.append(categoria)
+
+    if desde:
+        query += " AND pr.fecha_hasta >= ?"
+        params.append(desde)
+
+    if hasta:
+        query += " AND pr.fecha <= ?"
+        params.append(hasta)
+
+    return _exportar(query, params, formato, "historico_precios")
+
+
+@router.get("/precios-actuales")
+async def exportar_precios_actuales(
+    formato: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    tienda: Optional[str] = None,
+    categoria: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None
+):
+    """Exportar el precio vigente de cada producto por tienda (`desde`/`hasta` filtran por última actualización)"""
+    query = """
+        SELECT pr.producto_id, p.nombre as producto, m.nombre as marca, c.nombre as categoria,
+               t.nombre as tienda, pr.precio, pr.precio_anterior, pr.descuento, pr.stock,
+               pr.rating, pr.url, pr.vigente_desde, pr.fecha_actualizacion
+        FROM precios_actuales pr
+        INNER JOIN productos p ON pr.producto_id = p.id
+        INNER JOIN tiendas t ON pr.tienda_id = t.id
+        LEFT JOIN marcas m ON p.marca_id = m.id
+        LEFT JOIN categorias c ON p.categoria_id = c.id
+        WHERE 1=1
+    """
+    params = []
+
+    if tienda:
+        query += " AND t.nombre = ?"
+        params.append(tienda)
+
+    if categoria:
+        query += " AND c.nombre = ?"
+        params.append(categoria)
+
+    if desde:
+        query += " AND pr.fecha_actualizacion >= ?"
+        params.append(desde)
+
+    if hasta:
+        query += " AND pr.fecha_actualizacion <= ?"
+        params.append(hasta)
+
+    return _exportar(query, params, formato, "precios_actuales")
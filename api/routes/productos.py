@@ -1,27 +1,67 @@
 """
 Rutas de Productos
 """
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
 from api.schemas.schemas import (
     ProductoResponse, ProductoConPrecios, PrecioResponse,
-    HistoricoPrecio, ComparacionTiendas
+    HistoricoPrecio, ComparacionTiendas, ResultadoBusqueda, ProductoDetalle,
+    LoteProductos
 )
-from api.database import execute_query
-from datetime import datetime
+from api.database import execute_query_async
+from api.search import obtener_buscador
+from api.cache import obtener_cache
+from api.respuestas import RespuestaRapida, filas_modelo
+from services.version_datos import AMBITO_CATALOGO
+from config.settings import (
+    PRECIOS_RETENCION_DIAS, PRODUCTOS_PAGINA_MAX, PRODUCTOS_LOTE_MAX, API_SERIALIZACION_RAPIDA
+)
+from datetime import datetime, timedelta
+import base64
+import json
 
 router = APIRouter(prefix="/productos", tags=["Productos"])
 
+# Con la compactación el histórico cubre años (resumido por semana/mes)
+HISTORICO_MAX_DIAS = 3650
+
+
+def codificar_cursor(**posicion):
+    """Cursor opaco para X-Next-Cursor"""
+    return base64.urlsafe_b64encode(json.dumps(posicion).encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor):
+    """Posición guardada en un cursor ({'id': ...} o {'skip': ...})"""
+    try:
+        posicion = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if isinstance(posicion, dict) and all(isinstance(v, int) and v >= 0 for v in posicion.values()):
+            return posicion
+    except ValueError:
+        pass
+    raise HTTPException(status_code=400, detail="Cursor inválido")
+
 
 @router.get("/", response_model=List[ProductoResponse])
 async def get_productos(
+    response: Response,
     skip: int = Query(0, ge=0),
-    limit: int = Query(50, le=100),
+    limit: int = Query(50, ge=1, le=PRODUCTOS_PAGINA_MAX),
+    cursor: Optional[str] = None,
     categoria: Optional[str] = None,
     marca: Optional[str] = None,
     buscar: Optional[str] = None
 ):
-    """Obtener lista de productos con filtros opcionales"""
+    """
+    Obtener lista de productos con filtros opcionales
+    
+    Paginación: si la página viene completa, X-Next-Cursor trae el cursor de la
+    siguiente. Con cursor se sigue desde el último id visto (p.id < ?), así el
+    costo no crece con la profundidad y los productos nuevos no corren las
+    páginas. `skip` se mantiene por compatibilidad.
+    """
+    posicion = decodificar_cursor(cursor) if cursor else {}
     
     query = """
         SELECT p.id, p.nombre, p.descripcion, p.url_imagen, 
@@ -34,6 +74,25 @@ async def get_productos(
     """
     params = []
     
+    if buscar:
+        # El texto se resuelve con el índice de búsqueda (sin LIKE '%...%' sobre productos);
+        # el orden es por relevancia, así que el cursor guarda la posición
+        desde = posicion.get('skip', skip)
+        indice = await run_in_threadpool(obtener_buscador().obtener)
+        resultados = indice.buscar(
+            buscar, limit=limit, skip=desde, marca=marca, categoria=categoria
+        )
+        if not resultados:
+            return []
+        if len(resultados) == limit:
+            response.headers["X-Next-Cursor"] = codificar_cursor(skip=desde + limit)
+        ids = [resultado['id'] for resultado in resultados]
+        query += f" AND p.id IN ({', '.join('?' * len(ids))})"
+        productos = await execute_query_async(query, ids, fetchall=True)
+        # Mantener el orden por relevancia
+        orden = {id_: i for i, id_ in enumerate(ids)}
+        return sorted(productos, key=lambda producto: orden[producto['id']])
+    
     if categoria:
         query += " AND c.nombre LIKE ?"
         params.append(f"%{categoria}%")
@@ -41,58 +100,172 @@ async def get_productos(
     if marca:
         query += " AND m.nombre LIKE ?"
         params.append(f"%{marca}%")
-        
-    if buscar:
-        query += " AND p.nombre LIKE ?"
-        params.append(f"%{buscar}%")
-        
-    query += " ORDER BY p.id DESC OFFSET ? ROWS FETCH NEXT ? ROWS ONLY"
-    params.extend([skip, limit])
     
-    productos = execute_query(query, params, fetchall=True)
+    if 'id' in posicion:
+        # Keyset: seek sobre la PK en vez de saltar filas con OFFSET
+        query += " AND p.id < ? ORDER BY p.id DESC OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY"
+        params.extend([posicion['id'], limit])
+    else:
+        query += " ORDER BY p.id DESC OFFSET ? ROWS FETCH NEXT ? ROWS ONLY"
+        params.extend([posicion.get('skip', skip), limit])
+    
+    if API_SERIALIZACION_RAPIDA:
+        columnas, filas = await execute_query_async(query, params, fetchtuplas=True)
+        productos = filas_modelo(ProductoResponse, filas, columnas)
+        cabeceras = {}
+        if len(productos) == limit:
+            cabeceras["X-Next-Cursor"] = codificar_cursor(id=productos[-1]['id'])
+        return RespuestaRapida(productos, headers=cabeceras)
+    
+    productos = await execute_query_async(query, params, fetchall=True)
+    if len(productos) == limit:
+        response.headers["X-Next-Cursor"] = codificar_cursor(id=productos[-1]['id'])
     return productos
 
 
-@router.get("/{producto_id}", response_model=ProductoConPrecios)
-async def get_producto(producto_id: int):
-    """Obtener detalle de un producto con precios actuales"""
+@router.get("/buscar", response_model=List[ResultadoBusqueda])
+async def buscar_productos(
+    q: str = Query(..., min_length=1, max_length=200),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    categoria: Optional[str] = None,
+    marca: Optional[str] = None
+):
+    """
+    Buscar productos por nombre, marca o categoría, ordenados por relevancia
     
-    # Obtener producto
-    query = """
-        SELECT p.id, p.nombre, p.descripcion, p.url_imagen,
-               m.nombre as marca, c.nombre as categoria,
-               p.fecha_creacion, p.ultima_actualizacion
-        FROM productos p
-        LEFT JOIN marcas m ON p.marca_id = m.id
-        LEFT JOIN categorias c ON p.categoria_id = c.id
-        WHERE p.id = ?
+    Ignora tildes y mayúsculas y acepta prefijos ("parac" encuentra "Paracetamol").
+    Debe declararse antes de /{producto_id}.
+    """
+    # obtener() puede construir el índice o consultar su versión: fuera del event loop
+    indice = await run_in_threadpool(obtener_buscador().obtener)
+    return indice.buscar(
+        q, limit=limit, skip=skip, marca=marca, categoria=categoria
+    )
+
+
+# Los ids del lote van como un arreglo JSON en un solo parámetro (SQL Server admite
+# 2100 por sentencia): OPENJSON los carga a #ids con su posición para el ORDER BY
+QUERY_IDS = """
+    IF OBJECT_ID('tempdb..#ids') IS NOT NULL DROP TABLE #ids;
+    CREATE TABLE #ids (producto_id INT NOT NULL PRIMARY KEY, orden INT NOT NULL);
+    INSERT INTO #ids (producto_id, orden)
+    SELECT CAST(value AS INT), CAST([key] AS INT) FROM OPENJSON(?)
+"""
+
+QUERY_LOTE_PRODUCTOS = """
+    SELECT p.id, p.nombre, p.descripcion, p.url_imagen,
+           m.nombre as marca, c.nombre as categoria,
+           p.fecha_creacion, p.ultima_actualizacion
+    FROM #ids i
+    INNER JOIN productos p ON p.id = i.producto_id
+    LEFT JOIN marcas m ON p.marca_id = m.id
+    LEFT JOIN categorias c ON p.categoria_id = c.id
+    ORDER BY i.orden
+"""
+
+QUERY_LOTE_PRECIOS = """
+    SELECT pr.producto_id, pr.precio_id as id, pr.precio, t.nombre as tienda, pr.stock,
+           pr.rating, pr.url, pr.fecha_actualizacion as fecha
+    FROM #ids i
+    INNER JOIN precios_actuales pr ON pr.producto_id = i.producto_id
+    INNER JOIN tiendas t ON pr.tienda_id = t.id
+"""
+
+QUERY_LOTE_COMPARACION = """
+    SELECT v.*
+    FROM #ids i
+    INNER JOIN vw_comparacion_tiendas v ON v.producto_id = i.producto_id
+    ORDER BY i.orden
+"""
+
+
+def consulta_ids(ids):
+    """(query, params) que deja los ids (sin repetir, en orden) en la tabla temporal #ids"""
+    if len(ids) > PRODUCTOS_LOTE_MAX:
+        raise HTTPException(status_code=400, detail=f"Máximo {PRODUCTOS_LOTE_MAX} ids por lote")
+    return QUERY_IDS, [json.dumps(list(dict.fromkeys(ids)))]
+
+
+@router.post("/lote", response_model=List[ProductoConPrecios])
+async def get_productos_lote(lote_ids: LoteProductos):
     """
+    Detalle con precios actuales de varios productos en un request
     
-    producto = execute_query(query, [producto_id], fetchone=True)
+    Devuelve los productos en el orden pedido; los ids que no existen se omiten.
+    """
+    query, params = lote(consulta_ids(lote_ids.ids), (QUERY_LOTE_PRODUCTOS, []),
+                         (QUERY_LOTE_PRECIOS, []), ("DROP TABLE #ids", []))
+    productos, precios = await execute_query_async(query, params, fetchsets=True)
     
-    if not producto:
-        raise HTTPException(status_code=404, detail="Producto no encontrado")
+    por_producto = {}
+    for precio in precios:
+        por_producto.setdefault(precio.pop('producto_id'), []).append(precio)
+    for producto in productos:
+        producto['precios_actuales'] = por_producto.get(producto['id'], [])
         
-    # Obtener precios actuales
-    query_precios = """
-        SELECT pr.id, pr.precio, t.nombre as tienda, pr.stock, pr.rating, pr.url, pr.fecha
-        FROM precios pr
-        INNER JOIN tiendas t ON pr.tienda_id = t.id
-        WHERE pr.producto_id = ?
-        AND pr.fecha = (SELECT MAX(fecha) FROM precios WHERE producto_id = ? AND tienda_id = pr.tienda_id)
-    """
+    return productos
+
+
+@router.post("/lote/comparar", response_model=List[ComparacionTiendas])
+async def comparar_tiendas_lote(lote_ids: LoteProductos):
+    """Comparación entre tiendas de varios productos, en el orden pedido"""
+    query, params = lote(consulta_ids(lote_ids.ids), (QUERY_LOTE_COMPARACION, []),
+                         ("DROP TABLE #ids", []))
+    comparaciones, = await execute_query_async(query, params, fetchsets=True)
     
-    precios = execute_query(query_precios, [producto_id, producto_id], fetchall=True)
+    return [completar_comparacion(comparacion) for comparacion in comparaciones]
+
+
+@router.get("/{producto_id}", response_model=ProductoConPrecios)
+async def get_producto(producto_id: int, request: Request):
+    """Obtener detalle de un producto con precios actuales (cacheado hasta el próximo scraping)"""
+    return await obtener_cache().responder(
+        request, f"producto:{producto_id}", [AMBITO_CATALOGO],
+        lambda: leer_producto(producto_id), ProductoConPrecios
+    )
+
+
+QUERY_PRODUCTO = """
+    SELECT p.id, p.nombre, p.descripcion, p.url_imagen,
+           m.nombre as marca, c.nombre as categoria,
+           p.fecha_creacion, p.ultima_actualizacion
+    FROM productos p
+    LEFT JOIN marcas m ON p.marca_id = m.id
+    LEFT JOIN categorias c ON p.categoria_id = c.id
+    WHERE p.id = ?
+"""
+
+QUERY_PRECIOS_ACTUALES = """
+    SELECT pr.precio_id as id, pr.precio, t.nombre as tienda, pr.stock, pr.rating, pr.url,
+           pr.fecha_actualizacion as fecha
+    FROM precios_actuales pr
+    INNER JOIN tiendas t ON pr.tienda_id = t.id
+    WHERE pr.producto_id = ?
+"""
+
+QUERY_COMPARACION = """
+    SELECT * FROM vw_comparacion_tiendas WHERE producto_id = ?
+"""
+
+
+def lote(*consultas):
+    """Unir (query, params) en un solo lote para execute_query_async(fetchsets=True)"""
+    query = "SET NOCOUNT ON;\n" + ";\n".join(q.strip() for q, _ in consultas) + ";"
+    params = [param for _, params in consultas for param in params]
+    return query, params
+
+
+async def leer_producto(producto_id):
+    """Producto con sus precios actuales en un viaje a la BD (404 si no existe)"""
+    
+    query, params = lote((QUERY_PRODUCTO, [producto_id]), (QUERY_PRECIOS_ACTUALES, [producto_id]))
+    productos, precios = await execute_query_async(query, params, fetchsets=True)
     
-    # Convertir a dict
-    from api.database import row_to_dict, get_db_connection
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(query, [producto_id])
-    producto_dict = row_to_dict(cursor.fetchone(), cursor)
-    cursor.close()
-    conn.close()
+    if not productos:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
     
+    producto_dict = productos[0]
     producto_dict['precios_actuales'] = precios
     
     return producto_dict
@@ -102,61 +275,203 @@ async def get_producto(producto_id: int):
 async def get_historico_precios(
     producto_id: int,
     tienda: Optional[str] = None,
-    dias: int = Query(30, le=365)
+    dias: int = Query(30, ge=1, le=HISTORICO_MAX_DIAS)
 ):
-    """Obtener histórico de precios de un producto"""
+    """
+    Obtener histórico de precios de un producto
+    
+    Hasta PRECIOS_RETENCION_DIAS días: un punto por día y tienda. En ventanas más
+    largas, un punto por semana (y por mes en el tramo ya compactado a meses).
+    """
+    
+    desde = datetime.now() - timedelta(days=dias)
+    intervalos = await consultar_intervalos(producto_id, tienda, desde)
+    
+    if dias <= PRECIOS_RETENCION_DIAS:
+        historico = expandir_intervalos(intervalos, desde)
+    else:
+        resumenes = await consultar_resumenes(producto_id, tienda, desde)
+        historico = agrupar_por_semana(intervalos, resumenes, desde)
+    
+    if API_SERIALIZACION_RAPIDA:
+        # Un año diario son cientos de puntos por tienda: sin validarlos uno a uno
+        return RespuestaRapida(filas_modelo(HistoricoPrecio, historico))
+    return historico
+
+
+def query_intervalos(producto_id, tienda, desde):
+    """(query, params) de los intervalos de precio que tocan la ventana desde `desde`"""
+    # Un intervalo no cruza de mes: con filtrar `fecha` desde el mes de inicio
+    # solo se leen las particiones mensuales de la ventana
+    inicio_mes = desde.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
     
     query = """
-        SELECT pr.fecha, pr.precio, t.nombre as tienda,
-               LAG(pr.precio) OVER (PARTITION BY t.id ORDER BY pr.fecha) as precio_anterior
-        FROM precios pr
+        SELECT pr.fecha, pr.fecha_hasta, pr.precio, t.nombre as tienda
+        FROM vw_precios_historial pr
         INNER JOIN tiendas t ON pr.tienda_id = t.id
         WHERE pr.producto_id = ?
-        AND pr.fecha >= DATEADD(day, -?, GETDATE())
+        AND pr.fecha >= ?
+        AND pr.fecha_hasta >= ?
     """
     
-    params = [producto_id, dias]
+    params = [producto_id, inicio_mes, desde]
     
     if tienda:
         query += " AND t.nombre = ?"
         params.append(tienda)
         
-    query += " ORDER BY pr.fecha DESC"
+    query += " ORDER BY t.nombre, pr.fecha"
     
-    historico = execute_query(query, params, fetchall=True)
+    return query, params
+
+
+async def consultar_intervalos(producto_id, tienda, desde):
+    """Intervalos de precio que tocan la ventana desde `desde`"""
+    query, params = query_intervalos(producto_id, tienda, desde)
+    return await execute_query_async(query, params, fetchall=True)
+
+
+def query_resumenes(producto_id, tienda, desde):
+    """(query, params) de los resúmenes semanales y mensuales desde `desde`"""
+    filtro_tienda = " AND t.nombre = ?" if tienda else ""
     
-    # Calcular variación porcentual
-    for item in historico:
-        if item.get('precio_anterior'):
-            variacion = ((item['precio'] - item['precio_anterior']) / item['precio_anterior']) * 100
-            item['variacion_porcentual'] = round(variacion, 2)
+    query = f"""
+        SELECT 'semanal' as resolucion, s.semana as fecha, s.precio_min, s.precio_max,
+               s.precio_promedio, s.dias, t.nombre as tienda
+        FROM precios_semanales s
+        INNER JOIN tiendas t ON s.tienda_id = t.id
+        WHERE s.producto_id = ? AND s.semana >= ?{filtro_tienda}
+        UNION ALL
+        SELECT 'mensual', m.mes, m.precio_min, m.precio_max,
+               m.precio_promedio, m.dias, t.nombre
+        FROM precios_mensuales m
+        INNER JOIN tiendas t ON m.tienda_id = t.id
+        WHERE m.producto_id = ? AND m.mes >= ?{filtro_tienda}
+    """
+    
+    params = []
+    for inicio in (lunes(desde.date()), desde.date().replace(day=1)):
+        params.extend([producto_id, inicio])
+        if tienda:
+            params.append(tienda)
+            
+    return query, params
+
+
+async def consultar_resumenes(producto_id, tienda, desde):
+    """Resúmenes semanales y mensuales (histórico ya compactado) desde `desde`"""
+    query, params = query_resumenes(producto_id, tienda, desde)
+    return await execute_query_async(query, params, fetchall=True)
+
+
+def lunes(dia):
+    """Lunes de la semana de `dia` (mismo criterio que sp_compactar_precios)"""
+    return dia - timedelta(days=dia.weekday())
+
+
+def expandir_intervalos(intervalos, desde):
+    """
+    Convertir intervalos de precio en puntos diarios desde `desde`, del más reciente al más antiguo
+    
+    La variación porcentual se calcula contra el día anterior de la misma tienda.
+    """
+    historico = []
+    anteriores = {}
+    
+    for intervalo in sorted(intervalos, key=lambda i: (i['tienda'], i['fecha'])):
+        fecha = intervalo['fecha']
+        while fecha.date() <= intervalo['fecha_hasta'].date():
+            precio_anterior = anteriores.get(intervalo['tienda'])
+            anteriores[intervalo['tienda']] = intervalo['precio']
+            
+            if fecha >= desde:
+                item = {'fecha': fecha, 'precio': intervalo['precio'], 'tienda': intervalo['tienda']}
+                if precio_anterior:
+                    variacion = ((intervalo['precio'] - precio_anterior) / precio_anterior) * 100
+                    item['variacion_porcentual'] = round(variacion, 2)
+                historico.append(item)
+                
+            fecha += timedelta(days=1)
             
+    historico.sort(key=lambda item: item['fecha'], reverse=True)
     return historico
 
 
-@router.get("/{producto_id}/comparar", response_model=ComparacionTiendas)
-async def comparar_tiendas(producto_id: int):
-    """Comparar precios del producto entre tiendas"""
+def agrupar_por_semana(intervalos, resumenes, desde):
+    """
+    Un punto por semana y tienda con los días aún en intervalos y los resúmenes compactados
     
-    query = """
-        SELECT * FROM vw_comparacion_tiendas WHERE producto_id = ?
+    Una semana compactada solo en parte se combina con sus días en intervalos
+    (promedio ponderado por días). Los resúmenes mensuales quedan como un punto por mes.
     """
+    periodos = {}
+    
+    def acumular(clave, precio_min, precio_max, promedio, dias):
+        periodo = periodos.setdefault(clave, {'min': precio_min, 'max': precio_max, 'suma': 0.0, 'dias': 0})
+        periodo['min'] = min(periodo['min'], precio_min)
+        periodo['max'] = max(periodo['max'], precio_max)
+        periodo['suma'] += promedio * dias
+        periodo['dias'] += dias
+        
+    for item in expandir_intervalos(intervalos, desde):
+        precio = float(item['precio'])
+        acumular((item['tienda'], 'semanal', lunes(item['fecha'].date())), precio, precio, precio, 1)
+        
+    for resumen in resumenes:
+        inicio = resumen['fecha']
+        if isinstance(inicio, datetime):
+            inicio = inicio.date()
+        acumular(
+            (resumen['tienda'], resumen['resolucion'], inicio),
+            float(resumen['precio_min']), float(resumen['precio_max']),
+            float(resumen['precio_promedio']), resumen['dias']
+        )
+        
+    historico = []
+    anteriores = {}
+    
+    for (tienda, resolucion, inicio), periodo in sorted(periodos.items(), key=lambda p: (p[0][0], p[0][2])):
+        precio = round(periodo['suma'] / periodo['dias'], 2)
+        item = {
+            'fecha': datetime.combine(inicio, datetime.min.time()),
+            'precio': precio,
+            'tienda': tienda,
+            'resolucion': resolucion,
+            'precio_min': periodo['min'],
+            'precio_max': periodo['max']
+        }
+        precio_anterior = anteriores.get(tienda)
+        if precio_anterior:
+            item['variacion_porcentual'] = round(((precio - precio_anterior) / precio_anterior) * 100, 2)
+        anteriores[tienda] = precio
+        historico.append(item)
+        
+    historico.sort(key=lambda item: item['fecha'], reverse=True)
+    return historico
+
+
+@router.get("/{producto_id}/comparar", response_model=ComparacionTiendas)
+async def comparar_tiendas(producto_id: int, request: Request):
+    """Comparar precios del producto entre tiendas (cacheado hasta el próximo scraping)"""
+    return await obtener_cache().responder(
+        request, f"comparar:{producto_id}", [AMBITO_CATALOGO],
+        lambda: leer_comparacion(producto_id), ComparacionTiendas
+    )
+
+
+async def leer_comparacion(producto_id):
+    """Precios por tienda con la mejor tienda y el ahorro máximo (404 si no existe)"""
     
-    result = execute_query(query, [producto_id], fetchone=True)
+    resultado = await execute_query_async(QUERY_COMPARACION, [producto_id], fetchall=True)
     
-    if not result:
+    if not resultado:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
         
-    # Convertir a dict y agregar mejor tienda
-    from api.database import row_to_dict, get_db_connection
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(query, [producto_id])
-    comparacion = row_to_dict(cursor.fetchone(), cursor)
-    cursor.close()
-    conn.close()
-    
-    # Determinar mejor tienda
+    return completar_comparacion(resultado[0])
+
+
+def completar_comparacion(comparacion):
+    """Agregar mejor tienda y ahorro máximo a una fila de vw_comparacion_tiendas"""
     precios_tiendas = {
         'Wong': comparacion.get('precio_wong'),
         'Metro': comparacion.get('precio_metro'),
@@ -174,3 +489,53 @@ async def comparar_tiendas(producto_id: int):
         comparacion['ahorro_maximo'] = round(precio_max - precio_min, 2)
         
     return comparacion
+
+
+@router.get("/{producto_id}/detalle", response_model=ProductoDetalle)
+async def get_producto_detalle(
+    producto_id: int,
+    request: Request,
+    dias: int = Query(30, ge=1, le=HISTORICO_MAX_DIAS)
+):
+    """
+    Producto, precios actuales, histórico y comparación entre tiendas juntos
+    
+    Es lo que muestra el modal del dashboard: un request y un solo lote de
+    consultas a SQL Server en vez de /{id}, /{id}/historico y /{id}/comparar.
+    """
+    # La ventana del histórico es relativa a hoy: la fecha va en la clave
+    clave = f"detalle:{producto_id}:{dias}:{datetime.now().date()}"
+    return await obtener_cache().responder(
+        request, clave, [AMBITO_CATALOGO],
+        lambda: leer_detalle(producto_id, dias), ProductoDetalle
+    )
+
+
+async def leer_detalle(producto_id, dias):
+    """Todas las partes del detalle en un viaje a la BD (404 si el producto no existe)"""
+    desde = datetime.now() - timedelta(days=dias)
+    consultas = [
+        (QUERY_PRODUCTO, [producto_id]),
+        (QUERY_PRECIOS_ACTUALES, [producto_id]),
+        (QUERY_COMPARACION, [producto_id]),
+        query_intervalos(producto_id, None, desde),
+    ]
+    if dias > PRECIOS_RETENCION_DIAS:
+        consultas.append(query_resumenes(producto_id, None, desde))
+    
+    query, params = lote(*consultas)
+    productos, precios, comparacion, intervalos, *resumenes = await execute_query_async(
+        query, params, fetchsets=True
+    )
+    
+    if not productos:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+    
+    detalle = productos[0]
+    detalle['precios_actuales'] = precios
+    detalle['comparacion'] = completar_comparacion(comparacion[0]) if comparacion else None
+    detalle['historico'] = (
+        agrupar_por_semana(intervalos, resumenes[0], desde) if resumenes
+        else expandir_intervalos(intervalos, desde)
+    )
+    return detalle
@@ -27,6 +27,14 @@ class ProductoResponse(ProductoBase):
         from_attributes = True
 
 
+class ResultadoBusqueda(BaseModel):
+    id: int
+    nombre: str
+    marca: Optional[str] = None
+    categoria: Optional[str] = None
+    score: float
+
+
 class PrecioBase(BaseModel):
     precio: float
     tienda: str
@@ -52,6 +60,9 @@ class HistoricoPrecio(BaseModel):
     precio: float
     tienda: str
     variacion_porcentual: Optional[float] = None
+    resolucion: str = "diaria"  # diaria | semanal | mensual
+    precio_min: Optional[float] = None
+    precio_max: Optional[float] = None
 
 
 class ComparacionTiendas(BaseModel):
@@ -68,6 +79,15 @@ class ComparacionTiendas(BaseModel):
     ahorro_maximo: Optional[float]
 
 
+class ProductoDetalle(ProductoConPrecios):
+    historico: List[HistoricoPrecio] = []
+    comparacion: Optional[ComparacionTiendas] = None
+
+
+class LoteProductos(BaseModel):
+    ids: List[int] = Field(min_length=1, description="IDs de producto; el resultado respeta este orden")
+
+
 class AlertaCreate(BaseModel):
     producto_id: int
     email: EmailStr
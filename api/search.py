@@ -0,0 +1,401 @@
+"""
+Búsqueda de productos - Índice invertido en memoria
+
+Reemplaza los LIKE '%termino%' sobre productos por un índice que se construye
+una vez por proceso a partir de nombre, marca y categoría:
+
+    - tokens normalizados (minúsculas, sin tildes, ñ como n, sin signos)
+    - coincidencia exacta, por prefijo (búsqueda mientras se escribe) y, si un
+      término no coincide así, por subcadena usando trigramas del vocabulario
+    - ranking por calidad de coincidencia y campo (nombre > marca > categoría)
+
+El índice se reconstruye en segundo plano cuando aparece un registro nuevo en
+scraping_logs (es decir, después de cada scraping); mientras tanto se sigue
+respondiendo con el anterior.
+"""
+import sys
+sys.path.append('.')
+
+import heapq
+import logging
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+from config.settings import BUSQUEDA_REVISION_SEG
+
+logger = logging.getLogger(__name__)
+
+# Campos indexados y su peso en el ranking
+CAMPOS = ('nombre', 'marca', 'categoria')
+PESO_CAMPO = (1.0, 0.7, 0.4)
+
+# Calidad de coincidencia de un término con un token
+EXACTA, PREFIJO, SUBCADENA = 3, 2, 1
+
+# Un término con hasta esta cantidad de listas de documentos se intersecta por
+# bloques y se puntúa con bisect; los prefijos más amplios se comprueban
+# recorriendo los tokens de cada documento que queda
+MAX_LISTAS_BISECT = 64
+
+# Documentos del término conductor por bloque (rango de números de documento)
+BLOQUE = 1024
+
+# Tope de documentos recorridos por consulta: con consultas muy amplias y poco
+# selectivas el ranking pasa a ser aproximado en vez de recorrer todo el catálogo
+MAX_RECORRIDO = 200000
+
+_NO_ALFANUMERICO = re.compile(r"[^a-z0-9]+")
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes ni diéresis; la ñ pasa a n ("panales" encuentra "Pañales")"""
+    if not texto:
+        return ""
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+def tokenizar(texto):
+    """Tokens normalizados de un texto"""
+    return [token for token in _NO_ALFANUMERICO.split(normalizar(texto)) if token]
+
+
+def trigramas(token):
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+class IndiceBusqueda:
+    """
+    Índice invertido inmutable sobre (id, nombre, marca, categoria)
+
+    Los documentos se numeran por largo del nombre: a igual relevancia gana el
+    nombre más corto, así que ordenar números de documento ya es desempatar.
+    Cada token guarda un array ordenado de documentos por campo. La búsqueda
+    recorre el término más selectivo nivel por nivel (de mayor a menor valor)
+    en bloques de números de documento, intersecta los demás términos en cada
+    bloque y se detiene apenas ningún documento pendiente puede entrar en la
+    página pedida.
+    """
+
+    def __init__(self, filas):
+        filas = sorted(filas, key=lambda fila: (len(fila[1] or ""), fila[0]))
+        self.ids = array('q', (fila[0] for fila in filas))
+        self.nombres = [fila[1] for fila in filas]
+        self.marcas = [fila[2] for fila in filas]
+        self.categorias = [fila[3] for fila in filas]
+        self.version = None
+        self.construido = time.time()
+
+        vocabulario = {}       # token -> id provisorio
+        docs = []              # id provisorio -> [docs nombre, docs marca, docs categoria]
+        tokens_doc = array('i')
+        inicio_doc = array('q', [0])
+        tokens_valor = {}      # marca/categoría -> tokens (se repiten en muchos productos)
+        normalizados = {}
+        self.marcas_normalizadas = []      # para los filtros marca/categoria (contiene)
+        self.categorias_normalizadas = []
+
+        for doc, (_, nombre, marca, categoria) in enumerate(filas):
+            vistos = set()
+            for campo, texto in enumerate((nombre, marca, categoria)):
+                if campo:
+                    tokens = tokens_valor.get(texto)
+                    if tokens is None:
+                        tokens = tokens_valor[texto] = tokenizar(texto)
+                else:
+                    tokens = tokenizar(texto)
+
+                for token in tokens:
+                    # Un token cuenta una vez por documento (en el campo de más peso)
+                    if token in vistos:
+                        continue
+                    vistos.add(token)
+                    tid = vocabulario.get(token)
+                    if tid is None:
+                        tid = vocabulario[token] = len(docs)
+                        docs.append([None, None, None])
+                    if docs[tid][campo] is None:
+                        docs[tid][campo] = array('i')
+                    docs[tid][campo].append(doc)
+                    tokens_doc.append(tid * 4 + campo)
+            inicio_doc.append(len(tokens_doc))
+
+            for valor, por_doc in ((marca, self.marcas_normalizadas), (categoria, self.categorias_normalizadas)):
+                if valor not in normalizados:
+                    normalizados[valor] = normalizar(valor)
+                por_doc.append(normalizados[valor])
+
+        # Vocabulario ordenado para búsquedas por prefijo con bisect
+        self.tokens = sorted(vocabulario)
+        remapeo = array('i', bytes(4 * len(docs)))
+        for nuevo, token in enumerate(self.tokens):
+            remapeo[vocabulario[token]] = nuevo
+        self.docs = [tuple(docs[vocabulario[token]]) for token in self.tokens]
+        self.tokens_doc = array('i', (remapeo[t >> 2] * 4 + (t & 3) for t in tokens_doc))
+        self.inicio_doc = inicio_doc
+
+        # Postings acumulados para estimar en O(1) cuántos documentos trae un prefijo
+        self.acumulado = array('q', [0])
+        for listas in self.docs:
+            self.acumulado.append(self.acumulado[-1] + sum(len(lista) for lista in listas if lista is not None))
+
+        self.trigramas = {}
+        for tid, token in enumerate(self.tokens):
+            for trigrama in trigramas(token):
+                self.trigramas.setdefault(trigrama, []).append(tid)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _coincidencias(self, termino):
+        """dict tid -> calidad de los tokens que coinciden con el término"""
+        inicio = bisect_left(self.tokens, termino)
+        exacta = inicio < len(self.tokens) and self.tokens[inicio] == termino
+
+        # Un solo carácter solo coincide exacto ("x", "1"); si no, todo el rango del prefijo
+        if len(termino) == 1:
+            return {inicio: EXACTA} if exacta else {}
+
+        fin = bisect_left(self.tokens, termino + "\uffff", inicio)
+        coincidencias = dict.fromkeys(range(inicio, fin), PREFIJO)
+        if exacta:
+            coincidencias[inicio] = EXACTA
+
+        # Sin exactas ni prefijos: buscar el término dentro de los tokens
+        if not coincidencias and len(termino) >= 3:
+            grupos = sorted((self.trigramas.get(t, ()) for t in trigramas(termino)), key=len)
+            if grupos and grupos[0]:
+                posibles = set(grupos[0]).intersection(*grupos[1:])
+                coincidencias = {tid: SUBCADENA for tid in posibles if termino in self.tokens[tid]}
+        return coincidencias
+
+    def _estimar(self, coincidencias):
+        """Cantidad de postings de las coincidencias (O(1) si es un rango de prefijo)"""
+        inicio, fin = min(coincidencias), max(coincidencias) + 1
+        if fin - inicio == len(coincidencias):
+            return self.acumulado[fin] - self.acumulado[inicio]
+        return sum(self.acumulado[tid + 1] - self.acumulado[tid] for tid in coincidencias)
+
+    def _niveles(self, coincidencias):
+        """[(valor, [arrays de docs])] de mayor a menor valor (calidad x peso del campo)"""
+        grupos = {}
+        for tid, calidad in coincidencias.items():
+            for campo, docs in enumerate(self.docs[tid]):
+                if docs is not None:
+                    grupos.setdefault(calidad * PESO_CAMPO[campo], []).append(docs)
+        return sorted(grupos.items(), key=lambda nivel: -nivel[0])
+
+    def _valor_termino(self, coincidencias):
+        """(valor máximo, función doc -> valor del término o 0, listas para intersectar o None)"""
+        niveles = self._niveles(coincidencias)
+        listas = [docs for _, listas_nivel in niveles for docs in listas_nivel]
+
+        if len(listas) <= MAX_LISTAS_BISECT:
+            def valor(doc):
+                for valor_nivel, listas_nivel in niveles:
+                    for docs in listas_nivel:
+                        i = bisect_left(docs, doc)
+                        if i < len(docs) and docs[i] == doc:
+                            return valor_nivel
+                return 0.0
+            return niveles[0][0], valor, listas
+
+        tokens_doc, inicio_doc = self.tokens_doc, self.inicio_doc
+
+        def valor(doc):
+            mejor = 0.0
+            for i in range(inicio_doc[doc], inicio_doc[doc + 1]):
+                calidad = coincidencias.get(tokens_doc[i] >> 2)
+                if calidad:
+                    mejor = max(mejor, calidad * PESO_CAMPO[tokens_doc[i] & 3])
+            return mejor
+        return niveles[0][0], valor, None
+
+    @staticmethod
+    def _rango(listas, desde, hasta):
+        """Documentos de las listas en [desde, hasta) como set"""
+        return set().union(*(docs[bisect_left(docs, desde):bisect_left(docs, hasta)] for docs in listas))
+
+    def buscar(self, consulta, limit=20, skip=0, marca=None, categoria=None):
+        """
+        Buscar productos que coincidan con todos los términos de la consulta
+
+        Retorna [dict id, nombre, marca, categoria, score] ordenados por score
+        (y nombre más corto a igual score).
+        """
+        terminos = list(dict.fromkeys(tokenizar(consulta)))
+        if not terminos:
+            return []
+
+        por_termino = []
+        for termino in terminos:
+            coincidencias = self._coincidencias(termino)
+            if not coincidencias:
+                return []
+            por_termino.append((self._estimar(coincidencias), coincidencias))
+        por_termino.sort(key=lambda termino: termino[0])
+
+        # El término más selectivo conduce; los demás se intersectan por bloques
+        # (en C) o se comprueban en los documentos que quedan
+        niveles = self._niveles(por_termino[0][1])
+        resto = [self._valor_termino(coincidencias) for _, coincidencias in por_termino[1:]]
+        max_resto = sum(maximo for maximo, _, _ in resto)
+        valores = [valor for _, valor, _ in resto]
+        intersectar = [listas for _, _, listas in resto if listas is not None]
+
+        # Contiene, igual que el filtro LIKE de /productos/
+        filtros = [(normalizar(filtro), por_doc)
+                   for filtro, por_doc in ((marca, self.marcas_normalizadas),
+                                           (categoria, self.categorias_normalizadas))
+                   if filtro]
+
+        necesarios = skip + limit
+        mejores = []   # heap de (score, -doc): arriba el peor de la página
+        vistos = set()
+        recorridos = 0
+        total_docs = len(self.ids)
+
+        for valor_nivel, listas in niveles:
+            cota = round(valor_nivel + max_resto, 6)
+            # Ningún documento de este nivel (ni de los siguientes) puede entrar
+            if len(mejores) >= necesarios and (cota, 0) < mejores[0]:
+                break
+
+            # Rangos de documentos con ~BLOQUE documentos del nivel cada uno
+            ancho = max(1, BLOQUE * total_docs // sum(len(docs) for docs in listas))
+            for desde in range(0, total_docs, ancho):
+                if len(mejores) >= necesarios and (cota, -desde) < mejores[0]:
+                    break
+                bloque = self._rango(listas, desde, desde + ancho)
+                if not bloque:
+                    continue
+                recorridos += len(bloque)
+                if len(niveles) > 1:
+                    bloque -= vistos
+                    vistos |= bloque
+                for listas_termino in intersectar:
+                    bloque &= self._rango(listas_termino, desde, desde + ancho)
+                    if not bloque:
+                        break
+
+                for doc in sorted(bloque):
+                    if len(mejores) >= necesarios and (cota, -doc) < mejores[0]:
+                        break
+                    if filtros and any(filtro not in por_doc[doc] for filtro, por_doc in filtros):
+                        continue
+                    score = valor_nivel
+                    for valor in valores:
+                        valor_doc = valor(doc)
+                        if not valor_doc:
+                            break
+                        score += valor_doc
+                    else:
+                        score = round(score, 6)  # comparable con la cota pese al orden de las sumas
+                        if len(mejores) < necesarios:
+                            heapq.heappush(mejores, (score, -doc))
+                        elif (score, -doc) > mejores[0]:
+                            heapq.heapreplace(mejores, (score, -doc))
+
+                if recorridos > MAX_RECORRIDO:
+                    break
+            if recorridos > MAX_RECORRIDO:
+                break
+
+        return [
+            {
+                'id': self.ids[-menos_doc],
+                'nombre': self.nombres[-menos_doc],
+                'marca': self.marcas[-menos_doc],
+                'categoria': self.categorias[-menos_doc],
+                'score': round(score, 2)
+            }
+            for score, menos_doc in sorted(mejores, reverse=True)[skip:]
+        ]
+
+
+CONSULTA_PRODUCTOS = """
+    SELECT p.id, p.nombre, m.nombre as marca, c.nombre as categoria
+    FROM productos p
+    LEFT JOIN marcas m ON p.marca_id = m.id
+    LEFT JOIN categorias c ON p.categoria_id = c.id
+"""
+
+CONSULTA_VERSION = "SELECT MAX(id) FROM scraping_logs"
+
+
+class BuscadorProductos:
+    """
+    Mantiene el índice del proceso y lo reconstruye cuando cambia la versión
+
+    `conectar` retorna una conexión DB-API; la versión (último scraping_logs.id)
+    se revisa como máximo cada `revision_seg` segundos.
+    """
+
+    def __init__(self, conectar, revision_seg=BUSQUEDA_REVISION_SEG):
+        self.conectar = conectar
+        self.revision_seg = revision_seg
+        self.indice = None
+        self._revisado = 0.0
+        self._lock = threading.Lock()
+        self._reconstruyendo = False
+
+    def _leer(self, consulta):
+        conn = self.conectar()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(consulta)
+            return cursor.fetchall()
+        finally:
+            conn.close()
+
+    def reconstruir(self):
+        """Construir un índice nuevo y reemplazar el actual"""
+        inicio = time.perf_counter()
+        version = self._leer(CONSULTA_VERSION)[0][0]
+        indice = IndiceBusqueda(tuple(fila) for fila in self._leer(CONSULTA_PRODUCTOS))
+        indice.version = version
+        self.indice = indice
+        logger.info(f"🔎 Índice de búsqueda: {len(indice)} productos en {time.perf_counter() - inicio:.1f}s")
+        return indice
+
+    def _reconstruir_en_fondo(self):
+        try:
+            self.reconstruir()
+        except Exception as e:
+            logger.error(f"❌ Error reconstruyendo el índice de búsqueda: {e}")
+        finally:
+            self._reconstruyendo = False
+
+    def obtener(self):
+        """Índice vigente (la primera vez se construye en el momento)"""
+        if self.indice is None:
+            with self._lock:
+                if self.indice is None:
+                    self._revisado = time.monotonic()
+                    return self.reconstruir()
+
+        ahora = time.monotonic()
+        if ahora - self._revisado >= self.revision_seg and not self._reconstruyendo:
+            with self._lock:
+                if ahora - self._revisado >= self.revision_seg and not self._reconstruyendo:
+                    self._revisado = ahora
+                    if self._leer(CONSULTA_VERSION)[0][0] != self.indice.version:
+                        self._reconstruyendo = True
+                        threading.Thread(target=self._reconstruir_en_fondo, daemon=True).start()
+        return self.indice
+
+
+_buscador = None
+
+
+def obtener_buscador():
+    """Buscador del proceso de la API"""
+    global _buscador
+    if _buscador is None:
+        from api.database import get_db_connection
+        _buscador = BuscadorProductos(get_db_connection)
+    return _buscador
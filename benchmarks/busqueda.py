@@ -0,0 +1,110 @@
+"""
+Benchmark de búsqueda - Latencia del índice de productos con un catálogo sintético
+
+Uso:
+    py -m benchmarks.busqueda
+    py -m benchmarks.busqueda --productos 1000000 --consultas 2000
+
+Genera nombres con vocabulario de supermercado (marcas, presentaciones, tildes)
+y mide p50/p95/p99 de IndiceBusqueda.buscar con una mezcla de consultas:
+palabras completas, prefijos mientras se escribe, varias palabras y subcadenas.
+"""
+import sys
+sys.path.append('.')
+
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+
+from api.search import IndiceBusqueda
+
+PRODUCTOS = [
+    "Leche", "Yogurt", "Queso", "Mantequilla", "Arroz", "Azúcar", "Café", "Té", "Galletas", "Cereal",
+    "Avena", "Fideos", "Aceite", "Atún", "Jabón", "Shampoo", "Acondicionador", "Crema", "Desodorante",
+    "Pañales", "Toallitas", "Paracetamol", "Ibuprofeno", "Vitamina", "Colágeno", "Papilla", "Compota",
+    "Jugo", "Néctar", "Gaseosa", "Agua", "Chocolate", "Mermelada", "Miel", "Harina", "Pan", "Detergente",
+    "Suavizante", "Lavavajilla", "Cepillo", "Pasta Dental", "Enjuague", "Protector Solar", "Bloqueador",
+]
+VARIANTES = [
+    "Entera", "Descremada", "Light", "Sin Lactosa", "Orgánico", "Integral", "Clásico", "Natural",
+    "Fresa", "Vainilla", "Durazno", "Manzana", "Piña", "Coco", "Menta", "Limón", "Kids", "Bebé",
+    "Extra Suave", "Anticaspa", "Hidratante", "Forte", "Plus", "Premium", "Familiar", "Zero",
+]
+MARCAS = [
+    "Gloria", "Laive", "Nestlé", "Costeño", "Paisana", "Bells", "Wong", "Metro", "Cuisine & Co",
+    "Colgate", "Pantene", "Head & Shoulders", "Huggies", "Pampers", "Bayer", "Genfar", "Nivea",
+    "Dove", "Ariel", "Bolívar", "Sapolio", "Gerber", "Frugos", "Inca Kola", "San Luis", "Sublime",
+] + [f"Marca{i}" for i in range(2000)]
+CATEGORIAS = ["Salud", "Cuidado Personal", "Alimentos Orgánicos", "Lácteos", "Abarrotes", "Limpieza", "Bebidas"]
+PRESENTACIONES = ["x 1L", "x 500g", "x 400ml", "x 12un", "x 90g", "x 1kg", "Pack x 6", "x 200ml", "x 30 Tabletas"]
+
+
+def catalogo(n, semilla=42):
+    """Filas (id, nombre, marca, categoria) reproducibles"""
+    rnd = random.Random(semilla)
+    for id_ in range(1, n + 1):
+        marca = rnd.choice(MARCAS)
+        nombre = (f"{rnd.choice(PRODUCTOS)} {rnd.choice(VARIANTES)} {marca} "
+                  f"{rnd.choice(PRESENTACIONES)} Ref{rnd.randrange(n // 3 + 1)}")
+        yield id_, nombre, marca, rnd.choice(CATEGORIAS)
+
+
+def consultas(cantidad, semilla=7):
+    """Mezcla de consultas como las de la caja de búsqueda del dashboard"""
+    rnd = random.Random(semilla)
+    tipos = [
+        lambda: rnd.choice(PRODUCTOS),                                          # palabra completa
+        lambda: rnd.choice(PRODUCTOS)[:rnd.randint(3, 5)],                      # prefijo al escribir
+        lambda: f"{rnd.choice(PRODUCTOS)} {rnd.choice(MARCAS[:26])}",           # producto + marca
+        lambda: f"{rnd.choice(PRODUCTOS)} {rnd.choice(VARIANTES)[:4]}",         # producto + prefijo
+        lambda: f"{rnd.choice(PRODUCTOS).lower()} {rnd.choice(VARIANTES).lower()} {rnd.choice(MARCAS[:26])}",
+        lambda: rnd.choice(["cetamol", "lactosa", "dental", "acondic", "anticas"]),  # subcadena
+    ]
+    return [rnd.choice(tipos)() for _ in range(cantidad)]
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def main():
+    parser_args = argparse.ArgumentParser(description="Benchmark del índice de búsqueda")
+    parser_args.add_argument("--productos", type=int, default=1_000_000)
+    parser_args.add_argument("--consultas", type=int, default=2000)
+    parser_args.add_argument("--limit", type=int, default=20)
+    parser_args.add_argument("--memoria", action="store_true",
+                             help="medir el pico de memoria de la construcción (tracemalloc la hace más lenta)")
+    args = parser_args.parse_args()
+
+    if args.memoria:
+        tracemalloc.start()
+    inicio = time.perf_counter()
+    indice = IndiceBusqueda(catalogo(args.productos))
+    construccion = time.perf_counter() - inicio
+
+    linea = f"Índice: {len(indice):,} productos, {len(indice.tokens):,} tokens, construido en {construccion:.1f}s"
+    if args.memoria:
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        linea += f", pico {pico / 1024 / 1024:,.0f} MB"
+    print(linea)
+
+    for consulta in consultas(50):  # calentar
+        indice.buscar(consulta, limit=args.limit)
+
+    tiempos = []
+    for consulta in consultas(args.consultas):
+        inicio = time.perf_counter()
+        indice.buscar(consulta, limit=args.limit)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+
+    print(f"{args.consultas} consultas: p50 {statistics.median(tiempos):.2f} ms, "
+          f"p95 {percentil(tiempos, 0.95):.2f} ms, p99 {percentil(tiempos, 0.99):.2f} ms, "
+          f"máx {max(tiempos):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmark de carga de la API - Consultas lentas y rápidas mezcladas
+
+Uso:
+    py -m benchmarks.carga_api
+    py -m benchmarks.carga_api --requests 600 --tasa 150 --lentas 0.1
+
+Monta dos rutas async sobre una base simulada (cada "consulta" duerme su
+latencia en el hilo que la ejecuta, como un pyodbc bloqueante) y las golpea
+en paralelo con httpx, comparando:
+
+    - bloqueante: execute_query directo dentro de la ruta async (cómo eran las rutas)
+    - async: execute_query_async (executor acotado al pool, timeout, cancelación)
+
+Reporta requests por segundo atendidos y p50/p95 de las consultas rápidas
+(desde su llegada), que son las que sufren cuando una lenta bloquea el event loop.
+"""
+import sys
+sys.path.append('.')
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from fastapi import FastAPI
+
+import api.database as database
+from api.pool import ConexionPool
+
+
+class ConexionSimulada:
+    """Conexión pyodbc de mentira: la query es la latencia en segundos"""
+
+    timeout = 0
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, *params):
+        if query != "SELECT 1":
+            time.sleep(float(query))
+
+    def fetchall(self):
+        return [(1,)]
+
+    def fetchone(self):
+        return (1,)
+
+    description = [("valor",)]
+
+    def cancel(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def crear_app(modo, latencia_lenta, latencia_rapida):
+    app = FastAPI()
+
+    if modo == "bloqueante":
+        @app.get("/lenta")
+        async def lenta():
+            return database.execute_query(str(latencia_lenta), fetchall=True)
+
+        @app.get("/rapida")
+        async def rapida():
+            return database.execute_query(str(latencia_rapida), fetchall=True)
+    else:
+        @app.get("/lenta")
+        async def lenta():
+            return await database.execute_query_async(str(latencia_lenta), fetchall=True)
+
+        @app.get("/rapida")
+        async def rapida():
+            return await database.execute_query_async(str(latencia_rapida), fetchall=True)
+
+    return app
+
+
+async def cargar(app, rutas, tasa):
+    """
+    Latencias (ruta, ms) con llegadas a `tasa` requests por segundo
+
+    Carga abierta: cada request tiene su hora de llegada y la latencia se mide
+    desde ahí, así también cuenta el tiempo que esperó a que el event loop lo atienda.
+    """
+    latencias = []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as cliente:
+        inicio = time.perf_counter()
+
+        async def pedir(i, ruta):
+            llegada = inicio + i / tasa
+            await asyncio.sleep(max(0, llegada - time.perf_counter()))
+            respuesta = await cliente.get(ruta)
+            respuesta.raise_for_status()
+            latencias.append((ruta, (time.perf_counter() - llegada) * 1000))
+
+        await asyncio.gather(*(pedir(i, ruta) for i, ruta in enumerate(rutas)))
+    return latencias
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def main():
+    parser_args = argparse.ArgumentParser(description="Benchmark de carga de la API")
+    parser_args.add_argument("--requests", type=int, default=300)
+    parser_args.add_argument("--tasa", type=float, default=100, help="requests por segundo que llegan")
+    parser_args.add_argument("--lentas", type=float, default=0.1, help="fracción de consultas lentas")
+    parser_args.add_argument("--latencia-lenta", type=float, default=0.5)
+    parser_args.add_argument("--latencia-rapida", type=float, default=0.01)
+    parser_args.add_argument("--pool", type=int, default=database.DB_POOL_MAX)
+    args = parser_args.parse_args()
+
+    rnd = random.Random(3)
+    rutas = ["/lenta" if rnd.random() < args.lentas else "/rapida" for _ in range(args.requests)]
+
+    pool = ConexionPool(minimo=args.pool, maximo=args.pool, factory=ConexionSimulada)
+    pool.calentar()
+    database.obtener_pool = lambda: pool
+    database._executor = ThreadPoolExecutor(max_workers=args.pool, thread_name_prefix="db")
+
+    print(f"{args.requests} requests ({args.lentas:.0%} lentas de {args.latencia_lenta * 1000:.0f} ms, "
+          f"rápidas de {args.latencia_rapida * 1000:.0f} ms) a {args.tasa:.0f} req/s, pool {args.pool}")
+    for modo in ("bloqueante", "async"):
+        app = crear_app(modo, args.latencia_lenta, args.latencia_rapida)
+        inicio = time.perf_counter()
+        latencias = asyncio.run(cargar(app, rutas, args.tasa))
+        duracion = time.perf_counter() - inicio
+
+        rapidas = [ms for ruta, ms in latencias if ruta == "/rapida"]
+        print(f"  {modo:<11} {len(latencias) / duracion:7.1f} req/s | rápidas: "
+              f"p50 {statistics.median(rapidas):7.1f} ms, p95 {percentil(rapidas, 0.95):7.1f} ms")
+
+    pool.cerrar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark de parsing - Tarjetas por segundo de cada backend sobre las tres tiendas
+
+Uso:
+    py -m benchmarks.parsing
+    py -m benchmarks.parsing --tarjetas 5000 --repeticiones 5 --json resultados.json
+
+"bs4" es la ruta anterior (un BeautifulSoup con html.parser por tarjeta);
+"lxml" parsea cada tanda completa de una vez y evalúa XPath compilados.
+"""
+import sys
+sys.path.append('.')
+
+import argparse
+import json
+import logging
+import time
+
+from scrapers.parsing import obtener_parser, BACKENDS
+from scrapers.wong import WongScraper
+from scrapers.metro import MetroScraper
+from scrapers.plaza_vea import PlazaVeaScraper
+
+SCRAPERS = [WongScraper, MetroScraper, PlazaVeaScraper]
+TANDA = 24  # tarjetas que VTEX carga por scroll
+
+
+def tarjeta_vtex(numero):
+    """Tarjeta con el marcado anidado de una grilla VTEX; el nombre coincide recién con el tercer selector"""
+    return (
+        f'<div class="product-item vtex-search-result-3-x-galleryItem" data-index="{numero}">'
+        f'<section class="vtex-product-summary-2-x-container"><div class="vtex-product-summary-2-x-element">'
+        f'<a class="vtex-product-summary-2-x-clearLink" href="/producto-{numero}/p">'
+        f'<div class="vtex-product-summary-2-x-imageWrapper"><div class="vtex-product-summary-2-x-imageContainer">'
+        f'<img class="vtex-product-summary-2-x-image" src="https://wongfood.vteximg.com.br/arquivos/ids/{numero}.jpg" '
+        f'alt="Producto {numero}" loading="lazy"></div></div></a>'
+        f'<div class="vtex-flex-layout-0-x-flexRow"><div class="vtex-flex-layout-0-x-flexCol">'
+        f'<span class="vtex-store-components-3-x-productBrandName brand">Marca {numero % 40}</span>'
+        f'<div class="vtex-product-summary-2-x-nameContainer"><h2 class="product-name">'
+        f'<span class="vtex-product-summary-2-x-productBrand">Producto de prueba {numero} x 500g</span></h2></div>'
+        f'<div class="vtex-product-price-1-x-sellingPrice"><span class="product-prices__value">'
+        f'S/ {numero % 90 + 1}.90</span></div>'
+        f'<div class="vtex-rich-text-0-x-container"><p class="vtex-rich-text-0-x-paragraph">Despacho a domicilio</p>'
+        f'</div></div></div></div></section></div>'
+    )
+
+
+def medir(scraper, parser, tarjetas, repeticiones):
+    """Mejor tiempo de parsear y extraer todas las tarjetas, por tandas"""
+    scraper.parser = parser
+    scraper.plan  # compilar fuera de la medición
+    mejor = None
+    extraidos = 0
+
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        extraidos = 0
+        for i in range(0, len(tarjetas), TANDA):
+            for elemento in parser.tarjetas(tarjetas[i:i + TANDA]):
+                if scraper.extract_product_data(elemento):
+                    extraidos += 1
+        tiempo = time.perf_counter() - inicio
+        mejor = tiempo if mejor is None else min(mejor, tiempo)
+
+    return {
+        'tarjetas': len(tarjetas),
+        'extraidos': extraidos,
+        'segundos': round(mejor, 4),
+        'tarjetas_por_segundo': round(len(tarjetas) / mejor, 1)
+    }
+
+
+def main():
+    parser_args = argparse.ArgumentParser(description="Benchmark de backends de parsing")
+    parser_args.add_argument("--tarjetas", type=int, default=2000)
+    parser_args.add_argument("--repeticiones", type=int, default=3)
+    parser_args.add_argument("--json", help="guardar resultados en este archivo")
+    args = parser_args.parse_args()
+
+    logging.disable(logging.WARNING)
+    tarjetas = [tarjeta_vtex(n) for n in range(1, args.tarjetas + 1)]
+    resultados = {}
+
+    for scraper_cls in SCRAPERS:
+        scraper = scraper_cls()
+        resultados[scraper.tienda_nombre] = {
+            nombre: medir(scraper, obtener_parser(nombre), tarjetas, args.repeticiones)
+            for nombre in BACKENDS
+        }
+
+    print(f"{'Tienda':<12}{'Backend':<8}{'Tarjetas/s':>12}{'Extraídos':>11}{'Aceleración':>13}")
+    for tienda, por_backend in resultados.items():
+        base = por_backend['bs4']['tarjetas_por_segundo']
+        for nombre, r in por_backend.items():
+            print(
+                f"{tienda:<12}{nombre:<8}{r['tarjetas_por_segundo']:>12,.0f}{r['extraidos']:>11}"
+                f"{r['tarjetas_por_segundo'] / base:>12.1f}x"
+            )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"💾 Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
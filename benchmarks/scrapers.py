@@ -0,0 +1,166 @@
+"""
+Benchmark de scrapers offline - Rendimiento de extracción sobre el corpus HTML de tests/fixtures/html
+
+Para cada tienda y backend de parsing reporta:
+    - productos por segundo (página completa: contenedores + extract_product_data)
+    - memoria asignada (pico de tracemalloc en una pasada y KB por producto; solo
+      cuenta objetos Python, no la memoria interna de libxml2)
+    - tiempo de extracción por campo (µs por tarjeta, según PLAN_EXTRACCION)
+
+Los resultados se guardan en benchmarks/resultados/<commit>.json para comparar entre commits:
+
+    py -m benchmarks.scrapers
+    py -m benchmarks.scrapers --comparar benchmarks/resultados/<otro_commit>.json
+"""
+import sys
+sys.path.append('.')
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+from scrapers.offline import CORPUS, cargar_pagina, extraer_pagina
+from scrapers.parsing import obtener_parser, PlanExtraccion, BACKENDS
+
+RESULTADOS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultados")
+
+
+def commit_actual():
+    """Hash corto del commit actual (con sufijo -dirty si hay cambios sin commitear)"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short=10", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        cambios = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True
+        ).stdout.strip()
+        return f"{commit}-dirty" if cambios else commit
+    except (OSError, subprocess.CalledProcessError):
+        return "sin-git"
+
+
+def medir_throughput(scraper, paginas, repeticiones):
+    """Mejor tiempo de extraer todas las páginas. Retornar (productos, segundos)"""
+    mejor = None
+    productos = 0
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        productos = sum(1 for html in paginas for data in extraer_pagina(scraper, html) if data)
+        tiempo = time.perf_counter() - inicio
+        mejor = tiempo if mejor is None else min(mejor, tiempo)
+    return productos, mejor
+
+
+def medir_memoria(scraper, paginas):
+    """Pico de memoria asignada (KB) durante una pasada por todas las páginas"""
+    tracemalloc.start()
+    try:
+        for html in paginas:
+            extraer_pagina(scraper, html)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return pico / 1024
+
+
+def medir_campos(scraper, paginas, repeticiones):
+    """µs por tarjeta de cada campo, con un plan de un solo campo sobre las tarjetas ya parseadas"""
+    tarjetas = [tarjeta for html in paginas for tarjeta in scraper.get_tarjetas(html)]
+    tiempos = {}
+    for campo, definicion in scraper.PLAN_EXTRACCION.items():
+        plan = PlanExtraccion({campo: definicion}, scraper.parser)
+        mejor = None
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            for tarjeta in tarjetas:
+                plan.extraer(tarjeta)
+            tiempo = time.perf_counter() - inicio
+            mejor = tiempo if mejor is None else min(mejor, tiempo)
+        tiempos[campo] = round(mejor / len(tarjetas) * 1_000_000, 2) if tarjetas else None
+    return tiempos
+
+
+def ejecutar(backends, repeticiones):
+    """Medir cada tienda del corpus con cada backend"""
+    resultados = {}
+    for scraper_cls, archivos in CORPUS.items():
+        paginas = [cargar_pagina(archivo) for archivo in archivos]
+        scraper = scraper_cls()
+        resultados[scraper.tienda_nombre] = {}
+
+        for backend in backends:
+            scraper.parser = obtener_parser(backend)
+            scraper.plan  # compilar fuera de la medición
+            productos, segundos = medir_throughput(scraper, paginas, repeticiones)
+            pico_kb = medir_memoria(scraper, paginas)
+
+            resultados[scraper.tienda_nombre][backend] = {
+                'paginas': len(paginas),
+                'productos': productos,
+                'productos_por_segundo': round(productos / segundos, 1),
+                'memoria_pico_kb': round(pico_kb, 1),
+                'kb_por_producto': round(pico_kb / productos, 2) if productos else None,
+                'us_por_campo': medir_campos(scraper, paginas, repeticiones)
+            }
+    return resultados
+
+
+def imprimir(resultados, anterior=None):
+    """Tabla de resultados; con `anterior` agrega la variación de productos/s"""
+    print(f"{'Tienda':<12}{'Backend':<8}{'Productos/s':>13}{'Pico KB':>10}{'KB/prod':>9}  µs por campo")
+    for tienda, por_backend in resultados.items():
+        for backend, r in por_backend.items():
+            campos = " ".join(f"{campo}={us}" for campo, us in r['us_por_campo'].items())
+            linea = (
+                f"{tienda:<12}{backend:<8}{r['productos_por_segundo']:>13,.0f}"
+                f"{r['memoria_pico_kb']:>10,.0f}{r['kb_por_producto'] or 0:>9.1f}  {campos}"
+            )
+            previo = (anterior or {}).get(tienda, {}).get(backend)
+            if previo:
+                variacion = r['productos_por_segundo'] / previo['productos_por_segundo'] - 1
+                linea += f"  ({variacion:+.1%})"
+            print(linea)
+
+
+def main():
+    parser_args = argparse.ArgumentParser(description="Benchmark offline de los scrapers")
+    parser_args.add_argument("--backend", choices=list(BACKENDS), action="append",
+                             help="backend a medir (por defecto todos)")
+    parser_args.add_argument("--repeticiones", type=int, default=20)
+    parser_args.add_argument("--salida", help="archivo JSON (por defecto benchmarks/resultados/<commit>.json)")
+    parser_args.add_argument("--comparar", help="JSON de otro commit para comparar")
+    args = parser_args.parse_args()
+
+    logging.disable(logging.WARNING)
+    commit = commit_actual()
+    resultados = ejecutar(args.backend or list(BACKENDS), args.repeticiones)
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            previo = json.load(f)
+        anterior = previo['resultados']
+        print(f"Comparando {commit} contra {previo['commit']}")
+    imprimir(resultados, anterior)
+
+    salida = args.salida or os.path.join(RESULTADOS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump({
+            'commit': commit,
+            'fecha': datetime.now().isoformat(timespec="seconds"),
+            'python': platform.python_version(),
+            'repeticiones': args.repeticiones,
+            'resultados': resultados
+        }, f, indent=2, ensure_ascii=False)
+    print(f"💾 Resultados guardados en {salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark de serialización - Listados con la ruta normal vs RespuestaRapida
+
+Uso:
+    py -m benchmarks.serializacion
+    py -m benchmarks.serializacion --filas 100 1000 5000 --repeticiones 200
+
+Llama a la app real en proceso (httpx + ASGI) con la base simulada y compara,
+para /productos/?limit=N y /productos/{id}/historico (un año diario, 3 tiendas):
+
+    - normal: dict por fila, validación contra el response_model y jsonable_encoder
+    - rápida: API_SERIALIZACION_RAPIDA (tuplas, sin validar, orjson si está instalado)
+
+Reporta ms por request (p50) y el tamaño de la respuesta sin y con gzip.
+"""
+import sys
+sys.path.append('.')
+
+import argparse
+import asyncio
+import gzip
+import json
+import statistics
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import httpx
+
+import api.routes.productos as productos
+from api import respuestas
+from api.main import app
+
+TIENDAS = ["Wong", "Metro", "Plaza Vea"]
+COLUMNAS_PRODUCTO = ["id", "nombre", "descripcion", "url_imagen", "marca", "categoria",
+                     "fecha_creacion", "ultima_actualizacion"]
+
+
+def filas_productos(n):
+    ahora = datetime(2024, 6, 1, 10, 30)
+    return [
+        (100000 - i, f"Leche Gloria Entera {i} 1L", "Leche evaporada entera en caja de 1 litro",
+         f"https://wong.vtexassets.com/arquivos/ids/{i}.jpg", "Gloria", "Lácteos", ahora, ahora)
+        for i in range(n)
+    ]
+
+
+def intervalos_historico(dias):
+    """Un cambio de precio cada 3 días por tienda"""
+    hoy = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    intervalos = []
+    for t, tienda in enumerate(TIENDAS):
+        for inicio in range(dias, 0, -3):
+            intervalos.append({
+                'fecha': hoy - timedelta(days=inicio),
+                'fecha_hasta': hoy - timedelta(days=max(inicio - 3, 0)) - timedelta(seconds=1),
+                'precio': Decimal("4.50") + Decimal(t) / 10 + Decimal(inicio % 7) / 100,
+                'tienda': tienda,
+            })
+    return intervalos
+
+
+def simular_base(filas):
+    async def execute_query_async(query, params=None, fetchall=False, fetchtuplas=False, **kwargs):
+        if "vw_precios_historial" in query:
+            return intervalos_historico(365)
+        limite = params[-1]
+        if fetchtuplas:
+            return COLUMNAS_PRODUCTO, filas[:limite]
+        return [dict(zip(COLUMNAS_PRODUCTO, fila)) for fila in filas[:limite]]
+
+    productos.execute_query_async = execute_query_async
+
+
+async def medir(ruta, repeticiones):
+    tiempos = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as cliente:
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            respuesta = await cliente.get(ruta, headers={"Accept-Encoding": "identity"})
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            respuesta.raise_for_status()
+    return statistics.median(tiempos), respuesta.content
+
+
+def main():
+    parser_args = argparse.ArgumentParser(description="Benchmark de serialización de listados")
+    parser_args.add_argument("--filas", type=int, nargs="+", default=[100, 1000])
+    parser_args.add_argument("--repeticiones", type=int, default=100)
+    args = parser_args.parse_args()
+
+    simular_base(filas_productos(max(args.filas)))
+    rutas = [f"/productos/?limit={n}" for n in args.filas] + ["/productos/1/historico?dias=365"]
+
+    print(f"Serializador rápido: {'orjson' if respuestas.orjson else 'json (orjson no instalado)'}")
+    for ruta in rutas:
+        resultados = {}
+        for modo, rapida in (("normal", False), ("rápida", True)):
+            productos.API_SERIALIZACION_RAPIDA = rapida
+            resultados[modo] = asyncio.run(medir(ruta, args.repeticiones))
+
+        (ms_normal, cuerpo), (ms_rapida, cuerpo_rapido) = resultados["normal"], resultados["rápida"]
+        igual = "igual" if json.loads(cuerpo_rapido) == json.loads(cuerpo) else "DISTINTO"
+        print(f"  {ruta:<36} normal {ms_normal:7.2f} ms | rápida {ms_rapida:7.2f} ms "
+              f"(x{ms_normal / ms_rapida:.1f}) | {len(cuerpo) / 1024:7.1f} KB, "
+              f"gzip {len(gzip.compress(cuerpo)) / 1024:6.1f} KB | JSON {igual}")
+
+
+if __name__ == "__main__":
+    main()
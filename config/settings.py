@@ -17,15 +17,120 @@ DATABASE_URL = (
     f"Trusted_Connection={DB_TRUSTED_CONNECTION};"
 )
 
+# Pool de conexiones de la API (segundos para espera, inactividad y verificación)
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "2"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+DB_POOL_ESPERA = float(os.getenv("DB_POOL_ESPERA", "10"))
+DB_POOL_INACTIVIDAD = float(os.getenv("DB_POOL_INACTIVIDAD", "300"))
+DB_POOL_VERIFICAR_SEG = float(os.getenv("DB_POOL_VERIFICAR_SEG", "30"))
+# Timeout por consulta de la API (segundos, 0 = sin límite) y cada cuánto revisar si el cliente se fue
+DB_QUERY_TIMEOUT = float(os.getenv("DB_QUERY_TIMEOUT", "30"))
+DB_DESCONEXION_SEG = float(os.getenv("DB_DESCONEXION_SEG", "0.5"))
+
 # Scraping
 SCRAPING_DELAY = int(os.getenv("SCRAPING_DELAY", "8"))
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
 TIMEOUT = int(os.getenv("TIMEOUT", "30"))
 
+# Backend de obtención: "selenium" (HTML renderizado) o "api" (catálogo JSON VTEX con respaldo Selenium)
+FETCH_BACKEND = os.getenv("FETCH_BACKEND", "selenium")
+VTEX_PAGE_SIZE = int(os.getenv("VTEX_PAGE_SIZE", "50"))  # máximo permitido por VTEX
+VTEX_MAX_PRODUCTOS = int(os.getenv("VTEX_MAX_PRODUCTOS", "2500"))  # VTEX no pagina más allá de _from=2500
+VTEX_MAX_CONEXIONES = int(os.getenv("VTEX_MAX_CONEXIONES", "10"))
+VTEX_CONCURRENCIA = int(os.getenv("VTEX_CONCURRENCIA", "5"))
+
+# Espera por condición: la página está lista cuando el conteo de productos se estabiliza
+READINESS_TIMEOUT = float(os.getenv("READINESS_TIMEOUT", "15"))
+READINESS_INTERVALO = float(os.getenv("READINESS_INTERVALO", "0.25"))
+READINESS_ESTABLE = float(os.getenv("READINESS_ESTABLE", "1.0"))
+
+# Recorrido completo de categorías (scroll infinito / paginación)
+CRAWLER_MAX_TANDAS = int(os.getenv("CRAWLER_MAX_TANDAS", "200"))
+CRAWLER_TIMEOUT_TANDA = float(os.getenv("CRAWLER_TIMEOUT_TANDA", "5"))
+
+# Parser de tarjetas de productos: "lxml" (rápido, requiere lxml + cssselect) o "bs4"
+PARSER_BACKEND = os.getenv("PARSER_BACKEND", "lxml")
+
+# Ingesta masiva: staging con fast_executemany + sp_ingesta_lote (False = un EXEC por producto)
+INGESTA_MASIVA = os.getenv("INGESTA_MASIVA", "True").lower() == "true"
+INGESTA_LOTE = int(os.getenv("INGESTA_LOTE", "1000"))
+# Intervalos de precios: días sin observar un producto tras los que se abre un intervalo nuevo
+PRECIOS_MAX_HUECO_DIAS = int(os.getenv("PRECIOS_MAX_HUECO_DIAS", "7"))
+# Meses que quedan en precios (rowstore); los anteriores se archivan en columnstore
+PRECIOS_MESES_ACTIVOS = int(os.getenv("PRECIOS_MESES_ACTIVOS", "2"))
+# Retención: días con intervalos completos; luego resúmenes semanales y, tras la segunda, mensuales
+PRECIOS_RETENCION_DIAS = int(os.getenv("PRECIOS_RETENCION_DIAS", "365"))
+PRECIOS_RETENCION_SEMANAL_DIAS = int(os.getenv("PRECIOS_RETENCION_SEMANAL_DIAS", "1095"))
+# Precargar nombre/sku -> id de todos los productos al conectar (tiendas, categorías y marcas siempre)
+IDENTIDADES_PRECARGA = os.getenv("IDENTIDADES_PRECARGA", "True").lower() == "true"
+
+# Orquestación paralela de scrapers
+SCRAPER_POOL = os.getenv("SCRAPER_POOL", "thread")  # thread | process
+SCRAPER_CONCURRENCIA_TIENDA = int(os.getenv("SCRAPER_CONCURRENCIA_TIENDA", "2"))
+# Límites por tienda, formato: "Wong=2,Metro=1,Plaza Vea=1"
+SCRAPER_CONCURRENCIA_POR_TIENDA = {
+    nombre.strip(): int(valor)
+    for nombre, valor in (
+        item.split("=", 1)
+        for item in os.getenv("SCRAPER_CONCURRENCIA_POR_TIENDA", "").split(",")
+        if "=" in item
+    )
+}
+
+# Pool de navegadores compartido entre categorías y tiendas
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "4"))
+BROWSER_POOL_MAX_PAGINAS = int(os.getenv("BROWSER_POOL_MAX_PAGINAS", "50"))
+BROWSER_POOL_ESPERA = int(os.getenv("BROWSER_POOL_ESPERA", "300"))
+
+# Perfil del navegador: "completo" (con ventana, carga todo) o "ligero" (headless, sin recursos pesados)
+BROWSER_PERFIL = os.getenv("BROWSER_PERFIL", "completo")
+BROWSER_VIEWPORT = os.getenv("BROWSER_VIEWPORT", "1280,900")
+BROWSER_CACHE_DIR = os.getenv("BROWSER_CACHE_DIR", os.path.join(".cache", "chrome"))
+
+# Patrones bloqueados en el perfil ligero (Network.setBlockedURLs)
+BROWSER_URLS_BLOQUEADAS = [
+    # Imágenes
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    # Media
+    "*.mp4", "*.webm", "*.mp3", "*.m3u8",
+    # Fuentes
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*fonts.googleapis.com*", "*fonts.gstatic.com*",
+    # Terceros: analítica, publicidad y tracking
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*googlesyndication.com*", "*facebook.net*", "*facebook.com/tr*", "*hotjar.com*",
+    "*clarity.ms*", "*criteo.com*", "*criteo.net*", "*tiktok.com*", "*analytics.tiktok.com*",
+    "*newrelic.com*", "*nr-data.net*", "*onesignal.com*", "*youtube.com*",
+]
+
 # API
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
 API_PORT = int(os.getenv("API_PORT", "8000"))
 API_RELOAD = os.getenv("API_RELOAD", "True").lower() == "true"
+# Tamaño máximo de página de /productos/ (consumidores masivos paginan con cursor)
+PRODUCTOS_PAGINA_MAX = int(os.getenv("PRODUCTOS_PAGINA_MAX", "1000"))
+# Ids por request en /productos/lote y /productos/lote/comparar
+PRODUCTOS_LOTE_MAX = int(os.getenv("PRODUCTOS_LOTE_MAX", "5000"))
+# Listados (/productos/, /historico) serializados con orjson sin validar cada fila contra el modelo
+API_SERIALIZACION_RAPIDA = os.getenv("API_SERIALIZACION_RAPIDA", "False").lower() == "true"
+# Respuestas más grandes que esto (bytes) van comprimidas con gzip si el cliente lo acepta
+API_GZIP_MIN_BYTES = int(os.getenv("API_GZIP_MIN_BYTES", "1000"))
+# Filas por bloque (fetchmany) en las exportaciones en streaming de /exportar
+EXPORT_LOTE_FILAS = int(os.getenv("EXPORT_LOTE_FILAS", "5000"))
+# Canal en vivo (/eventos, SSE): lectura de eventos_precio, keep-alive y cola por cliente
+EVENTOS_REVISION_SEG = float(os.getenv("EVENTOS_REVISION_SEG", "2"))
+EVENTOS_PING_SEG = float(os.getenv("EVENTOS_PING_SEG", "15"))
+EVENTOS_COLA_MAX = int(os.getenv("EVENTOS_COLA_MAX", "100"))
+EVENTOS_RETENCION_HORAS = int(os.getenv("EVENTOS_RETENCION_HORAS", "24"))
+# Segundos que el lector vuelve a revisar detrás del último id por transacciones que confirman tarde
+EVENTOS_GRACIA_SEG = float(os.getenv("EVENTOS_GRACIA_SEG", "30"))
+# Caché de respuestas de lectura (se invalida con version_datos; Redis opcional para varios workers)
+CACHE_HABILITADO = os.getenv("CACHE_HABILITADO", "True").lower() == "true"
+CACHE_MAX_ENTRADAS = int(os.getenv("CACHE_MAX_ENTRADAS", "2000"))
+CACHE_TTL_SEG = float(os.getenv("CACHE_TTL_SEG", "3600"))
+CACHE_VERSION_SEG = float(os.getenv("CACHE_VERSION_SEG", "5"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "")
+# Búsqueda: cada cuántos segundos revisar si hubo un scraping nuevo para reconstruir el índice
+BUSQUEDA_REVISION_SEG = float(os.getenv("BUSQUEDA_REVISION_SEG", "30"))
 
 # Email (para alertas)
 SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
@@ -9,12 +9,59 @@ const app = {
     categorias: [],
     marcas: [],
 
+    eventos: null,
+    recargaTimer: null,
+
     // Initialize
     async init() {
         await this.loadStats();
         await this.loadCategorias();
         await this.loadMarcas();
         await this.loadProductos();
+        this.connectEventos();
+    },
+
+    // Live price updates (Server-Sent Events) instead of polling
+    connectEventos() {
+        if (!window.EventSource) {
+            return;
+        }
+        if (this.eventos) {
+            this.eventos.close();
+        }
+
+        // Con una categoría filtrada solo llegan sus cambios (y los fines de scraping)
+        const categoria = document.getElementById('categoriaFilter').value;
+        const url = categoria
+            ? `${API_BASE}/eventos/?categoria=${encodeURIComponent(categoria)}`
+            : `${API_BASE}/eventos/`;
+        this.eventos = new EventSource(url);
+
+        this.eventos.addEventListener('precio', (event) => {
+            const cambio = JSON.parse(event.data);
+            if (this.productos.some(producto => producto.id === cambio.producto_id)) {
+                const anterior = cambio.precio_anterior ? ` (antes S/ ${cambio.precio_anterior.toFixed(2)})` : '';
+                this.showInfo(`${cambio.producto} en ${cambio.tienda}: S/ ${cambio.precio.toFixed(2)}${anterior}`);
+            }
+        });
+
+        this.eventos.addEventListener('scraping', (event) => {
+            const fin = JSON.parse(event.data);
+            this.showInfo(`Scraping de ${fin.tienda} terminado: ${fin.cantidad || 0} precios nuevos`);
+            this.scheduleRecarga();
+        });
+
+        // Se perdieron eventos (conexión lenta): recargar lo que se muestra
+        this.eventos.addEventListener('resync', () => this.scheduleRecarga());
+    },
+
+    // Reload stats and products once after a burst of events
+    scheduleRecarga() {
+        clearTimeout(this.recargaTimer);
+        this.recargaTimer = setTimeout(() => {
+            this.loadStats();
+            this.loadProductos();
+        }, 1000);
     },
 
     // Load Statistics
@@ -76,8 +123,10 @@ const app = {
         const categoria = document.getElementById('categoriaFilter').value;
         const marca = document.getElementById('marcaFilter').value;
 
-        let url = `${API_BASE}/productos/?limit=50`;
-        if (searchTerm) url += `&buscar=${encodeURIComponent(searchTerm)}`;
+        // Con texto se usa el índice de búsqueda (ordenado por relevancia)
+        let url = searchTerm
+            ? `${API_BASE}/productos/buscar?q=${encodeURIComponent(searchTerm)}&limit=50`
+            : `${API_BASE}/productos/?limit=50`;
         if (categoria) url += `&categoria=${encodeURIComponent(categoria)}`;
         if (marca) url += `&marca=${encodeURIComponent(marca)}`;
 
@@ -126,17 +175,20 @@ const app = {
         return '0.00'; // Will be replaced when API returns price
     },
 
+    // Load Product Detail (producto, precios, histórico y comparación en un request)
+    async loadDetalle(productoId) {
+        const response = await fetch(`${API_BASE}/productos/${productoId}/detalle?dias=30`);
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        return response.json();
+    },
+
     // View Product Detail
     async viewProductDetail(productoId) {
         try {
-            const response = await fetch(`${API_BASE}/productos/${productoId}`);
-            const producto = await response.json();
-
-            // Get price history
-            const historyResponse = await fetch(`${API_BASE}/productos/${productoId}/historico?dias=30`);
-            const history = await historyResponse.json();
-
-            this.showProductModal(producto, history);
+            const detalle = await this.loadDetalle(productoId);
+            this.showProductModal(detalle, detalle.historico);
         } catch (error) {
             console.error('Error loading product detail:', error);
             this.showError('Error cargando detalle del producto');
@@ -146,10 +198,11 @@ const app = {
     // Compare Product
     async compareProduct(productoId) {
         try {
-            const response = await fetch(`${API_BASE}/productos/${productoId}/comparar`);
-            const comparacion = await response.json();
-
-            this.showComparisonModal(comparacion);
+            const detalle = await this.loadDetalle(productoId);
+            if (!detalle.comparacion) {
+                throw new Error('Sin precios para comparar');
+            }
+            this.showComparisonModal(detalle.comparacion);
         } catch (error) {
             console.error('Error loading comparison:', error);
             this.showError('Error cargando comparación');
@@ -316,6 +369,16 @@ const app = {
 // Initialize app when DOM is loaded
 document.addEventListener('DOMContentLoaded', () => {
     app.init();
+
+    // Buscar mientras se escribe, esperando una pausa entre teclas
+    let searchTimer;
+    document.getElementById('searchInput').addEventListener('input', () => {
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(() => app.loadProductos(), 250);
+    });
+
+    // El canal en vivo sigue a la categoría elegida
+    document.getElementById('categoriaFilter').addEventListener('change', () => app.connectEventos());
 });
 
 // Modal styling
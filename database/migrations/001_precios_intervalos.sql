@@ -0,0 +1,87 @@
+-- =============================
+-- MIGRACIÓN 001: PRECIOS COMO INTERVALOS
+-- =============================
+-- Convierte las fotos diarias de `precios` en intervalos [fecha, fecha_hasta]:
+-- los días consecutivos con el mismo precio (dentro del mismo mes y sin huecos
+-- de más de 7 días) se funden en la primera fila del tramo.
+--
+-- Ejecutar una sola vez sobre una base creada antes de los intervalos y luego
+-- volver a ejecutar database/schema.sql (vistas, calendario y procedimientos):
+--     sqlcmd -S "localhost\SQLEXPRESS" -i database/migrations/001_precios_intervalos.sql
+--     sqlcmd -S "localhost\SQLEXPRESS" -i database/schema.sql
+
+USE ScrapingWong;
+GO
+
+IF COL_LENGTH('precios', 'fecha_hasta') IS NULL
+BEGIN
+    ALTER TABLE precios ADD fecha_hasta DATETIME NULL;
+END
+GO
+
+SET XACT_ABORT ON;
+BEGIN TRANSACTION;
+
+UPDATE precios SET fecha_hasta = fecha WHERE fecha_hasta IS NULL;
+
+-- Islas de observaciones consecutivas con el mismo precio
+WITH observaciones AS (
+    SELECT
+        id, producto_id, tienda_id, precio, fecha,
+        LAG(precio) OVER (PARTITION BY producto_id, tienda_id ORDER BY fecha) AS precio_previo,
+        LAG(fecha) OVER (PARTITION BY producto_id, tienda_id ORDER BY fecha) AS fecha_previa
+    FROM precios
+),
+cortes AS (
+    SELECT *,
+        CASE
+            WHEN precio_previo IS NULL
+              OR precio_previo <> precio
+              OR DATEDIFF(day, fecha_previa, fecha) > 7
+              OR DATEDIFF(month, fecha_previa, fecha) <> 0
+            THEN 1 ELSE 0
+        END AS inicia_intervalo
+    FROM observaciones
+),
+islas AS (
+    SELECT *,
+        SUM(inicia_intervalo) OVER (
+            PARTITION BY producto_id, tienda_id ORDER BY fecha ROWS UNBOUNDED PRECEDING
+        ) AS isla
+    FROM cortes
+),
+limites AS (
+    SELECT
+        id,
+        FIRST_VALUE(id) OVER (PARTITION BY producto_id, tienda_id, isla ORDER BY fecha) AS id_intervalo,
+        MAX(fecha) OVER (PARTITION BY producto_id, tienda_id, isla) AS hasta
+    FROM islas
+)
+SELECT id, id_intervalo, hasta
+INTO #limites
+FROM limites;
+
+UPDATE pr SET fecha_hasta = l.hasta
+FROM precios pr
+INNER JOIN #limites l ON l.id = pr.id AND l.id = l.id_intervalo;
+
+DELETE pr
+FROM precios pr
+INNER JOIN #limites l ON l.id = pr.id AND l.id <> l.id_intervalo;
+
+COMMIT TRANSACTION;
+DROP TABLE #limites;
+GO
+
+ALTER TABLE precios ALTER COLUMN fecha_hasta DATETIME NOT NULL;
+GO
+
+IF NOT EXISTS (
+    SELECT * FROM sys.default_constraints
+    WHERE parent_object_id = OBJECT_ID('precios') AND COL_NAME(parent_object_id, parent_column_id) = 'fecha_hasta'
+)
+    ALTER TABLE precios ADD DEFAULT GETDATE() FOR fecha_hasta;
+GO
+
+PRINT 'Migración 001: precios convertidos a intervalos.';
+GO
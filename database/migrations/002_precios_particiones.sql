@@ -0,0 +1,68 @@
+-- =============================
+-- MIGRACIÓN 002: PARTICIONES MENSUALES DE PRECIOS
+-- =============================
+-- Reconstruye los índices de `precios` sobre el esquema de particiones mensual
+-- ps_precios_mes (clave primaria no agrupada en (id, fecha), índice agrupado por fecha).
+-- Requiere la migración 001 (los intervalos no cruzan de mes).
+--
+--     sqlcmd -S "localhost\SQLEXPRESS" -i database/migrations/002_precios_particiones.sql
+--     sqlcmd -S "localhost\SQLEXPRESS" -i database/schema.sql
+--     sqlcmd -S "localhost\SQLEXPRESS" -d ScrapingWong -Q "EXEC sp_archivar_precios"
+--
+-- El último paso mueve los meses cerrados a precios_archivo (columnstore).
+
+USE ScrapingWong;
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.partition_functions WHERE name = 'pf_precios_mes')
+BEGIN
+    DECLARE @limites NVARCHAR(MAX) = N'';
+    DECLARE @mes DATE = '2020-01-01';
+    DECLARE @ultimo DATE = DATEADD(month, 3, DATEFROMPARTS(YEAR(GETDATE()), MONTH(GETDATE()), 1));
+    
+    WHILE @mes <= @ultimo
+    BEGIN
+        SET @limites += CASE WHEN @limites = N'' THEN N'' ELSE N', ' END
+                      + N'''' + CONVERT(NCHAR(8), @mes, 112) + N'''';
+        SET @mes = DATEADD(month, 1, @mes);
+    END
+    
+    EXEC (N'CREATE PARTITION FUNCTION pf_precios_mes (DATETIME) AS RANGE RIGHT FOR VALUES (' + @limites + N')');
+END
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.partition_schemes WHERE name = 'ps_precios_mes')
+    CREATE PARTITION SCHEME ps_precios_mes AS PARTITION pf_precios_mes ALL TO ([PRIMARY]);
+GO
+
+-- Solo si precios todavía no está particionada
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes i
+    INNER JOIN sys.partition_schemes ps ON ps.data_space_id = i.data_space_id
+    WHERE i.object_id = OBJECT_ID('precios') AND i.index_id IN (0, 1)
+)
+BEGIN
+    SET XACT_ABORT ON;
+    BEGIN TRANSACTION;
+    
+    DECLARE @pk SYSNAME = (
+        SELECT name FROM sys.key_constraints WHERE parent_object_id = OBJECT_ID('precios') AND type = 'PK'
+    );
+    IF @pk IS NOT NULL
+        EXEC (N'ALTER TABLE precios DROP CONSTRAINT ' + @pk);
+    
+    IF EXISTS (SELECT * FROM sys.indexes WHERE object_id = OBJECT_ID('precios') AND name = 'IX_precios_producto_tienda_fecha')
+        DROP INDEX IX_precios_producto_tienda_fecha ON precios;
+    IF EXISTS (SELECT * FROM sys.indexes WHERE object_id = OBJECT_ID('precios') AND name = 'UX_precio_producto_tienda_fecha')
+        DROP INDEX UX_precio_producto_tienda_fecha ON precios;
+    
+    CREATE CLUSTERED INDEX CX_precios_fecha ON precios(fecha, producto_id, tienda_id) ON ps_precios_mes(fecha);
+    ALTER TABLE precios ADD CONSTRAINT PK_precios PRIMARY KEY NONCLUSTERED (id, fecha) ON ps_precios_mes(fecha);
+    CREATE INDEX IX_precios_producto_tienda_fecha ON precios(producto_id, tienda_id, fecha DESC) ON ps_precios_mes(fecha);
+    
+    COMMIT TRANSACTION;
+END
+GO
+
+PRINT 'Migración 002: precios particionada por mes.';
+GO
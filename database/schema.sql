@@ -79,6 +79,7 @@ BEGIN
         marca_id INT,
         categoria_id INT,
         sku VARCHAR(100),
+        huella CHAR(32), -- hash de los datos de catálogo; si no cambia no se actualiza la fila
         fecha_creacion DATETIME DEFAULT GETDATE(),
         ultima_actualizacion DATETIME DEFAULT GETDATE(),
         FOREIGN KEY (marca_id) REFERENCES marcas(id),
@@ -90,13 +91,51 @@ BEGIN
 END
 GO
 
+-- Bases creadas antes de la huella de catálogo
+IF COL_LENGTH('productos', 'huella') IS NULL
+    ALTER TABLE productos ADD huella CHAR(32);
+GO
+
+-- =============================
+-- PARTICIONES MENSUALES DE PRECIOS
+-- =============================
+-- precios y precios_archivo se particionan por mes de `fecha` (RANGE RIGHT: cada
+-- partición va del día 1 de un mes al día 1 del siguiente). Como un intervalo de
+-- precio nunca cruza de mes, cada fila queda entera dentro de su partición.
+-- sp_archivar_precios agrega los límites de los meses siguientes.
+IF NOT EXISTS (SELECT * FROM sys.partition_functions WHERE name = 'pf_precios_mes')
+BEGIN
+    DECLARE @limites NVARCHAR(MAX) = N'';
+    DECLARE @mes DATE = '2020-01-01';
+    DECLARE @ultimo DATE = DATEADD(month, 3, DATEFROMPARTS(YEAR(GETDATE()), MONTH(GETDATE()), 1));
+    
+    WHILE @mes <= @ultimo
+    BEGIN
+        SET @limites += CASE WHEN @limites = N'' THEN N'' ELSE N', ' END
+                      + N'''' + CONVERT(NCHAR(8), @mes, 112) + N'''';
+        SET @mes = DATEADD(month, 1, @mes);
+    END
+    
+    EXEC (N'CREATE PARTITION FUNCTION pf_precios_mes (DATETIME) AS RANGE RIGHT FOR VALUES (' + @limites + N')');
+END
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.partition_schemes WHERE name = 'ps_precios_mes')
+    CREATE PARTITION SCHEME ps_precios_mes AS PARTITION pf_precios_mes ALL TO ([PRIMARY]);
+GO
+
 -- =============================
 -- TABLA: PRECIOS
 -- =============================
+-- Cada fila es un intervalo en el que el precio no cambió: desde `fecha`
+-- (primera observación) hasta `fecha_hasta` (última observación). Una nueva
+-- observación con el mismo precio solo extiende fecha_hasta; ver sp_registrar_precio.
+-- Aquí quedan solo los meses recientes (rowstore); los meses cerrados se mueven
+-- a precios_archivo (columnstore) con sp_archivar_precios.
 IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'precios')
 BEGIN
     CREATE TABLE precios (
-        id INT IDENTITY(1,1) PRIMARY KEY,
+        id INT IDENTITY(1,1) NOT NULL,
         producto_id INT NOT NULL,
         tienda_id INT NOT NULL,
         precio DECIMAL(10,2) NOT NULL,
@@ -106,17 +145,149 @@ BEGIN
         num_reviews INT,
         descuento DECIMAL(5,2),
         url VARCHAR(MAX),
-        fecha DATETIME NOT NULL DEFAULT GETDATE(),
+        fecha DATETIME NOT NULL DEFAULT GETDATE(),       -- vigente desde
+        fecha_hasta DATETIME NOT NULL DEFAULT GETDATE(), -- vigente hasta (última observación)
+        -- Los índices únicos de una tabla particionada deben incluir la columna de partición
+        CONSTRAINT PK_precios PRIMARY KEY NONCLUSTERED (id, fecha) ON ps_precios_mes(fecha),
         FOREIGN KEY (producto_id) REFERENCES productos(id) ON DELETE CASCADE,
         FOREIGN KEY (tienda_id) REFERENCES tiendas(id)
-    );
+    ) ON ps_precios_mes(fecha);
+    
+    CREATE CLUSTERED INDEX CX_precios_fecha ON precios(fecha, producto_id, tienda_id) ON ps_precios_mes(fecha);
     
     -- Índice compuesto para consultas rápidas
-    CREATE INDEX IX_precios_producto_tienda_fecha ON precios(producto_id, tienda_id, fecha DESC);
+    CREATE INDEX IX_precios_producto_tienda_fecha ON precios(producto_id, tienda_id, fecha DESC) ON ps_precios_mes(fecha);
+END
+GO
+
+-- =============================
+-- TABLA: ARCHIVO DE PRECIOS
+-- =============================
+-- Meses cerrados de precios, misma estructura y particiones pero en columnstore
+-- (compresión por columna y eliminación de segmentos en rangos largos).
+-- No tiene claves foráneas: los productos eliminados no se borran del archivo.
+IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'precios_archivo')
+BEGIN
+    CREATE TABLE precios_archivo (
+        id INT IDENTITY(1,1) NOT NULL,
+        producto_id INT NOT NULL,
+        tienda_id INT NOT NULL,
+        precio DECIMAL(10,2) NOT NULL,
+        precio_anterior DECIMAL(10,2),
+        stock INT,
+        rating DECIMAL(3,2),
+        num_reviews INT,
+        descuento DECIMAL(5,2),
+        url VARCHAR(MAX),
+        fecha DATETIME NOT NULL,
+        fecha_hasta DATETIME NOT NULL
+    ) ON ps_precios_mes(fecha);
+    
+    CREATE CLUSTERED COLUMNSTORE INDEX CX_precios_archivo ON precios_archivo ON ps_precios_mes(fecha);
+END
+GO
+
+-- =============================
+-- TABLAS: PRECIOS COMPACTADOS
+-- =============================
+-- sp_compactar_precios resume los intervalos más antiguos que la retención en
+-- semanas y, más atrás, en meses. `dias` (días observados) y `fecha_ultimo`
+-- permiten combinar un periodo compactado en dos corridas.
+IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'precios_semanales')
+BEGIN
+    CREATE TABLE precios_semanales (
+        producto_id INT NOT NULL,
+        tienda_id INT NOT NULL,
+        semana DATE NOT NULL, -- lunes
+        precio_min DECIMAL(10,2) NOT NULL,
+        precio_max DECIMAL(10,2) NOT NULL,
+        precio_promedio DECIMAL(12,4) NOT NULL,
+        precio_ultimo DECIMAL(10,2) NOT NULL,
+        fecha_ultimo DATE NOT NULL,
+        dias INT NOT NULL,
+        PRIMARY KEY (producto_id, tienda_id, semana),
+        FOREIGN KEY (producto_id) REFERENCES productos(id) ON DELETE CASCADE,
+        FOREIGN KEY (tienda_id) REFERENCES tiendas(id)
+    );
+END
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'precios_mensuales')
+BEGIN
+    CREATE TABLE precios_mensuales (
+        producto_id INT NOT NULL,
+        tienda_id INT NOT NULL,
+        mes DATE NOT NULL, -- día 1
+        precio_min DECIMAL(10,2) NOT NULL,
+        precio_max DECIMAL(10,2) NOT NULL,
+        precio_promedio DECIMAL(12,4) NOT NULL,
+        precio_ultimo DECIMAL(10,2) NOT NULL,
+        fecha_ultimo DATE NOT NULL,
+        dias INT NOT NULL,
+        PRIMARY KEY (producto_id, tienda_id, mes),
+        FOREIGN KEY (producto_id) REFERENCES productos(id) ON DELETE CASCADE,
+        FOREIGN KEY (tienda_id) REFERENCES tiendas(id)
+    );
+END
+GO
+
+-- =============================
+-- TABLA: CALENDARIO
+-- =============================
+-- Un día por fila; las vistas la usan para expandir los intervalos de precios
+IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'calendario')
+BEGIN
+    CREATE TABLE calendario (
+        fecha DATE NOT NULL PRIMARY KEY
+    );
+    
+    WITH dias AS (
+        SELECT CAST('2020-01-01' AS DATE) AS fecha
+        UNION ALL
+        SELECT DATEADD(day, 1, fecha) FROM dias WHERE fecha < '2035-12-31'
+    )
+    INSERT INTO calendario (fecha)
+    SELECT fecha FROM dias
+    OPTION (MAXRECURSION 0);
+END
+GO
+
+-- =============================
+-- TABLA: PRECIOS ACTUALES
+-- =============================
+-- Último intervalo de cada producto por tienda, mantenido por sp_registrar_precio
+-- y sp_ingesta_lote en la misma transacción que escribe en precios. Las consultas
+-- de "precio actual" la leen con una búsqueda por clave en vez de buscar MAX(fecha).
+IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'precios_actuales')
+BEGIN
+    CREATE TABLE precios_actuales (
+        producto_id INT NOT NULL,
+        tienda_id INT NOT NULL,
+        precio_id INT NOT NULL,  -- intervalo vigente en precios
+        precio DECIMAL(10,2) NOT NULL,
+        precio_anterior DECIMAL(10,2),
+        stock INT,
+        rating DECIMAL(3,2),
+        descuento DECIMAL(5,2),
+        url VARCHAR(MAX),
+        vigente_desde DATETIME NOT NULL,
+        fecha_actualizacion DATETIME NOT NULL,
+        PRIMARY KEY (producto_id, tienda_id),
+        FOREIGN KEY (producto_id) REFERENCES productos(id) ON DELETE CASCADE,
+        FOREIGN KEY (tienda_id) REFERENCES tiendas(id)
+    );
+    
+    CREATE INDEX IX_precios_actuales_tienda ON precios_actuales(tienda_id) INCLUDE (precio);
     
-    -- Índice único para evitar duplicados en mismo día
-    CREATE UNIQUE INDEX UX_precio_producto_tienda_fecha 
-    ON precios (producto_id, tienda_id, CAST(fecha AS DATE));
+    -- Bases con histórico: cargar el último intervalo de cada producto y tienda
+    INSERT INTO precios_actuales (producto_id, tienda_id, precio_id, precio, precio_anterior, stock,
+                                  rating, descuento, url, vigente_desde, fecha_actualizacion)
+    SELECT producto_id, tienda_id, id, precio, precio_anterior, stock, rating, descuento, url, fecha, fecha_hasta
+    FROM (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY producto_id, tienda_id ORDER BY fecha DESC) AS rn
+        FROM precios
+    ) u
+    WHERE rn = 1;
 END
 GO
 
@@ -163,6 +334,82 @@ BEGIN
 END
 GO
 
+-- =============================
+-- TABLA: VERSIÓN DE LOS DATOS
+-- =============================
+-- Contador por ámbito que suben los procesos que escriben (scraping: 'catalogo',
+-- alertas: 'alertas'); la caché de la API descarta lo cacheado con versiones viejas
+IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'version_datos')
+BEGIN
+    CREATE TABLE version_datos (
+        ambito VARCHAR(30) PRIMARY KEY,
+        version BIGINT NOT NULL DEFAULT 0,
+        fecha_actualizacion DATETIME DEFAULT GETDATE()
+    );
+END
+GO
+
+INSERT INTO version_datos (ambito)
+SELECT v.ambito FROM (VALUES ('catalogo'), ('alertas')) v(ambito)
+WHERE NOT EXISTS (SELECT 1 FROM version_datos d WHERE d.ambito = v.ambito);
+GO
+
+-- =============================
+-- TABLA: EVENTOS DE PRECIO (OUTBOX)
+-- =============================
+-- La ingesta registra aquí cada cambio de precio (en la misma transacción) y
+-- cada scraping terminado; la API los lee por id creciente y los envía por SSE
+-- a los dashboards suscritos. Se purgan después de EVENTOS_RETENCION_HORAS.
+IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'eventos_precio')
+BEGIN
+    CREATE TABLE eventos_precio (
+        id BIGINT IDENTITY(1,1) PRIMARY KEY,
+        tipo VARCHAR(20) NOT NULL,  -- precio | scraping
+        producto_id INT NULL,
+        categoria_id INT NULL,
+        tienda_id INT NULL,
+        precio DECIMAL(10,2) NULL,
+        precio_anterior DECIMAL(10,2) NULL,
+        cantidad INT NULL,          -- scraping: precios nuevos registrados
+        fecha DATETIME NOT NULL DEFAULT GETDATE()
+    );
+    CREATE INDEX IX_eventos_precio_fecha ON eventos_precio(fecha);
+END
+GO
+
+-- =============================
+-- TABLA: STAGING DE INGESTA MASIVA
+-- =============================
+-- Cada lote de productos se carga aquí con fast_executemany y
+-- sp_ingesta_lote lo procesa y elimina
+IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'staging_productos')
+BEGIN
+    CREATE TABLE staging_productos (
+        lote_id UNIQUEIDENTIFIER NOT NULL,
+        fila INT NOT NULL,
+        nombre VARCHAR(500) NOT NULL,
+        descripcion VARCHAR(4000),
+        url_imagen VARCHAR(2000),
+        marca VARCHAR(100),
+        sku VARCHAR(100),
+        precio DECIMAL(10,2) NOT NULL,
+        stock INT,
+        rating DECIMAL(3,2),
+        url VARCHAR(2000),
+        huella CHAR(32),
+        marca_id INT,     -- resuelto por el caché de identidades del scraper (NULL si no se conoce)
+        producto_id INT,  -- idem
+        fecha_carga DATETIME DEFAULT GETDATE()
+    );
+    
+    CREATE CLUSTERED INDEX IX_staging_productos_lote ON staging_productos(lote_id, fila);
+END
+GO
+
+IF COL_LENGTH('staging_productos', 'huella') IS NULL
+    ALTER TABLE staging_productos ADD huella CHAR(32);
+GO
+
 -- =============================
 -- VISTAS
 -- =============================
@@ -187,17 +434,13 @@ SELECT
     pr.rating,
     pr.descuento,
     pr.url,
-    pr.fecha as fecha_actualizacion
+    pr.vigente_desde,
+    pr.fecha_actualizacion
 FROM productos p
 LEFT JOIN marcas m ON p.marca_id = m.id
 LEFT JOIN categorias c ON p.categoria_id = c.id
-INNER JOIN precios pr ON p.id = pr.producto_id
-INNER JOIN tiendas t ON pr.tienda_id = t.id
-WHERE pr.fecha = (
-    SELECT MAX(fecha) 
-    FROM precios 
-    WHERE producto_id = p.id AND tienda_id = pr.tienda_id
-);
+INNER JOIN precios_actuales pr ON p.id = pr.producto_id
+INNER JOIN tiendas t ON pr.tienda_id = t.id;
 GO
 
 -- Vista: Comparación de precios entre tiendas
@@ -214,45 +457,60 @@ SELECT
     MAX(CASE WHEN t.nombre = 'Wong' THEN pr.precio END) as precio_wong,
     MAX(CASE WHEN t.nombre = 'Metro' THEN pr.precio END) as precio_metro,
     MAX(CASE WHEN t.nombre = 'Plaza Vea' THEN pr.precio END) as precio_plaza_vea,
-    (SELECT MIN(precio) FROM precios WHERE producto_id = p.id 
-     AND fecha = (SELECT MAX(fecha) FROM precios WHERE producto_id = p.id)) as precio_minimo,
-    (SELECT MAX(precio) FROM precios WHERE producto_id = p.id 
-     AND fecha = (SELECT MAX(fecha) FROM precios WHERE producto_id = p.id)) as precio_maximo
+    MIN(pr.precio) as precio_minimo,
+    MAX(pr.precio) as precio_maximo
 FROM productos p
 LEFT JOIN marcas m ON p.marca_id = m.id
 LEFT JOIN categorias c ON p.categoria_id = c.id
-LEFT JOIN precios pr ON p.id = pr.producto_id
-LEFT JOIN tiendas t ON pr.tienda_id = t.id
-WHERE pr.fecha = (SELECT MAX(fecha) FROM precios WHERE producto_id = p.id AND tienda_id = pr.tienda_id)
+INNER JOIN precios_actuales pr ON p.id = pr.producto_id
+INNER JOIN tiendas t ON pr.tienda_id = t.id
 GROUP BY p.id, p.nombre, m.nombre, c.nombre;
 GO
 
+-- Vista: Todos los intervalos de precio (meses recientes + archivo)
+-- Filtrar por `fecha` para que solo se lean las particiones del rango
+IF OBJECT_ID('vw_precios_historial', 'V') IS NOT NULL
+    DROP VIEW vw_precios_historial;
+GO
+
+CREATE VIEW vw_precios_historial AS
+SELECT id, producto_id, tienda_id, precio, precio_anterior, stock, rating, num_reviews, descuento, url,
+       fecha, fecha_hasta
+FROM precios
+UNION ALL
+SELECT id, producto_id, tienda_id, precio, precio_anterior, stock, rating, num_reviews, descuento, url,
+       fecha, fecha_hasta
+FROM precios_archivo;
+GO
+
 -- Vista: Histórico de precios con variación
 IF OBJECT_ID('vw_historico_precios', 'V') IS NOT NULL
     DROP VIEW vw_historico_precios;
 GO
 
 CREATE VIEW vw_historico_precios AS
+-- Un registro por día: cada intervalo se expande con la tabla calendario
 SELECT
     pr.id,
     p.nombre as producto,
     t.nombre as tienda,
     c.nombre as categoria,
     pr.precio,
-    pr.fecha,
+    CAST(cal.fecha AS DATETIME) as fecha,
     LAG(pr.precio) OVER (
         PARTITION BY pr.producto_id, pr.tienda_id
-        ORDER BY pr.fecha
+        ORDER BY cal.fecha
     ) AS precio_anterior_registro,
     ROUND(
         (
-            (pr.precio - LAG(pr.precio) OVER (PARTITION BY pr.producto_id, pr.tienda_id ORDER BY pr.fecha))
-            / NULLIF(LAG(pr.precio) OVER (PARTITION BY pr.producto_id, pr.tienda_id ORDER BY pr.fecha), 0)
+            (pr.precio - LAG(pr.precio) OVER (PARTITION BY pr.producto_id, pr.tienda_id ORDER BY cal.fecha))
+            / NULLIF(LAG(pr.precio) OVER (PARTITION BY pr.producto_id, pr.tienda_id ORDER BY cal.fecha), 0)
         ) * 100,
         2
     ) AS variacion_porcentual,
     pr.url
-FROM precios pr
+FROM vw_precios_historial pr
+INNER JOIN calendario cal ON cal.fecha BETWEEN CAST(pr.fecha AS DATE) AND CAST(pr.fecha_hasta AS DATE)
 INNER JOIN productos p ON pr.producto_id = p.id
 INNER JOIN tiendas t ON pr.tienda_id = t.id
 LEFT JOIN categorias c ON p.categoria_id = c.id;
@@ -272,19 +530,18 @@ SELECT
     p.id as producto_id,
     p.nombre as producto,
     m.nombre as marca,
-    (SELECT MIN(precio) 
-     FROM precios pr 
-     WHERE pr.producto_id = p.id 
-     AND pr.fecha = (SELECT MAX(fecha) FROM precios WHERE producto_id = p.id)) as precio_actual_minimo,
+    pa.precio_minimo as precio_actual_minimo,
     CASE 
-        WHEN (SELECT MIN(precio) FROM precios WHERE producto_id = p.id 
-              AND fecha = (SELECT MAX(fecha) FROM precios WHERE producto_id = p.id)) <= a.precio_objetivo 
+        WHEN pa.precio_minimo <= a.precio_objetivo 
         THEN 1 
         ELSE 0 
     END as objetivo_alcanzado
 FROM alertas a
 INNER JOIN productos p ON a.producto_id = p.id
 LEFT JOIN marcas m ON p.marca_id = m.id
+OUTER APPLY (
+    SELECT MIN(precio) AS precio_minimo FROM precios_actuales WHERE producto_id = p.id
+) pa
 WHERE a.activa = 1 AND a.notificado = 0;
 GO
 
@@ -304,7 +561,8 @@ CREATE PROCEDURE sp_upsert_producto
     @marca VARCHAR(100) = NULL,
     @categoria VARCHAR(100) = NULL,
     @sku VARCHAR(100) = NULL,
-    @producto_id INT OUTPUT
+    @producto_id INT OUTPUT,
+    @huella CHAR(32) = NULL
 AS
 BEGIN
     SET NOCOUNT ON;
@@ -337,22 +595,544 @@ BEGIN
     IF @producto_id IS NULL
     BEGIN
         -- Crear nuevo producto
-        INSERT INTO productos (nombre, descripcion, url_imagen, marca_id, categoria_id, sku)
-        VALUES (@nombre, @descripcion, @url_imagen, @marca_id, @categoria_id, @sku);
+        INSERT INTO productos (nombre, descripcion, url_imagen, marca_id, categoria_id, sku, huella)
+        VALUES (@nombre, @descripcion, @url_imagen, @marca_id, @categoria_id, @sku, @huella);
         SET @producto_id = SCOPE_IDENTITY();
     END
     ELSE
     BEGIN
-        -- Actualizar producto existente
+        -- Actualizar producto existente (solo si cambió su huella de catálogo)
         UPDATE productos 
         SET descripcion = COALESCE(@descripcion, descripcion),
             url_imagen = COALESCE(@url_imagen, url_imagen),
             marca_id = COALESCE(@marca_id, marca_id),
             categoria_id = COALESCE(@categoria_id, categoria_id),
             sku = COALESCE(@sku, sku),
+            huella = COALESCE(@huella, huella),
             ultima_actualizacion = GETDATE()
-        WHERE id = @producto_id;
+        WHERE id = @producto_id
+          AND (@huella IS NULL OR huella IS NULL OR huella <> @huella);
+    END
+END
+GO
+
+-- Procedimiento: Registrar una observación de precio
+-- Extiende el intervalo vigente si el precio no cambió; si cambió (o el intervalo
+-- es de otro mes o quedó cortado por más de @max_hueco_dias sin observaciones)
+-- abre uno nuevo. Retorna nuevo = 1 si se insertó un intervalo.
+IF OBJECT_ID('sp_registrar_precio', 'P') IS NOT NULL
+    DROP PROCEDURE sp_registrar_precio;
+GO
+
+CREATE PROCEDURE sp_registrar_precio
+    @producto_id INT,
+    @tienda_id INT,
+    @precio DECIMAL(10,2),
+    @stock INT = NULL,
+    @rating DECIMAL(3,2) = NULL,
+    @url VARCHAR(MAX) = NULL,
+    @max_hueco_dias INT = 7
+AS
+BEGIN
+    SET NOCOUNT ON;
+    SET XACT_ABORT ON;
+    
+    DECLARE @ahora DATETIME = GETDATE();
+    DECLARE @hoy DATE = CAST(@ahora AS DATE);
+    DECLARE @id INT = NULL;
+    DECLARE @vigente_desde DATETIME = NULL;
+    DECLARE @precio_vigente DECIMAL(10,2) = NULL;
+    DECLARE @hasta DATETIME = NULL;
+    DECLARE @nuevo BIT = 0;
+    
+    BEGIN TRANSACTION;
+    
+    -- El intervalo vigente sale de precios_actuales (puede estar ya archivado);
+    -- con su `fecha` (vigente_desde) las búsquedas en precios tocan una sola partición
+    SELECT @id = precio_id, @vigente_desde = vigente_desde, @precio_vigente = precio, @hasta = fecha_actualizacion
+    FROM precios_actuales WITH (UPDLOCK, HOLDLOCK)
+    WHERE producto_id = @producto_id AND tienda_id = @tienda_id;
+    
+    IF @id IS NOT NULL AND @hasta >= @hoy
+    BEGIN
+        -- Ya se observó hoy
+        COMMIT TRANSACTION;
+        SELECT 0 AS nuevo;
+        RETURN;
+    END
+    
+    IF @id IS NOT NULL
+       AND @precio_vigente = @precio
+       AND @hasta >= DATEADD(day, -@max_hueco_dias, @hoy)
+       AND DATEDIFF(month, @hasta, @ahora) = 0
+    BEGIN
+        UPDATE precios
+        SET fecha_hasta = @ahora, stock = @stock, rating = @rating, url = @url
+        WHERE id = @id AND fecha = @vigente_desde;
+        SET @nuevo = 0;
+    END
+    ELSE
+    BEGIN
+        INSERT INTO precios (producto_id, tienda_id, precio, precio_anterior, stock, rating, url, fecha, fecha_hasta)
+        VALUES (@producto_id, @tienda_id, @precio, @precio_vigente, @stock, @rating, @url, @ahora, @ahora);
+        SET @id = SCOPE_IDENTITY();
+        SET @vigente_desde = @ahora;
+        
+        -- Solo un precio distinto (o el primero en la tienda) es nuevo y va al canal en vivo;
+        -- reabrir el mismo precio por cambio de mes o por un hueco no lo es
+        IF @precio_vigente IS NULL OR @precio_vigente <> @precio
+            SET @nuevo = 1;
+        
+        IF @nuevo = 1
+            INSERT INTO eventos_precio (tipo, producto_id, categoria_id, tienda_id, precio, precio_anterior)
+            SELECT 'precio', @producto_id, categoria_id, @tienda_id, @precio, @precio_vigente
+            FROM productos WHERE id = @producto_id;
+    END
+    
+    -- Precio actual del producto en la tienda = intervalo recién escrito
+    MERGE precios_actuales WITH (HOLDLOCK) AS t
+    USING (SELECT * FROM precios WHERE id = @id AND fecha = @vigente_desde) AS s
+    ON t.producto_id = s.producto_id AND t.tienda_id = s.tienda_id
+    WHEN MATCHED THEN
+        UPDATE SET precio_id = s.id, precio = s.precio, precio_anterior = s.precio_anterior, stock = s.stock,
+                   rating = s.rating, descuento = s.descuento, url = s.url,
+                   vigente_desde = s.fecha, fecha_actualizacion = s.fecha_hasta
+    WHEN NOT MATCHED THEN
+        INSERT (producto_id, tienda_id, precio_id, precio, precio_anterior, stock, rating, descuento, url,
+                vigente_desde, fecha_actualizacion)
+        VALUES (s.producto_id, s.tienda_id, s.id, s.precio, s.precio_anterior, s.stock, s.rating, s.descuento,
+                s.url, s.fecha, s.fecha_hasta);
+    
+    COMMIT TRANSACTION;
+    SELECT @nuevo AS nuevo;
+END
+GO
+
+-- Procedimiento: Ingesta masiva de un lote de staging_productos
+-- Resuelve marcas, productos y precios del lote con sentencias basadas en conjuntos
+IF OBJECT_ID('sp_ingesta_lote', 'P') IS NOT NULL
+    DROP PROCEDURE sp_ingesta_lote;
+GO
+
+CREATE PROCEDURE sp_ingesta_lote
+    @lote_id UNIQUEIDENTIFIER,
+    @tienda_id INT,
+    @categoria VARCHAR(100) = NULL,
+    @max_hueco_dias INT = 7
+AS
+BEGIN
+    SET NOCOUNT ON;
+    SET XACT_ABORT ON;
+    
+    DECLARE @categoria_id INT = NULL;
+    DECLARE @nuevos INT = 0;
+    DECLARE @total INT = 0;
+    DECLARE @ahora DATETIME = GETDATE();
+    DECLARE @hoy DATE = CAST(@ahora AS DATE);
+    DECLARE @resultado TABLE (producto_id INT, nombre VARCHAR(500), accion NVARCHAR(10));
+    DECLARE @marcas_resueltas TABLE (marca_id INT, nombre VARCHAR(100));
+    DECLARE @intervalos_nuevos TABLE (precio_id INT, producto_id INT);
+    DECLARE @descartados TABLE (nombre VARCHAR(500));
+    
+    IF @categoria IS NOT NULL
+        SELECT @categoria_id = id FROM categorias WHERE nombre = @categoria;
+    
+    -- Una fila por nombre (si se repite en el lote, gana la última extraída)
+    -- Los IDs que el scraper ya conocía llegan resueltos; solo se buscan los faltantes
+    SELECT fila, nombre, descripcion, url_imagen, marca, sku, precio, stock, rating, url, huella,
+           marca_id, producto_id,
+           CAST(CASE WHEN producto_id IS NULL THEN 1 ELSE 0 END AS BIT) AS resuelto_bd,
+           CAST(NULL AS INT) AS intervalo_id,
+           CAST(NULL AS DATETIME) AS vigente_desde,
+           CAST(NULL AS DECIMAL(10,2)) AS precio_vigente,
+           CAST(NULL AS DATETIME) AS vigente_hasta
+    INTO #lote
+    FROM (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY nombre ORDER BY fila DESC) AS rn
+        FROM staging_productos
+        WHERE lote_id = @lote_id
+    ) s
+    WHERE rn = 1;
+    
+    BEGIN TRANSACTION;
+    
+    -- Crear las marcas que no existen
+    MERGE marcas WITH (HOLDLOCK) AS t
+    USING (SELECT DISTINCT marca FROM #lote WHERE marca IS NOT NULL AND marca_id IS NULL) AS s
+    ON t.nombre = s.marca
+    WHEN NOT MATCHED THEN
+        INSERT (nombre) VALUES (s.marca);
+    
+    UPDATE l SET marca_id = m.id
+    OUTPUT inserted.marca_id, inserted.marca INTO @marcas_resueltas
+    FROM #lote l
+    INNER JOIN marcas m ON m.nombre = l.marca
+    WHERE l.marca_id IS NULL;
+    
+    -- Buscar productos existentes por nombre o SKU (mismo criterio que sp_upsert_producto)
+    UPDATE l SET producto_id = p.id
+    FROM #lote l
+    INNER JOIN productos p ON p.nombre = l.nombre
+    WHERE l.producto_id IS NULL;
+    
+    UPDATE l SET producto_id = p.id
+    FROM #lote l
+    INNER JOIN productos p ON p.sku = l.sku
+    WHERE l.producto_id IS NULL AND l.sku IS NOT NULL;
+    
+    -- Un mismo producto no puede actualizarse dos veces en el MERGE: si varios nombres
+    -- del lote resuelven al mismo producto (p. ej. por SKU) queda la última fila
+    -- extraída y las demás se informan como descartadas
+    WITH repetidos AS (
+        SELECT nombre, ROW_NUMBER() OVER (PARTITION BY producto_id ORDER BY fila DESC) AS rn
+        FROM #lote
+        WHERE producto_id IS NOT NULL
+    )
+    DELETE FROM repetidos
+    OUTPUT deleted.nombre INTO @descartados
+    WHERE rn > 1;
+    
+    -- Crear productos nuevos y actualizar solo los que cambiaron su huella de catálogo
+    MERGE productos WITH (HOLDLOCK) AS t
+    USING #lote AS s
+    ON t.id = s.producto_id
+    WHEN MATCHED AND (s.huella IS NULL OR t.huella IS NULL OR t.huella <> s.huella) THEN
+        UPDATE SET descripcion = COALESCE(s.descripcion, t.descripcion),
+                   url_imagen = COALESCE(s.url_imagen, t.url_imagen),
+                   marca_id = COALESCE(s.marca_id, t.marca_id),
+                   categoria_id = COALESCE(@categoria_id, t.categoria_id),
+                   sku = COALESCE(s.sku, t.sku),
+                   huella = COALESCE(s.huella, t.huella),
+                   ultima_actualizacion = GETDATE()
+    WHEN NOT MATCHED THEN
+        INSERT (nombre, descripcion, url_imagen, marca_id, categoria_id, sku, huella)
+        VALUES (s.nombre, s.descripcion, s.url_imagen, s.marca_id, @categoria_id, s.sku, s.huella)
+    OUTPUT inserted.id, inserted.nombre, $action INTO @resultado;
+    
+    -- Productos creados (incluye IDs del caché que ya no existían)
+    UPDATE l SET producto_id = r.producto_id, resuelto_bd = 1
+    FROM #lote l
+    INNER JOIN @resultado r ON r.nombre = l.nombre AND r.accion = 'INSERT';
+    
+    -- Intervalo de precio vigente de cada producto en esta tienda; (id, fecha) es la clave
+    -- de precios, así cada búsqueda se limita a la partición del mes de `fecha`
+    UPDATE l SET intervalo_id = pa.precio_id, vigente_desde = pa.vigente_desde,
+                 precio_vigente = pa.precio, vigente_hasta = pa.fecha_actualizacion
+    FROM #lote l
+    INNER JOIN precios_actuales pa WITH (UPDLOCK, HOLDLOCK)
+        ON pa.producto_id = l.producto_id AND pa.tienda_id = @tienda_id;
+    
+    -- Mismo precio: extender el intervalo (mismo criterio que sp_registrar_precio)
+    UPDATE pr
+    SET fecha_hasta = @ahora, stock = l.stock, rating = l.rating, url = l.url
+    FROM precios pr
+    INNER JOIN #lote l ON l.intervalo_id = pr.id AND pr.fecha = l.vigente_desde
+    WHERE l.vigente_hasta < @hoy
+      AND l.precio_vigente = l.precio
+      AND l.vigente_hasta >= DATEADD(day, -@max_hueco_dias, @hoy)
+      AND DATEDIFF(month, l.vigente_hasta, @ahora) = 0;
+    
+    -- Precio distinto, producto nuevo en la tienda o intervalo cerrado: abrir otro
+    -- (los ya observados hoy no se tocan)
+    INSERT INTO precios (producto_id, tienda_id, precio, precio_anterior, stock, rating, url, fecha, fecha_hasta)
+    OUTPUT inserted.id, inserted.producto_id INTO @intervalos_nuevos
+    SELECT l.producto_id, @tienda_id, l.precio, l.precio_vigente, l.stock, l.rating, l.url, @ahora, @ahora
+    FROM #lote l
+    WHERE l.intervalo_id IS NULL
+       OR (l.vigente_hasta < @hoy
+           AND (l.precio_vigente <> l.precio
+                OR l.vigente_hasta < DATEADD(day, -@max_hueco_dias, @hoy)
+                OR DATEDIFF(month, l.vigente_hasta, @ahora) <> 0));
+    
+    -- Nuevos = precios distintos o primeros en la tienda; reabrir el mismo precio por
+    -- cambio de mes o por un hueco cuenta como actualizado
+    SELECT @nuevos = COUNT(*)
+    FROM #lote l
+    INNER JOIN @intervalos_nuevos n ON n.producto_id = l.producto_id
+    WHERE l.precio_vigente IS NULL OR l.precio_vigente <> l.precio;
+    
+    UPDATE l SET intervalo_id = n.precio_id, vigente_desde = @ahora
+    FROM #lote l
+    INNER JOIN @intervalos_nuevos n ON n.producto_id = l.producto_id;
+    
+    -- Cambios de precio (y precios nuevos en la tienda) para el canal en vivo de la API
+    INSERT INTO eventos_precio (tipo, producto_id, categoria_id, tienda_id, precio, precio_anterior)
+    SELECT 'precio', l.producto_id, p.categoria_id, @tienda_id, l.precio, l.precio_vigente
+    FROM #lote l
+    INNER JOIN @intervalos_nuevos n ON n.producto_id = l.producto_id
+    INNER JOIN productos p ON p.id = l.producto_id
+    WHERE l.precio_vigente IS NULL OR l.precio_vigente <> l.precio;
+    
+    -- Precios actuales del lote (intervalo extendido, recién abierto o ya observado hoy)
+    MERGE precios_actuales WITH (HOLDLOCK) AS t
+    USING (
+        SELECT pr.*
+        FROM #lote l
+        INNER JOIN precios pr ON pr.id = l.intervalo_id AND pr.fecha = l.vigente_desde
+    ) AS s
+    ON t.producto_id = s.producto_id AND t.tienda_id = s.tienda_id
+    WHEN MATCHED THEN
+        UPDATE SET precio_id = s.id, precio = s.precio, precio_anterior = s.precio_anterior, stock = s.stock,
+                   rating = s.rating, descuento = s.descuento, url = s.url,
+                   vigente_desde = s.fecha, fecha_actualizacion = s.fecha_hasta
+    WHEN NOT MATCHED THEN
+        INSERT (producto_id, tienda_id, precio_id, precio, precio_anterior, stock, rating, descuento, url,
+                vigente_desde, fecha_actualizacion)
+        VALUES (s.producto_id, s.tienda_id, s.id, s.precio, s.precio_anterior, s.stock, s.rating, s.descuento,
+                s.url, s.fecha, s.fecha_hasta);
+    
+    SELECT @total = COUNT(*) FROM #lote;
+    
+    DELETE FROM staging_productos WHERE lote_id = @lote_id;
+    
+    COMMIT TRANSACTION;
+    
+    -- 1) Resumen (con las filas descartadas por repetir producto), 2) productos y
+    -- 3) marcas resueltos aquí para el caché del scraper
+    SELECT @nuevos AS nuevos, @total - @nuevos AS actualizados,
+           (SELECT COUNT(*) FROM @descartados) AS descartados;
+    SELECT producto_id, nombre, sku FROM #lote WHERE resuelto_bd = 1;
+    SELECT DISTINCT marca_id, nombre FROM @marcas_resueltas;
+    
+    DROP TABLE #lote;
+END
+GO
+
+-- Procedimiento: Archivar meses cerrados de precios
+-- Cada partición de precios anterior a los últimos @meses_activos meses se saca con
+-- SWITCH a una tabla de carga, se convierte a columnstore y entra con SWITCH a la
+-- misma partición de precios_archivo (solo metadatos, sin copiar filas entre tablas).
+-- También agrega los límites de partición de los próximos @meses_adelante meses.
+IF OBJECT_ID('sp_archivar_precios', 'P') IS NOT NULL
+    DROP PROCEDURE sp_archivar_precios;
+GO
+
+CREATE PROCEDURE sp_archivar_precios
+    @meses_activos INT = 2,
+    @meses_adelante INT = 3
+AS
+BEGIN
+    SET NOCOUNT ON;
+    SET XACT_ABORT ON;
+    
+    DECLARE @mes_actual DATETIME = DATEFROMPARTS(YEAR(GETDATE()), MONTH(GETDATE()), 1);
+    DECLARE @corte DATETIME = DATEADD(month, 1 - @meses_activos, @mes_actual);
+    DECLARE @limite DATETIME;
+    DECLARE @particion INT, @desde DATETIME, @hasta DATETIME, @filas BIGINT;
+    DECLARE @sql NVARCHAR(MAX);
+    DECLARE @archivados TABLE (desde DATETIME, hasta DATETIME, filas BIGINT);
+    
+    -- Límites de los meses siguientes (dividir la última partición, vacía, es inmediato)
+    SELECT @limite = MAX(CAST(rv.value AS DATETIME))
+    FROM sys.partition_range_values rv
+    INNER JOIN sys.partition_functions pf ON pf.function_id = rv.function_id
+    WHERE pf.name = 'pf_precios_mes';
+    
+    WHILE @limite < DATEADD(month, @meses_adelante, @mes_actual)
+    BEGIN
+        SET @limite = DATEADD(month, 1, @limite);
+        ALTER PARTITION SCHEME ps_precios_mes NEXT USED [PRIMARY];
+        ALTER PARTITION FUNCTION pf_precios_mes() SPLIT RANGE (@limite);
+    END
+    
+    -- Particiones con filas que terminan antes del corte
+    DECLARE meses CURSOR LOCAL FAST_FORWARD FOR
+        SELECT p.partition_number, CAST(desde.value AS DATETIME), CAST(hasta.value AS DATETIME), p.rows
+        FROM sys.partitions p
+        INNER JOIN sys.indexes i ON i.object_id = p.object_id AND i.index_id = p.index_id
+        INNER JOIN sys.partition_schemes ps ON ps.data_space_id = i.data_space_id
+        INNER JOIN sys.partition_range_values hasta
+            ON hasta.function_id = ps.function_id AND hasta.boundary_id = p.partition_number
+        LEFT JOIN sys.partition_range_values desde
+            ON desde.function_id = ps.function_id AND desde.boundary_id = p.partition_number - 1
+        WHERE p.object_id = OBJECT_ID('precios') AND i.index_id = 1 AND p.rows > 0
+          AND CAST(hasta.value AS DATETIME) <= @corte
+        ORDER BY p.partition_number;
+    
+    OPEN meses;
+    FETCH NEXT FROM meses INTO @particion, @desde, @hasta, @filas;
+    
+    WHILE @@FETCH_STATUS = 0
+    BEGIN
+        IF EXISTS (SELECT 1 FROM sys.partitions
+                   WHERE object_id = OBJECT_ID('precios_archivo') AND partition_number = @particion AND rows > 0)
+        BEGIN
+            PRINT 'Partición ' + CAST(@particion AS VARCHAR(10)) + ' ya tiene filas en precios_archivo; se omite.';
+        END
+        ELSE
+        BEGIN
+            BEGIN TRANSACTION;
+            
+            IF OBJECT_ID('precios_archivo_carga', 'U') IS NOT NULL
+                DROP TABLE precios_archivo_carga;
+            
+            -- Tabla de carga con la misma estructura e índices que precios
+            SELECT TOP 0 id, producto_id, tienda_id, precio, precio_anterior, stock, rating, num_reviews,
+                   descuento, url, fecha, fecha_hasta
+            INTO precios_archivo_carga
+            FROM precios;
+            
+            CREATE CLUSTERED INDEX CX_precios_archivo_carga ON precios_archivo_carga(fecha, producto_id, tienda_id);
+            ALTER TABLE precios_archivo_carga
+                ADD CONSTRAINT PK_precios_archivo_carga PRIMARY KEY NONCLUSTERED (id, fecha);
+            CREATE INDEX IX_precios_archivo_carga ON precios_archivo_carga(producto_id, tienda_id, fecha DESC);
+            
+            ALTER TABLE precios SWITCH PARTITION @particion TO precios_archivo_carga;
+            
+            -- A columnstore, con el rango del mes como restricción para entrar a la partición
+            ALTER TABLE precios_archivo_carga DROP CONSTRAINT PK_precios_archivo_carga;
+            DROP INDEX IX_precios_archivo_carga ON precios_archivo_carga;
+            CREATE CLUSTERED COLUMNSTORE INDEX CX_precios_archivo_carga ON precios_archivo_carga
+                WITH (DROP_EXISTING = ON);
+            
+            SET @sql = N'ALTER TABLE precios_archivo_carga ADD CONSTRAINT CK_precios_archivo_carga_mes CHECK ('
+                     + CASE WHEN @desde IS NULL THEN N''
+                            ELSE N'fecha >= ''' + CONVERT(NCHAR(8), @desde, 112) + N''' AND ' END
+                     + N'fecha < ''' + CONVERT(NCHAR(8), @hasta, 112) + N''' AND fecha IS NOT NULL)';
+            EXEC (@sql);
+            
+            ALTER TABLE precios_archivo_carga SWITCH TO precios_archivo PARTITION @particion;
+            DROP TABLE precios_archivo_carga;
+            
+            COMMIT TRANSACTION;
+            INSERT INTO @archivados VALUES (@desde, @hasta, @filas);
+        END
+        
+        FETCH NEXT FROM meses INTO @particion, @desde, @hasta, @filas;
+    END
+    
+    CLOSE meses;
+    DEALLOCATE meses;
+    
+    SELECT desde, hasta, filas FROM @archivados ORDER BY hasta;
+END
+GO
+
+-- Procedimiento: Compactar el histórico de precios
+-- Los intervalos de meses anteriores a @retencion_dias se resumen por semana
+-- (mín, máx, promedio por día, último) y se eliminan; en precios_archivo se vacían
+-- las particiones completas. Las semanas anteriores a @retencion_semanal_dias se
+-- resumen por mes (según el mes del lunes) y se eliminan.
+IF OBJECT_ID('sp_compactar_precios', 'P') IS NOT NULL
+    DROP PROCEDURE sp_compactar_precios;
+GO
+
+CREATE PROCEDURE sp_compactar_precios
+    @retencion_dias INT = 365,
+    @retencion_semanal_dias INT = 1095
+AS
+BEGIN
+    SET NOCOUNT ON;
+    SET XACT_ABORT ON;
+    
+    -- Cortes en inicio de mes: los intervalos no cruzan de mes, así que se compactan enteros
+    DECLARE @limite DATE = DATEADD(day, -@retencion_dias, GETDATE());
+    DECLARE @corte DATETIME = DATEFROMPARTS(YEAR(@limite), MONTH(@limite), 1);
+    DECLARE @limite_semanal DATE = DATEADD(day, -@retencion_semanal_dias, GETDATE());
+    DECLARE @corte_semanal DATE = DATEFROMPARTS(YEAR(@limite_semanal), MONTH(@limite_semanal), 1);
+    DECLARE @particion INT = $PARTITION.pf_precios_mes(@corte);
+    DECLARE @intervalos INT = 0, @semanas INT = 0, @semanas_a_meses INT = 0;
+    DECLARE @sql NVARCHAR(MAX);
+    
+    -- Un registro por día observado de cada intervalo a compactar
+    SELECT pr.producto_id, pr.tienda_id, pr.precio, cal.fecha AS dia,
+           DATEADD(day, -(DATEDIFF(day, '19000101', cal.fecha) % 7), cal.fecha) AS semana
+    INTO #dias
+    FROM vw_precios_historial pr
+    INNER JOIN calendario cal ON cal.fecha BETWEEN CAST(pr.fecha AS DATE) AND CAST(pr.fecha_hasta AS DATE)
+    WHERE pr.fecha < @corte;
+    
+    SELECT producto_id, tienda_id, semana,
+           MIN(precio) AS precio_min, MAX(precio) AS precio_max,
+           AVG(CAST(precio AS DECIMAL(12,4))) AS precio_promedio,
+           MAX(dia) AS fecha_ultimo, COUNT(*) AS dias,
+           CAST(NULL AS DECIMAL(10,2)) AS precio_ultimo
+    INTO #semanas
+    FROM #dias
+    GROUP BY producto_id, tienda_id, semana;
+    
+    UPDATE s SET precio_ultimo = d.precio
+    FROM #semanas s
+    INNER JOIN #dias d ON d.producto_id = s.producto_id AND d.tienda_id = s.tienda_id AND d.dia = s.fecha_ultimo;
+    
+    BEGIN TRANSACTION;
+    
+    -- Una semana que cruza el corte ya puede tener filas de la corrida anterior: se combinan
+    MERGE precios_semanales WITH (HOLDLOCK) AS t
+    USING #semanas AS s
+    ON t.producto_id = s.producto_id AND t.tienda_id = s.tienda_id AND t.semana = s.semana
+    WHEN MATCHED THEN
+        UPDATE SET precio_min = CASE WHEN s.precio_min < t.precio_min THEN s.precio_min ELSE t.precio_min END,
+                   precio_max = CASE WHEN s.precio_max > t.precio_max THEN s.precio_max ELSE t.precio_max END,
+                   precio_promedio = (t.precio_promedio * t.dias + s.precio_promedio * s.dias) / (t.dias + s.dias),
+                   precio_ultimo = CASE WHEN s.fecha_ultimo > t.fecha_ultimo THEN s.precio_ultimo ELSE t.precio_ultimo END,
+                   fecha_ultimo = CASE WHEN s.fecha_ultimo > t.fecha_ultimo THEN s.fecha_ultimo ELSE t.fecha_ultimo END,
+                   dias = t.dias + s.dias
+    WHEN NOT MATCHED THEN
+        INSERT (producto_id, tienda_id, semana, precio_min, precio_max, precio_promedio, precio_ultimo, fecha_ultimo, dias)
+        VALUES (s.producto_id, s.tienda_id, s.semana, s.precio_min, s.precio_max, s.precio_promedio,
+                s.precio_ultimo, s.fecha_ultimo, s.dias);
+    SET @semanas = @@ROWCOUNT;
+    
+    -- Quitar los intervalos compactados: en el archivo se vacían particiones enteras
+    DELETE FROM precios WHERE fecha < @corte;
+    SET @intervalos = @@ROWCOUNT;
+    
+    IF @particion > 1
+    BEGIN
+        SELECT @intervalos += COUNT_BIG(*) FROM precios_archivo WHERE fecha < @corte;
+        SET @sql = N'TRUNCATE TABLE precios_archivo WITH (PARTITIONS (1 TO '
+                 + CAST(@particion - 1 AS NVARCHAR(10)) + N'))';
+        EXEC (@sql);
     END
+    
+    COMMIT TRANSACTION;
+    
+    -- Semanas antiguas a meses (promedio ponderado por días observados)
+    SELECT producto_id, tienda_id, DATEFROMPARTS(YEAR(semana), MONTH(semana), 1) AS mes,
+           MIN(precio_min) AS precio_min, MAX(precio_max) AS precio_max,
+           SUM(precio_promedio * dias) / SUM(dias) AS precio_promedio,
+           MAX(fecha_ultimo) AS fecha_ultimo, SUM(dias) AS dias,
+           CAST(NULL AS DECIMAL(10,2)) AS precio_ultimo
+    INTO #meses
+    FROM precios_semanales
+    WHERE semana < @corte_semanal
+    GROUP BY producto_id, tienda_id, DATEFROMPARTS(YEAR(semana), MONTH(semana), 1);
+    
+    UPDATE m SET precio_ultimo = s.precio_ultimo
+    FROM #meses m
+    INNER JOIN precios_semanales s
+        ON s.producto_id = m.producto_id AND s.tienda_id = m.tienda_id AND s.fecha_ultimo = m.fecha_ultimo
+       AND s.semana < @corte_semanal;
+    
+    BEGIN TRANSACTION;
+    
+    MERGE precios_mensuales WITH (HOLDLOCK) AS t
+    USING #meses AS s
+    ON t.producto_id = s.producto_id AND t.tienda_id = s.tienda_id AND t.mes = s.mes
+    WHEN MATCHED THEN
+        UPDATE SET precio_min = CASE WHEN s.precio_min < t.precio_min THEN s.precio_min ELSE t.precio_min END,
+                   precio_max = CASE WHEN s.precio_max > t.precio_max THEN s.precio_max ELSE t.precio_max END,
+                   precio_promedio = (t.precio_promedio * t.dias + s.precio_promedio * s.dias) / (t.dias + s.dias),
+                   precio_ultimo = CASE WHEN s.fecha_ultimo > t.fecha_ultimo THEN s.precio_ultimo ELSE t.precio_ultimo END,
+                   fecha_ultimo = CASE WHEN s.fecha_ultimo > t.fecha_ultimo THEN s.fecha_ultimo ELSE t.fecha_ultimo END,
+                   dias = t.dias + s.dias
+    WHEN NOT MATCHED THEN
+        INSERT (producto_id, tienda_id, mes, precio_min, precio_max, precio_promedio, precio_ultimo, fecha_ultimo, dias)
+        VALUES (s.producto_id, s.tienda_id, s.mes, s.precio_min, s.precio_max, s.precio_promedio,
+                s.precio_ultimo, s.fecha_ultimo, s.dias);
+    
+    DELETE FROM precios_semanales WHERE semana < @corte_semanal;
+    SET @semanas_a_meses = @@ROWCOUNT;
+    
+    COMMIT TRANSACTION;
+    
+    DROP TABLE #dias;
+    DROP TABLE #semanas;
+    DROP TABLE #meses;
+    
+    SELECT @corte AS corte, @intervalos AS intervalos_compactados, @semanas AS semanas_escritas,
+           @semanas_a_meses AS semanas_a_meses;
 END
 GO
 
@@ -2,10 +2,7 @@
 Ejecutar todos los scrapers
 """
 import sys
-import time
-from scrapers.wong import WongScraper
-from scrapers.metro import MetroScraper
-from scrapers.plaza_vea import PlazaVeaScraper
+from scrapers.orchestrator import ejecutar_scrapers, formatear_resumen
 
 
 def main():
@@ -13,26 +10,16 @@ def main():
     print("WONGPRIME - Scraping Multi-Tienda")
     print("=" * 60)
     
-    scrapers = [
-        ("Wong", WongScraper()),
-        ("Metro", MetroScraper()),
-        ("Plaza Vea", PlazaVeaScraper())
-    ]
-    
-    for nombre, scraper in scrapers:
-        print(f"\n{'='*60}")
-        print(f"Iniciando scraper: {nombre}")
-        print(f"{'='*60}\n")
-        
-        try:
-            scraper.run()
-        except Exception as e:
-            print(f"❌ Error en scraper {nombre}: {e}")
-            
-        # Pausa entre scrapers
-        time.sleep(5)
+    # Tiendas y categorías se ejecutan en paralelo (ver SCRAPER_POOL / SCRAPER_CONCURRENCIA_*)
+    try:
+        resumen = ejecutar_scrapers()
+    except Exception as e:
+        print(f"❌ Error en orquestador de scrapers: {e}")
+        return
         
     print(f"\n{'='*60}")
+    for linea in formatear_resumen(resumen):
+        print(linea)
     print("✅ Scraping completo de todas las tiendas")
     print(f"{'='*60}")
 
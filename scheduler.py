@@ -7,11 +7,11 @@ sys.path.append('.')
 import schedule
 import time
 from datetime import datetime
-from scrapers.wong import WongScraper
-from scrapers.metro import MetroScraper
-from scrapers.plaza_vea import PlazaVeaScraper
+from scrapers.orchestrator import ejecutar_scrapers
 from services.alerts import verificar_y_notificar_alertas
 from services.reports import generar_reporte_excel
+from services.particiones import archivar_particiones
+from services.retencion import compactar_precios
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -22,17 +22,10 @@ def run_all_scrapers():
     """Ejecutar todos los scrapers"""
     logger.info("🚀 Ejecutando scrapers programados...")
     
-    scrapers = [
-        WongScraper(),
-        MetroScraper(),
-        PlazaVeaScraper()
-    ]
-    
-    for scraper in scrapers:
-        try:
-            scraper.run()
-        except Exception as e:
-            logger.error(f"Error en scraper {scraper.tienda_nombre}: {e}")
+    try:
+        ejecutar_scrapers()
+    except Exception as e:
+        logger.error(f"Error en orquestador de scrapers: {e}")
 
 
 def check_alerts():
@@ -48,10 +41,24 @@ def generate_weekly_report():
     generar_reporte_excel(f"reporte_semanal_{fecha}.xlsx")
 
 
+def archive_price_history():
+    """Archivar meses cerrados de precios"""
+    logger.info("🗄️ Archivando histórico de precios...")
+    archivar_particiones()
+
+
+def compact_price_history():
+    """Compactar histórico de precios fuera de la retención"""
+    logger.info("🧹 Compactando histórico de precios...")
+    compactar_precios()
+
+
 # Programar tareas
 schedule.every().day.at("06:00").do(run_all_scrapers)  # Scraping diario a las 6 AM
 schedule.every(2).hours.do(check_alerts)  # Verificar alertas cada 2 horas
 schedule.every().monday.at("08:00").do(generate_weekly_report)  # Reporte semanal los lunes
+schedule.every().day.at("03:00").do(archive_price_history)  # Archivo de meses cerrados (no hace nada si no hay)
+schedule.every().sunday.at("04:00").do(compact_price_history)  # Resúmenes semanales/mensuales del histórico antiguo
 
 
 if __name__ == "__main__":
@@ -60,6 +67,8 @@ if __name__ == "__main__":
     logger.info("  - Scraping diario: 6:00 AM")
     logger.info("  - Verificación de alertas: cada 2 horas")
     logger.info("  - Reporte semanal: Lunes 8:00 AM")
+    logger.info("  - Archivo de precios: 3:00 AM")
+    logger.info("  - Compactación del histórico: Domingo 4:00 AM")
     
     while True:
         schedule.run_pending()
@@ -2,12 +2,8 @@
 Base Scraper - Clase base abstracta para todos los scrapers
 """
 from abc import ABC, abstractmethod
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import WebDriverException, TimeoutException
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from bs4 import BeautifulSoup
 from tenacity import retry, stop_after_attempt, wait_exponential
 import pyodbc
@@ -19,18 +15,69 @@ from datetime import datetime
 # Añadir el directorio raíz al path para imports
 sys.path.append('.')
 from config.settings import *
+from scrapers.browser_pool import crear_driver, BrowserSession
+from scrapers.readiness import esperar_productos, PERFIL_CARGA_DEFAULT
+from scrapers.vtex_api import VtexCatalogClient
+from scrapers.crawler import iterar_tandas
+from scrapers.ingesta import IngestaMasiva, huella_producto
+from scrapers.identidades import obtener_identidades
+from scrapers.parsing import obtener_parser, obtener_plan
+from services.version_datos import incrementar_version, AMBITO_CATALOGO
+from services.eventos import registrar_fin_scraping, purgar_eventos
+
+
+def nombre_categoria(categoria_path):
+    """Obtener nombre legible de la categoría a partir de su path"""
+    return categoria_path.split('/')[-1].replace('-', ' ').title()
+
+
+def finalizar_scraping(cursor, tienda_id, nuevos=0):
+    """Cierre de un scraping de la tienda (el commit queda a cargo de quien llama)
+
+    Sube la versión del catálogo para que la API descarte sus respuestas
+    cacheadas, avisa a los dashboards conectados con un evento 'scraping' y
+    purga los eventos viejos.
+    """
+    incrementar_version(cursor, AMBITO_CATALOGO)
+    registrar_fin_scraping(cursor, tienda_id, nuevos)
+    purgar_eventos(cursor)
 
 
 class BaseScraper(ABC):
-    """Clase base para todos los scrapers"""
+    """Clase base para todos los scrapers
+    
+    El navegador puede venir de tres fuentes:
+        - driver: un driver ya arrendado, que el scraper usa pero no cierra
+        - pool: un BrowserPool del que se arrienda una sesión por categoría
+        - ninguno: el scraper crea (solo cuando lo necesita) y cierra su propio navegador
     
-    def __init__(self, tienda_nombre, base_url):
+    Con FETCH_BACKEND="api" los productos se obtienen del catálogo JSON de VTEX
+    y el navegador solo se usa como respaldo en las categorías donde la API falla.
+    """
+    
+    # Cadenas de selectores por campo, de la más específica a la más genérica
+    # (ver PlanExtraccion en scrapers/parsing.py). Cada tienda define la suya.
+    PLAN_EXTRACCION = {}
+
+    # Nombre en la tabla tiendas. Es atributo de clase para que el orquestador
+    # lo lea sin instanciar el scraper.
+    tienda_nombre = None
+
+    def __init__(self, tienda_nombre, base_url, driver=None, pool=None):
         self.tienda_nombre = tienda_nombre
         self.base_url = base_url
-        self.driver = None
+        self.driver = driver
+        self.driver_propio = driver is None and pool is None
+        self.pool = pool
+        self.sesion = None
+        self.fetch_backend = FETCH_BACKEND
+        self.api = None
+        self.urls_vistas = set()
         self.conn = None
         self.cursor = None
         self.tienda_id = None
+        self.identidades = obtener_identidades()
+        self.parser = obtener_parser()
         
         # Configurar logging
         self.setup_logging()
@@ -55,12 +102,10 @@ class BaseScraper(ABC):
             self.cursor = self.conn.cursor()
             self.logger.info("✅ Conexión exitosa a SQL Server")
             
-            # Obtener ID de la tienda
-            self.cursor.execute("SELECT id FROM tiendas WHERE nombre = ?", self.tienda_nombre)
-            row = self.cursor.fetchone()
-            if row:
-                self.tienda_id = row[0]
-            else:
+            # Precargar IDs conocidos y obtener el de la tienda
+            self.identidades.calentar(self.cursor)
+            self.tienda_id = self.identidades.tienda_id(self.cursor, self.tienda_nombre)
+            if not self.tienda_id:
                 self.logger.error(f"❌ Tienda '{self.tienda_nombre}' no encontrada en la base de datos")
                 raise Exception(f"Tienda '{self.tienda_nombre}' no encontrada")
                 
@@ -71,17 +116,10 @@ class BaseScraper(ABC):
     def init_browser(self):
         """Inicializar navegador Selenium"""
         try:
-            self.logger.info("🌐 Iniciando navegador...")
-            options = Options()
-            options.add_argument("--start-maximized")
-            options.add_argument("--disable-blink-features=AutomationControlled")
-            options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            options.add_experimental_option('useAutomationExtension', False)
-            
-            self.driver = webdriver.Chrome(options=options)
-            self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
-                "source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
-            })
+            self.logger.info(f"🌐 Iniciando navegador (perfil {BROWSER_PERFIL})...")
+            self.sesion = BrowserSession(crear_driver(BROWSER_PERFIL), BROWSER_PERFIL)
+            self.sesion.marcar_arriendo()
+            self.driver = self.sesion.driver
             self.logger.info("✅ Navegador iniciado")
             
         except Exception as e:
@@ -89,29 +127,71 @@ class BaseScraper(ABC):
             raise
             
     @retry(stop=stop_after_attempt(MAX_RETRIES), wait=wait_exponential(min=2, max=10))
-    def load_page(self, url):
-        """Cargar página con reintentos automáticos"""
+    def load_page(self, url, espera_fija=True):
+        """Cargar página con reintentos automáticos
+        
+        Espera a que el selector de productos coincida con un número estable de
+        nodos; solo si no ocurre dentro del timeout del perfil usa el delay fijo
+        (salvo espera_fija=False, p. ej. al pasar de página, donde una página
+        vacía simplemente indica el final de la categoría).
+        """
         self.logger.info(f"📄 Cargando: {url}")
         self.driver.get(url)
-        time.sleep(SCRAPING_DELAY)
-        
-        # Scroll para cargar contenido dinámico
-        self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight/2);")
-        time.sleep(2)
+        if self.sesion:
+            self.sesion.registrar_pagina()
+            
+        perfil = self.get_perfil_carga()
         
+        try:
+            total, segundos = esperar_productos(self.driver, self.get_product_selector(), perfil)
+            self.logger.info(f"⏱️ Página lista en {segundos:.2f}s ({total} productos)")
+                
+        except TimeoutException:
+            if not espera_fija:
+                return
+                
+            self.logger.warning(
+                f"⚠️ Productos no estables tras {perfil['timeout']}s, usando espera fija de {SCRAPING_DELAY}s"
+            )
+            time.sleep(SCRAPING_DELAY)
+            
+            # Scroll para cargar contenido dinámico
+            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight/2);")
+            time.sleep(2)
+            
     def get_soup(self):
         """Obtener BeautifulSoup del HTML actual"""
         return BeautifulSoup(self.driver.page_source, "html.parser")
         
+    def get_tarjetas(self, html=None):
+        """Contenedores de productos del HTML actual (o del indicado) con el parser configurado"""
+        return self.parser.contenedores(html or self.driver.page_source, self.get_product_selector())
+        
+    @property
+    def plan(self):
+        """PLAN_EXTRACCION de la tienda compilado para el parser configurado"""
+        return obtener_plan(type(self), self.PLAN_EXTRACCION, self.parser)
+        
     @abstractmethod
     def get_product_selector(self):
         """Retornar selector CSS para contenedores de productos (DEBE SER IMPLEMENTADO)"""
         pass
         
+    def get_perfil_carga(self):
+        """Perfil de espera y recorrido de la página (ver PERFIL_CARGA_DEFAULT)
+        
+        Las tiendas pueden sobrescribirlo según lo rápido que renderiza su grilla
+        y si usan scroll infinito o páginas numeradas.
+        """
+        return dict(PERFIL_CARGA_DEFAULT)
+        
     @abstractmethod
     def extract_product_data(self, producto_element):
         """Extraer datos de un elemento de producto (DEBE SER IMPLEMENTADO)
         
+        `producto_element` es un elemento del parser configurado (bs4 o lxml);
+        se lee con self.plan.extraer() para no depender del backend.
+        
         Retornar: dict con keys:
             - nombre (str)
             - precio (float)
@@ -123,22 +203,28 @@ class BaseScraper(ABC):
         """
         pass
         
-    def upsert_producto(self, data, categoria_nombre):
-        """Insertar o actualizar producto usando stored procedure"""
+    def upsert_producto(self, data, categoria_nombre, huella=None):
+        """Insertar o actualizar producto usando stored procedure
+        
+        Con `huella` el procedimiento no toca la fila si productos.huella ya coincide.
+        """
         try:
             output_param = self.cursor.execute(
-                "EXEC sp_upsert_producto ?, ?, ?, ?, ?, ?, ?",
+                "EXEC sp_upsert_producto ?, ?, ?, ?, ?, ?, ?, ?",
                 data.get('nombre'),
                 data.get('descripcion'),
                 data.get('url_imagen'),
                 data.get('marca'),
                 categoria_nombre,
                 data.get('sku'),
-                0  # Output parameter placeholder
+                0,  # Output parameter placeholder
+                huella
             )
             
             # Obtener el producto_id del output
             producto_id = output_param.fetchone()[0] if output_param else None
+            if producto_id:
+                self.identidades.registrar_producto(producto_id, data.get('nombre'), data.get('sku'), huella)
             return producto_id
             
         except Exception as e:
@@ -146,74 +232,195 @@ class BaseScraper(ABC):
             return None
             
     def insert_precio(self, producto_id, data):
-        """Insertar precio del producto"""
+        """Registrar la observación de precio del producto
+        
+        sp_registrar_precio extiende el intervalo vigente si el precio no cambió.
+        Retornar True si el precio es nuevo en la tienda o cambió (reabrir el mismo
+        precio por cambio de mes o por un hueco no cuenta).
+        """
         try:
-            self.cursor.execute("""
-                INSERT INTO precios 
-                (producto_id, tienda_id, precio, stock, rating, url, fecha)
-                VALUES (?, ?, ?, ?, ?, ?, GETDATE())
-            """,
-            producto_id,
-            self.tienda_id,
-            data.get('precio'),
-            data.get('stock'),
-            data.get('rating'),
-            data.get('url')
-            )
-            return True
+            row = self.cursor.execute(
+                "EXEC sp_registrar_precio ?, ?, ?, ?, ?, ?, ?",
+                producto_id,
+                self.tienda_id,
+                data.get('precio'),
+                data.get('stock'),
+                data.get('rating'),
+                data.get('url'),
+                PRECIOS_MAX_HUECO_DIAS
+            ).fetchone()
+            return bool(row and row[0])
             
-        except pyodbc.IntegrityError:
-            # Duplicado - ya existe precio para hoy
-            self.logger.debug(f"Precio duplicado ignorado para producto {producto_id}")
-            return False
         except Exception as e:
             self.logger.error(f"Error al insertar precio: {e}")
             return False
             
-    def scrape_categoria(self, categoria_path, categoria_nombre):
-        """Scrapear una categoría específica"""
+    def obtener_productos(self, categoria_path):
+        """Generador de dicts de productos de una categoría (None para tarjetas inválidas)
+        
+        Los productos se entregan a medida que cada tanda o página carga y se
+        deduplican por URL. Con el backend "api" usa el catálogo VTEX y recurre
+        a Selenium solo si la API falla o no retorna productos para la categoría.
+        """
+        self.urls_vistas = set()
+        
+        if self.api:
+            entregados = 0
+            try:
+                for data in self.api.iterar_categoria(categoria_path):
+                    if self.es_producto_nuevo(data):
+                        entregados += 1
+                        yield data
+                        
+                if entregados:
+                    self.logger.info(f"⚡ {entregados} productos obtenidos vía API VTEX")
+                    return
+                self.logger.warning("⚠️ API VTEX sin productos, usando Selenium")
+            except Exception as e:
+                self.logger.warning(f"⚠️ API VTEX falló tras {entregados} productos ({e}), usando Selenium")
+                
+        if self.pool:
+            yield from self.obtener_productos_con_pool(categoria_path)
+        else:
+            yield from self.obtener_productos_selenium(categoria_path)
+            
+    def es_producto_nuevo(self, data):
+        """Registrar la URL del producto; False si ya se entregó en esta categoría"""
+        url = data.get('url') if data else None
+        if not url:
+            return True
+        if url in self.urls_vistas:
+            return False
+        self.urls_vistas.add(url)
+        return True
+        
+    def obtener_productos_selenium(self, categoria_path):
+        """Recorrer la categoría en Chrome y extraer los productos de cada tanda
+        
+        Solo se parsean los contenedores nuevos de cada tanda (no la página
+        completa), y el recorrido termina cuando una tanda no trae productos nuevos.
+        """
+        if self.driver is None:
+            self.init_browser()
+            
         url = f"{self.base_url}/{categoria_path}"
+        selector = self.get_product_selector()
+        perfil = self.get_perfil_carga()
         
-        self.logger.info(f"📂 Scrapeando categoría: {categoria_nombre}")
+        self.load_page(url)
+        tandas = iterar_tandas(
+            self.driver, url, selector, perfil,
+            lambda url_pagina: self.load_page(url_pagina, espera_fija=False)
+        )
         
         try:
-            self.load_page(url)
-            soup = self.get_soup()
+            for numero, fragmentos in enumerate(tandas, start=1):
+                nuevos = 0
+                for elemento in self.parser.tarjetas(fragmentos):
+                    data = self.extract_product_data(elemento)
+                    if self.es_producto_nuevo(data):
+                        nuevos += 1
+                        yield data
+                        
+                self.logger.debug(f"Tanda {numero}: {len(fragmentos)} productos, {nuevos} nuevos")
+                if not nuevos:
+                    break
+        finally:
+            tandas.close()
             
-            productos = soup.select(self.get_product_selector())
-            self.logger.info(f"📦 Productos encontrados: {len(productos)}")
+    def obtener_productos_con_pool(self, categoria_path):
+        """Extraer los productos con un navegador arrendado del pool"""
+        sesion = self.pool.adquirir()
+        self.sesion = sesion
+        self.driver = sesion.driver
+        try:
+            yield from self.obtener_productos_selenium(categoria_path)
+        finally:
+            self.sesion = None
+            self.driver = None
+            self.pool.liberar(sesion)
             
+    def guardar_producto(self, data, categoria_nombre):
+        """Guardar un producto con EXEC sp_upsert_producto + INSERT precio
+        
+        Si el producto ya se conoce y su huella de catálogo no cambió se omite
+        el upsert y solo se registra el precio.
+        
+        Retornar True si se insertó el precio, False si ya existía para hoy y
+        None si no se pudo guardar el producto.
+        """
+        huella = huella_producto(data, categoria_nombre)
+        producto_id = self.identidades.producto_id(data.get('nombre'), data.get('sku'))
+        if producto_id and self.identidades.huella(producto_id) == huella:
+            return self.insert_precio(producto_id, data)
+        
+        producto_id = self.upsert_producto(data, categoria_nombre, huella)
+        if not producto_id:
+            return None
+        return self.insert_precio(producto_id, data)
+        
+    def scrape_categoria(self, categoria_path, categoria_nombre):
+        """Scrapear una categoría específica
+        
+        Los productos se guardan mientras se extraen, así la memoria no crece con
+        el tamaño de la categoría. Con INGESTA_MASIVA se acumulan en lotes de
+        INGESTA_LOTE que se cargan con sp_ingesta_lote; si no, un EXEC por producto.
+        """
+        self.logger.info(f"📂 Scrapeando categoría: {categoria_nombre}")
+        ingesta = None
+        
+        try:
+            encontrados = 0
             nuevos = 0
             actualizados = 0
             errores = 0
             
-            for producto in productos:
+            if INGESTA_MASIVA:
+                ingesta = IngestaMasiva(
+                    self.conn, self.tienda_id, categoria_nombre,
+                    respaldo=lambda data: self.guardar_producto(data, categoria_nombre),
+                    identidades=self.identidades
+                )
+            
+            for data in self.obtener_productos(categoria_path):
+                encontrados += 1
                 try:
-                    data = self.extract_product_data(producto)
-                    
                     if not data or not data.get('nombre') or not data.get('precio'):
                         continue
+                    
+                    if ingesta:
+                        ingesta.agregar(data)
+                        continue
                         
-                    # Insertar/actualizar producto
-                    producto_id = self.upsert_producto(data, categoria_nombre)
+                    # Insertar/actualizar producto y su precio
+                    resultado = self.guardar_producto(data, categoria_nombre)
                     
-                    if producto_id:
-                        # Insertar precio
-                        if self.insert_precio(producto_id, data):
-                            nuevos += 1
-                        else:
-                            actualizados += 1
+                    if resultado:
+                        nuevos += 1
+                    elif resultado is False:
+                        actualizados += 1
                             
                 except Exception as e:
                     self.logger.error(f"Error procesando producto: {e}")
                     errores += 1
-                    
-            self.conn.commit()
             
+            if ingesta:
+                ingesta.volcar()
+                nuevos += ingesta.stats['nuevos']
+                actualizados += ingesta.stats['actualizados']
+                errores += ingesta.stats['errores']
+                self.logger.info(
+                    f"🗄️ Ingesta: {ingesta.stats['lotes']} lotes en {ingesta.stats['segundos_bd']:.2f}s de BD, "
+                    f"{ingesta.stats['sin_cambios']} productos sin cambios de catálogo"
+                )
+            else:
+                self.conn.commit()
+            
+            self.logger.info(f"📦 Productos encontrados: {encontrados}")
             self.logger.info(f"✅ Nuevos: {nuevos} | Actualizados: {actualizados} | Errores: {errores}")
             
             return {
-                'encontrados': len(productos),
+                'encontrados': encontrados,
                 'nuevos': nuevos,
                 'actualizados': actualizados,
                 'errores': errores
@@ -221,15 +428,15 @@ class BaseScraper(ABC):
             
         except Exception as e:
             self.logger.error(f"Error scrapeando categoría {categoria_nombre}: {e}")
+            if ingesta:
+                # Guardar lo ya extraído antes del error
+                ingesta.volcar()
             return None
             
     def log_scraping(self, categoria_nombre, stats, tiempo_ejecucion):
         """Registrar log de scraping en la base de datos"""
         try:
-            # Obtener categoria_id
-            self.cursor.execute("SELECT id FROM categorias WHERE nombre = ?", categoria_nombre)
-            row = self.cursor.fetchone()
-            categoria_id = row[0] if row else None
+            categoria_id = self.identidades.categoria_id(self.cursor, categoria_nombre)
             
             self.cursor.execute("""
                 INSERT INTO scraping_logs 
@@ -250,39 +457,78 @@ class BaseScraper(ABC):
         except Exception as e:
             self.logger.error(f"Error logging scraping: {e}")
             
-    def run(self):
-        """Ejecutar el scraper para todas las categorías configuradas"""
+    def marcar_version(self, nuevos=0):
+        """Cerrar el scraping de la tienda (ver finalizar_scraping)"""
+        try:
+            finalizar_scraping(self.cursor, self.tienda_id, nuevos)
+            self.conn.commit()
+        except Exception as e:
+            self.logger.error(f"Error actualizando versión de datos: {e}")
+            
+    def run(self, categorias=None, finalizar=True):
+        """Ejecutar el scraper para las categorías indicadas (por defecto todas las configuradas)
+        
+        Con finalizar=False no se cierra el scraping de la tienda (versión,
+        evento 'scraping', purga): lo hace quien reparte las categorías entre
+        varios scrapers, una sola vez al terminar todos.
+        
+        Retornar: dict {categoria_nombre: stats} con las estadísticas de cada categoría
+        (None si la categoría falló)
+        """
         inicio = time.time()
+        resultados = {}
         
         self.logger.info(f"===== INICIO SCRAPING: {self.tienda_nombre} =====")
         
         try:
             self.connect_db()
-            self.init_browser()
+            # Un cliente para todas las categorías de esta ejecución
+            if self.fetch_backend == "api":
+                self.api = VtexCatalogClient(self.base_url)
             
-            for categoria_path in CATEGORIAS:
-                # Extraer nombre de categoría del path
-                categoria_nombre = categoria_path.split('/')[-1].replace('-', ' ').title()
+            for categoria_path in (categorias or CATEGORIAS):
+                categoria_nombre = nombre_categoria(categoria_path)
                 
                 inicio_cat = time.time()
                 stats = self.scrape_categoria(categoria_path, categoria_nombre)
                 tiempo_cat = int(time.time() - inicio_cat)
+                resultados[categoria_nombre] = stats
                 
                 if stats:
                     self.log_scraping(categoria_nombre, stats, tiempo_cat)
+            
+            if finalizar and any(resultados.values()):
+                self.marcar_version(sum(stats.get('nuevos', 0) for stats in resultados.values() if stats))
                     
         except Exception as e:
             self.logger.error(f"❌ Error general: {e}")
             
         finally:
-            if self.driver:
+            if self.driver_propio and self.driver:
+                metricas = self.sesion.metricas()
+                self.logger.info(
+                    f"📈 Navegador [{metricas['perfil']}]: {metricas['paginas']} páginas, "
+                    f"{metricas['paginas_por_minuto']} pág/min, memoria={metricas['memoria_mb']} MB"
+                )
                 self.driver.quit()
                 self.logger.info("🧹 Navegador cerrado")
                 
+            if self.api:
+                self.api.cerrar()
+                self.api = None
+                
             if self.conn:
                 self.conn.close()
                 self.logger.info("🔒 Conexión a BD cerrada")
                 
+            identidades = self.identidades.resumen()
+            self.logger.info(
+                f"🧠 Identidades: {identidades['aciertos']} aciertos, {identidades['fallos']} fallos, "
+                f"{identidades['consultas']} consultas a BD"
+            )
+            
             tiempo_total = int(time.time() - inicio)
             self.logger.info(f"⏱️ Tiempo total: {tiempo_total}s")
             self.logger.info(f"===== FIN SCRAPING: {self.tienda_nombre} =====")
+            
+        return resultados
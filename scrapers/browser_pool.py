@@ -0,0 +1,303 @@
+"""
+Browser Pool - Sesiones de Chrome reutilizables entre categorías y tiendas
+"""
+import sys
+sys.path.append('.')
+
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+from config.settings import (
+    BROWSER_POOL_SIZE, BROWSER_POOL_MAX_PAGINAS, BROWSER_POOL_ESPERA,
+    BROWSER_PERFIL, BROWSER_VIEWPORT, BROWSER_CACHE_DIR, BROWSER_URLS_BLOQUEADAS
+)
+
+# psutil es opcional: permite medir la memoria real (RSS) de Chrome y sus procesos hijos
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+PERFILES = ("completo", "ligero")
+
+
+def crear_driver(perfil=BROWSER_PERFIL):
+    """Crear un Chrome con la configuración anti-detección (stealth)
+
+    Perfiles:
+        - completo: ventana maximizada que descarga todos los recursos
+        - ligero: headless con viewport reducido, caché en disco y bloqueo de
+          imágenes, media, fuentes y dominios de terceros (solo leemos el DOM;
+          los atributos src de las imágenes siguen disponibles)
+    """
+    if perfil not in PERFILES:
+        raise ValueError(f"Perfil de navegador desconocido: {perfil}")
+
+    options = Options()
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+
+    if perfil == "ligero":
+        options.add_argument("--headless=new")
+        options.add_argument(f"--window-size={BROWSER_VIEWPORT}")
+        options.add_argument(f"--disk-cache-dir={os.path.abspath(BROWSER_CACHE_DIR)}")
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        options.add_argument("--disable-extensions")
+        options.add_argument("--mute-audio")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.managed_default_content_settings.fonts": 2,
+        })
+    else:
+        options.add_argument("--start-maximized")
+
+    driver = webdriver.Chrome(options=options)
+    driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+        "source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+    })
+    driver.execute_cdp_cmd("Performance.enable", {})
+
+    if perfil == "ligero":
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BROWSER_URLS_BLOQUEADAS})
+        # El modo headless se delata en el User-Agent
+        user_agent = driver.execute_script("return navigator.userAgent")
+        driver.execute_cdp_cmd("Network.setUserAgentOverride", {
+            "userAgent": user_agent.replace("HeadlessChrome", "Chrome")
+        })
+
+    return driver
+
+
+class BrowserSession:
+    """Driver arrendado desde el pool junto con su contador de páginas y métricas de uso"""
+
+    def __init__(self, driver, perfil=BROWSER_PERFIL):
+        self.driver = driver
+        self.perfil = perfil
+        self.paginas = 0
+        self.creado = time.time()
+        self.tiempo_activo = 0.0
+        self.arrendada_en = None
+
+    def registrar_pagina(self):
+        """Contar una página cargada con este driver"""
+        self.paginas += 1
+
+    def marcar_arriendo(self):
+        """Iniciar la medición de tiempo activo"""
+        self.arrendada_en = time.time()
+
+    def marcar_devolucion(self):
+        """Acumular el tiempo activo del arriendo actual"""
+        if self.arrendada_en:
+            self.tiempo_activo += time.time() - self.arrendada_en
+            self.arrendada_en = None
+
+    def memoria_mb(self):
+        """Memoria usada por el navegador en MB
+
+        Con psutil suma el RSS de chromedriver y todos sus procesos Chrome;
+        sin psutil usa el heap JS reportado por CDP (Performance.getMetrics).
+        """
+        if psutil:
+            try:
+                proceso = psutil.Process(self.driver.service.process.pid)
+                procesos = [proceso] + proceso.children(recursive=True)
+                return round(sum(p.memory_info().rss for p in procesos) / 1024 / 1024, 1)
+            except Exception:
+                pass
+
+        try:
+            metricas = self.driver.execute_cdp_cmd("Performance.getMetrics", {})
+            heap = next(m['value'] for m in metricas['metrics'] if m['name'] == 'JSHeapTotalSize')
+            return round(heap / 1024 / 1024, 1)
+        except Exception:
+            return None
+
+    def metricas(self):
+        """Páginas por minuto (sobre tiempo activo) y memoria actual del navegador"""
+        activo = self.tiempo_activo
+        if self.arrendada_en:
+            activo += time.time() - self.arrendada_en
+
+        minutos = activo / 60
+        return {
+            'perfil': self.perfil,
+            'paginas': self.paginas,
+            'segundos_activo': round(activo, 2),
+            'paginas_por_minuto': round(self.paginas / minutos, 2) if minutos > 0 else 0.0,
+            'memoria_mb': self.memoria_mb()
+        }
+
+    def esta_sana(self):
+        """Verificar que el navegador sigue respondiendo"""
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def cerrar(self):
+        """Cerrar el navegador ignorando errores de un driver ya caído"""
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+
+class BrowserPool:
+    """
+    Pool de N navegadores calientes compartidos entre scrapers
+
+    Los scrapers arriendan una sesión por categoría y la devuelven al terminar.
+    Cada sesión se verifica antes de entregarse y se recicla al superar
+    `max_paginas` páginas para limitar el crecimiento de memoria de Chrome.
+    """
+
+    def __init__(self, size=BROWSER_POOL_SIZE, max_paginas=BROWSER_POOL_MAX_PAGINAS,
+                 espera=BROWSER_POOL_ESPERA, perfil=BROWSER_PERFIL, factory=crear_driver):
+        self.size = max(1, size)
+        self.perfil = perfil
+        self.max_paginas = max_paginas
+        self.espera = espera
+        self.factory = factory
+        self._libres = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._creadas = 0
+        self._cerrado = False
+        self.stats = {'arriendos': 0, 'creadas': 0, 'recicladas': 0, 'descartadas': 0}
+        self.historial = []
+
+    def _crear_sesion(self):
+        """Crear una sesión nueva reservando su lugar en el pool"""
+        with self._lock:
+            if self._creadas >= self.size:
+                return None
+            self._creadas += 1
+
+        try:
+            sesion = BrowserSession(self.factory(self.perfil), self.perfil)
+        except Exception:
+            with self._lock:
+                self._creadas -= 1
+            raise
+
+        self.stats['creadas'] += 1
+        logger.info(f"🌐 Navegador creado en pool ({self._creadas}/{self.size})")
+        return sesion
+
+    def _descartar(self, sesion):
+        """Cerrar una sesión y liberar su lugar en el pool, guardando sus métricas"""
+        if sesion.paginas:
+            metricas = sesion.metricas()
+            self.historial.append(metricas)
+            logger.info(
+                f"📈 Navegador [{metricas['perfil']}]: {metricas['paginas']} páginas, "
+                f"{metricas['paginas_por_minuto']} pág/min, memoria={metricas['memoria_mb']} MB"
+            )
+        sesion.cerrar()
+        with self._lock:
+            self._creadas -= 1
+
+    def calentar(self, cantidad=None):
+        """Crear navegadores por adelantado para evitar el costo de arranque en la primera categoría"""
+        for _ in range(cantidad or self.size):
+            try:
+                sesion = self._crear_sesion()
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo precalentar navegador: {e}")
+                break
+            if sesion is None:
+                break
+            self._libres.put(sesion)
+
+    def adquirir(self):
+        """Arrendar una sesión sana, creando una nueva si hay cupo o esperando a que se libere otra"""
+        if self._cerrado:
+            raise RuntimeError("El pool de navegadores está cerrado")
+
+        limite = time.time() + self.espera
+        while True:
+            try:
+                sesion = self._libres.get_nowait()
+            except queue.Empty:
+                sesion = self._crear_sesion()
+                if sesion is None:
+                    # Esperar en intervalos cortos: un reciclaje puede liberar cupo sin devolver sesión
+                    restante = limite - time.time()
+                    if restante <= 0:
+                        raise TimeoutError(f"No hay navegadores libres tras {self.espera}s")
+                    try:
+                        sesion = self._libres.get(timeout=min(1, restante))
+                    except queue.Empty:
+                        continue
+
+            if sesion.esta_sana():
+                self.stats['arriendos'] += 1
+                sesion.marcar_arriendo()
+                return sesion
+
+            logger.warning("⚠️ Navegador sin respuesta descartado del pool")
+            self.stats['descartadas'] += 1
+            self._descartar(sesion)
+
+    def liberar(self, sesion):
+        """Devolver una sesión al pool, reciclándola si superó el máximo de páginas"""
+        sesion.marcar_devolucion()
+        if self._cerrado:
+            self._descartar(sesion)
+        elif sesion.paginas >= self.max_paginas:
+            logger.info(f"♻️ Reciclando navegador tras {sesion.paginas} páginas")
+            self.stats['recicladas'] += 1
+            self._descartar(sesion)
+        else:
+            self._libres.put(sesion)
+
+    @contextmanager
+    def sesion(self):
+        """Arrendar una sesión durante el bloque `with` y devolverla al salir"""
+        sesion = self.adquirir()
+        try:
+            yield sesion
+        finally:
+            self.liberar(sesion)
+
+    def cerrar(self):
+        """Cerrar todos los navegadores libres del pool"""
+        self._cerrado = True
+        while True:
+            try:
+                self._descartar(self._libres.get_nowait())
+            except queue.Empty:
+                break
+        logger.info(f"🧹 Pool de navegadores cerrado: {self.stats}")
+
+    def resumen_metricas(self):
+        """Métricas agregadas de las sesiones cerradas, para comparar perfiles"""
+        if not self.historial:
+            return None
+
+        paginas = sum(m['paginas'] for m in self.historial)
+        minutos = sum(m['segundos_activo'] for m in self.historial) / 60
+        memorias = [m['memoria_mb'] for m in self.historial if m['memoria_mb'] is not None]
+
+        return {
+            'perfil': self.perfil,
+            'sesiones': len(self.historial),
+            'paginas': paginas,
+            'paginas_por_minuto': round(paginas / minutos, 2) if minutos > 0 else 0.0,
+            'memoria_mb_promedio': round(sum(memorias) / len(memorias), 1) if memorias else None,
+            'memoria_mb_max': max(memorias) if memorias else None
+        }
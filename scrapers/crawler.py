@@ -0,0 +1,105 @@
+"""
+Crawler - Recorre todas las tandas de productos de una categoría
+
+Soporta los dos patrones de las tiendas VTEX:
+    - scroll: scroll infinito / botón "Mostrar más" sobre la misma página
+    - paginas: páginas numeradas con ?page=N
+
+En cada tanda solo se leen los contenedores de productos nuevos (su outerHTML,
+en una sola llamada al navegador), así el scraper puede extraerlos y guardarlos
+mientras la categoría sigue cargando, sin volver a parsear la página completa.
+"""
+import sys
+sys.path.append('.')
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+
+from scrapers.readiness import esperar_productos
+
+# outerHTML de los contenedores a partir del índice indicado
+JS_FRAGMENTOS = """
+return Array.prototype.slice.call(document.querySelectorAll(arguments[0]), arguments[1])
+    .map(function (e) { return e.outerHTML; });
+"""
+
+# Vaciar contenedores ya procesados manteniendo su altura (la grilla no salta)
+JS_LIBERAR = """
+var els = document.querySelectorAll(arguments[0]);
+for (var i = arguments[1]; i < Math.min(arguments[2], els.length); i++) {
+    els[i].style.minHeight = els[i].offsetHeight + 'px';
+    els[i].innerHTML = '';
+}
+"""
+
+
+def pulsar_mostrar_mas(driver, selector_boton):
+    """Pulsar el botón "Mostrar más" si la tienda lo usa y está visible"""
+    if not selector_boton:
+        return False
+    try:
+        botones = driver.find_elements(By.CSS_SELECTOR, selector_boton)
+        for boton in botones:
+            if boton.is_displayed() and boton.is_enabled():
+                driver.execute_script("arguments[0].click();", boton)
+                return True
+    except WebDriverException:
+        pass
+    return False
+
+
+def tandas_scroll(driver, selector, perfil):
+    """
+    Generador de listas de outerHTML con los productos nuevos de cada tanda
+
+    Hace scroll al final (y pulsa "Mostrar más") hasta que el conteo de
+    productos deja de crecer o se alcanza `max_tandas`.
+    """
+    vistos = 0
+    espera_tanda = {**perfil, 'timeout': perfil['timeout_tanda']}
+
+    for _ in range(perfil['max_tandas']):
+        fragmentos = driver.execute_script(JS_FRAGMENTOS, selector, vistos)
+        if fragmentos:
+            if perfil.get('liberar_dom'):
+                driver.execute_script(JS_LIBERAR, selector, vistos, vistos + len(fragmentos))
+            vistos += len(fragmentos)
+            yield fragmentos
+
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        pulsar_mostrar_mas(driver, perfil.get('boton_mas'))
+
+        try:
+            esperar_productos(driver, selector, {**espera_tanda, 'minimo': vistos + 1})
+        except TimeoutException:
+            return
+
+
+def tandas_paginas(driver, url, selector, perfil, cargar):
+    """
+    Generador de listas de outerHTML, una por cada página ?page=N
+
+    Se detiene con una página vacía o repetida (VTEX repite la última página
+    cuando se pide una fuera de rango). `cargar` es la función que navega a la
+    URL y espera a que la página esté lista.
+    """
+    firmas = set()
+    separador = '&' if '?' in url else '?'
+
+    for pagina in range(1, perfil['max_tandas'] + 1):
+        if pagina > 1:
+            cargar(f"{url}{separador}page={pagina}")
+
+        fragmentos = driver.execute_script(JS_FRAGMENTOS, selector, 0)
+        firma = hash(tuple(fragmentos))
+        if not fragmentos or firma in firmas:
+            return
+        firmas.add(firma)
+        yield fragmentos
+
+
+def iterar_tandas(driver, url, selector, perfil, cargar):
+    """Elegir la estrategia de recorrido según el perfil de la tienda"""
+    if perfil.get('paginacion') == 'paginas':
+        return tandas_paginas(driver, url, selector, perfil, cargar)
+    return tandas_scroll(driver, selector, perfil)
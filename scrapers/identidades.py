@@ -0,0 +1,169 @@
+"""
+Identidades - Caché en memoria de los IDs de tiendas, categorías, marcas y productos
+
+Se precarga una vez por proceso con una consulta por tabla; después los
+scrapers resuelven los IDs en memoria y solo consultan la BD ante un fallo.
+Los productos y marcas que crea la ingesta se registran aquí al volver del
+procedimiento, así una corrida diaria sobre un catálogo estable casi no hace
+consultas de búsqueda.
+"""
+import sys
+sys.path.append('.')
+
+import logging
+import threading
+
+from config.settings import IDENTIDADES_PRECARGA
+
+logger = logging.getLogger(__name__)
+
+TIPOS = ('tiendas', 'categorias', 'marcas', 'productos')
+
+
+class MapaIdentidades:
+    """
+    Mapa nombre/sku -> id compartido por todos los scrapers del proceso
+
+    Las consultas ante un fallo solo se hacen para tiendas y categorías; las
+    marcas y productos que no están en memoria los resuelve sp_ingesta_lote.
+    """
+
+    def __init__(self):
+        self.tiendas = {}
+        self.categorias = {}
+        self.marcas = {}
+        self.productos_nombre = {}
+        self.productos_sku = {}
+        self.huellas = {}  # producto_id -> huella del catálogo guardada en productos.huella
+        self.stats = {tipo: {'aciertos': 0, 'fallos': 0} for tipo in TIPOS}
+        self.consultas = 0
+        self.cargado = False
+        self._lock = threading.Lock()
+
+    def _contar(self, tipo, acierto):
+        with self._lock:
+            self.stats[tipo]['aciertos' if acierto else 'fallos'] += 1
+
+    def calentar(self, cursor, productos=IDENTIDADES_PRECARGA):
+        """Cargar todas las identidades conocidas (solo la primera vez en el proceso)"""
+        with self._lock:
+            if self.cargado:
+                return
+
+            cursor.execute("SELECT id, nombre FROM tiendas")
+            self.tiendas.update((nombre, id_) for id_, nombre in cursor.fetchall())
+
+            cursor.execute("SELECT id, nombre FROM categorias")
+            self.categorias.update((nombre, id_) for id_, nombre in cursor.fetchall())
+
+            cursor.execute("SELECT id, nombre FROM marcas")
+            self.marcas.update((nombre, id_) for id_, nombre in cursor.fetchall())
+            self.consultas += 3
+
+            if productos:
+                cursor.execute("SELECT id, nombre, sku, huella FROM productos")
+                for id_, nombre, sku, huella in cursor.fetchall():
+                    self._guardar_producto(id_, nombre, sku, huella)
+                self.consultas += 1
+
+            self.cargado = True
+
+        logger.info(
+            f"🧠 Identidades precargadas: {len(self.tiendas)} tiendas, {len(self.categorias)} categorías, "
+            f"{len(self.marcas)} marcas, {len(self.productos_nombre)} productos"
+        )
+
+    def _buscar(self, tipo, cache, cursor, sql, nombre):
+        """Resolver en memoria y consultar la BD solo si no está"""
+        if nombre in cache:
+            self._contar(tipo, True)
+            return cache[nombre]
+
+        self._contar(tipo, False)
+        cursor.execute(sql, nombre)
+        row = cursor.fetchone()
+        with self._lock:
+            self.consultas += 1
+            if row:
+                cache[nombre] = row[0]
+        return row[0] if row else None
+
+    def tienda_id(self, cursor, nombre):
+        """ID de la tienda por nombre (None si no existe)"""
+        return self._buscar('tiendas', self.tiendas, cursor, "SELECT id FROM tiendas WHERE nombre = ?", nombre)
+
+    def categoria_id(self, cursor, nombre):
+        """ID de la categoría por nombre (None si no existe)"""
+        return self._buscar('categorias', self.categorias, cursor, "SELECT id FROM categorias WHERE nombre = ?", nombre)
+
+    def marca_id(self, nombre):
+        """ID de la marca si ya se conoce, sin consultar la BD"""
+        if not nombre:
+            return None
+        id_ = self.marcas.get(nombre)
+        self._contar('marcas', id_ is not None)
+        return id_
+
+    def producto_id(self, nombre, sku=None):
+        """ID del producto por nombre o SKU si ya se conoce, sin consultar la BD"""
+        id_ = self.productos_nombre.get(nombre)
+        if id_ is None and sku:
+            id_ = self.productos_sku.get(sku)
+        self._contar('productos', id_ is not None)
+        return id_
+
+    def huella(self, producto_id):
+        """Huella de catálogo conocida del producto (None si no se conoce)"""
+        return self.huellas.get(producto_id)
+
+    def _guardar_producto(self, id_, nombre, sku, huella=None):
+        self.productos_nombre[nombre] = id_
+        if sku:
+            self.productos_sku[sku] = id_
+        if huella:
+            self.huellas[id_] = huella
+
+    def registrar_producto(self, id_, nombre, sku=None, huella=None):
+        """Registrar un producto resuelto o creado en la BD"""
+        with self._lock:
+            self._guardar_producto(id_, nombre, sku, huella)
+
+    def registrar_huella(self, id_, huella):
+        """Registrar la huella con la que quedó guardado un producto"""
+        with self._lock:
+            self.huellas[id_] = huella
+
+    def registrar_marca(self, id_, nombre):
+        """Registrar una marca resuelta o creada en la BD"""
+        with self._lock:
+            self.marcas[nombre] = id_
+
+    def resumen(self):
+        """Aciertos, fallos y consultas realizadas desde que inició el proceso"""
+        with self._lock:
+            aciertos = sum(s['aciertos'] for s in self.stats.values())
+            fallos = sum(s['fallos'] for s in self.stats.values())
+            return {
+                'aciertos': aciertos,
+                'fallos': fallos,
+                'tasa_aciertos': round(aciertos / (aciertos + fallos), 3) if aciertos + fallos else None,
+                'consultas': self.consultas,
+                'por_tipo': {tipo: dict(s) for tipo, s in self.stats.items()}
+            }
+
+    def limpiar(self):
+        """Olvidar todo (la próxima conexión vuelve a precargar)"""
+        with self._lock:
+            for cache in (self.tiendas, self.categorias, self.marcas, self.productos_nombre, self.productos_sku,
+                          self.huellas):
+                cache.clear()
+            self.cargado = False
+
+
+# Un único mapa por proceso (en modo "process" cada worker tiene el suyo)
+_identidades = MapaIdentidades()
+
+
+def obtener_identidades():
+    """Retornar el mapa de identidades del proceso"""
+    return _identidades
@@ -0,0 +1,184 @@
+"""
+Ingesta masiva - Carga los productos de una categoría por lotes en pocas idas a la BD
+
+En lugar de EXEC sp_upsert_producto + INSERT precios por cada producto, las
+filas se acumulan y cada lote se envía con fast_executemany a la tabla
+staging_productos; luego sp_ingesta_lote resuelve marcas, productos y precios
+con sentencias MERGE/INSERT basadas en conjuntos. Son 3 idas a la BD por lote
+(carga, procedimiento y commit) sin importar cuántos productos tenga.
+"""
+import sys
+sys.path.append('.')
+
+import hashlib
+import logging
+import time
+import uuid
+
+from config.settings import INGESTA_LOTE, PRECIOS_MAX_HUECO_DIAS
+
+logger = logging.getLogger(__name__)
+
+COLUMNAS_STAGING = (
+    'nombre', 'descripcion', 'url_imagen', 'marca', 'sku', 'precio', 'stock', 'rating', 'url'
+)
+
+# marca_id y producto_id van resueltos desde el mapa de identidades (NULL si no se conocen)
+INSERT_STAGING = (
+    f"INSERT INTO staging_productos (lote_id, fila, {', '.join(COLUMNAS_STAGING)}, huella, marca_id, producto_id) "
+    f"VALUES (?, ?, {', '.join('?' for _ in COLUMNAS_STAGING)}, ?, ?, ?)"
+)
+
+# Campos de catálogo que forman la huella; precio, stock y rating no (se registran siempre)
+CAMPOS_HUELLA = ('nombre', 'descripcion', 'url_imagen', 'marca', 'sku')
+
+
+def huella_producto(data, categoria_nombre=None):
+    """Hash (32 caracteres hex) de los datos de catálogo de un producto
+
+    Si coincide con productos.huella no hace falta actualizar el producto.
+    """
+    valores = [str(data.get(campo) or '') for campo in CAMPOS_HUELLA] + [categoria_nombre or '']
+    return hashlib.blake2b("\x1f".join(valores).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class IngestaMasiva:
+    """
+    Buffer de productos extraídos que se vuelca a la BD por lotes
+
+    Args:
+        conn: Conexión pyodbc del scraper
+        tienda_id: ID de la tienda
+        categoria_nombre: Nombre de la categoría scrapeada
+        respaldo: función(data) -> True (precio nuevo) / False (ya existía) / None (error)
+            usada fila por fila si el lote completo falla
+        tamano_lote: filas por lote
+        identidades: MapaIdentidades para enviar los IDs ya conocidos y
+            registrar los que resuelva el procedimiento
+    """
+
+    def __init__(self, conn, tienda_id, categoria_nombre, respaldo=None, tamano_lote=INGESTA_LOTE,
+                 identidades=None):
+        self.conn = conn
+        self.tienda_id = tienda_id
+        self.categoria_nombre = categoria_nombre
+        self.respaldo = respaldo
+        self.tamano_lote = tamano_lote
+        self.identidades = identidades
+        self.filas = []
+        self.stats = {
+            'nuevos': 0, 'actualizados': 0, 'errores': 0, 'sin_cambios': 0, 'lotes': 0, 'segundos_bd': 0.0
+        }
+
+    def agregar(self, data):
+        """Agregar un producto al lote, volcando cuando se llena"""
+        self.filas.append(data)
+        if len(self.filas) >= self.tamano_lote:
+            self.volcar()
+
+    def volcar(self):
+        """Enviar el lote actual a la BD"""
+        if not self.filas:
+            return
+
+        filas, self.filas = self.filas, []
+        inicio = time.time()
+
+        try:
+            nuevos, actualizados, descartados = self._cargar_lote(filas)
+            self.stats['nuevos'] += nuevos
+            self.stats['actualizados'] += actualizados
+            self.stats['lotes'] += 1
+            if descartados:
+                # Varias filas del lote resolvieron al mismo producto; solo se guardó la última
+                logger.warning(
+                    f"⚠️ {descartados} productos del lote de {self.categoria_nombre} descartados "
+                    f"por repetir un producto ya presente en el lote"
+                )
+                self.stats['errores'] += descartados
+        except Exception as e:
+            logger.error(f"❌ Error en ingesta masiva de {len(filas)} productos: {e}")
+            self.conn.rollback()
+            self._cargar_por_fila(filas)
+        finally:
+            self.stats['segundos_bd'] += time.time() - inicio
+
+    def _cargar_lote(self, filas):
+        """Carga a staging + procedimiento set-based. Retornar (nuevos, actualizados, descartados)"""
+        lote_id = str(uuid.uuid4())
+        registros = []
+        huellas = {}    # nombre -> huella del lote
+        conocidos = []  # (producto_id, huella) de los productos que ya estaban en memoria
+        sin_cambios = 0
+
+        for numero, data in enumerate(filas):
+            huella = huella_producto(data, self.categoria_nombre)
+            marca_id, producto_id = self._ids(data)
+            huellas[data.get('nombre')] = huella
+            if producto_id:
+                conocidos.append((producto_id, huella))
+                if self.identidades.huella(producto_id) == huella:
+                    sin_cambios += 1
+            registros.append((
+                lote_id, numero, *(data.get(columna) for columna in COLUMNAS_STAGING),
+                huella, marca_id, producto_id
+            ))
+
+        cursor = self.conn.cursor()
+        try:
+            cursor.fast_executemany = True
+            cursor.executemany(INSERT_STAGING, registros)
+
+            cursor.execute(
+                "EXEC sp_ingesta_lote ?, ?, ?, ?",
+                lote_id, self.tienda_id, self.categoria_nombre, PRECIOS_MAX_HUECO_DIAS
+            )
+            nuevos, actualizados, descartados = cursor.fetchone()
+
+            # Siguientes resultados: productos y marcas resueltos o creados por el procedimiento
+            resueltos, marcas = [], []
+            if self.identidades and cursor.nextset():
+                resueltos = cursor.fetchall()
+                if cursor.nextset():
+                    marcas = cursor.fetchall()
+
+            self.conn.commit()
+        finally:
+            cursor.close()
+
+        if self.identidades:
+            # El procedimiento dejó productos.huella igual a la del lote
+            for producto_id, huella in conocidos:
+                self.identidades.registrar_huella(producto_id, huella)
+            for producto_id, nombre, sku in resueltos:
+                self.identidades.registrar_producto(producto_id, nombre, sku, huellas.get(nombre))
+            for marca_id, nombre in marcas:
+                self.identidades.registrar_marca(marca_id, nombre)
+
+        self.stats['sin_cambios'] += sin_cambios
+        return nuevos, actualizados, descartados
+
+    def _ids(self, data):
+        """(marca_id, producto_id) conocidos en memoria para una fila"""
+        if not self.identidades:
+            return None, None
+        return (
+            self.identidades.marca_id(data.get('marca')),
+            self.identidades.producto_id(data.get('nombre'), data.get('sku'))
+        )
+
+    def _cargar_por_fila(self, filas):
+        """Respaldo: procesar el lote fallido producto por producto"""
+        if not self.respaldo:
+            self.stats['errores'] += len(filas)
+            return
+
+        for data in filas:
+            resultado = self.respaldo(data)
+            if resultado is None:
+                self.stats['errores'] += 1
+            elif resultado:
+                self.stats['nuevos'] += 1
+            else:
+                self.stats['actualizados'] += 1
+        self.conn.commit()
@@ -0,0 +1,65 @@
+"""
+Extracción offline - Pasa páginas HTML guardadas por get_product_selector/extract_product_data sin navegador
+
+Sirve para tests, benchmarks y para revisar los selectores de una tienda con
+una página guardada desde el navegador:
+
+    py -m scrapers.offline pagina.html --tienda Wong
+"""
+import sys
+sys.path.append('.')
+
+import argparse
+import json
+import os
+
+from scrapers.wong import WongScraper
+from scrapers.metro import MetroScraper
+from scrapers.plaza_vea import PlazaVeaScraper
+
+FIXTURES_HTML = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "fixtures", "html")
+
+# Páginas de categoría guardadas de cada tienda (tests/fixtures/html)
+CORPUS = {
+    WongScraper: ["wong_salud.html"],
+    MetroScraper: ["metro_cuidado_personal.html"],
+    PlazaVeaScraper: ["plaza_vea_alimentos_organicos.html"]
+}
+
+
+def cargar_pagina(ruta):
+    """Leer una página guardada (ruta absoluta o nombre dentro de tests/fixtures/html)"""
+    if not os.path.isabs(ruta) and not os.path.exists(ruta):
+        ruta = os.path.join(FIXTURES_HTML, ruta)
+    with open(ruta, encoding="utf-8") as f:
+        return f.read()
+
+
+def extraer_pagina(scraper, html):
+    """Extraer todos los contenedores de una página. Retornar la lista de dicts (None si se descartó)"""
+    return [scraper.extract_product_data(tarjeta) for tarjeta in scraper.get_tarjetas(html)]
+
+
+def extraer_productos(scraper, html):
+    """Igual que el recorrido real: solo productos válidos y sin URLs repetidas"""
+    scraper.urls_vistas = set()
+    return [data for data in extraer_pagina(scraper, html) if data and scraper.es_producto_nuevo(data)]
+
+
+def main():
+    tiendas = {scraper_cls.__name__.replace("Scraper", "").lower(): scraper_cls for scraper_cls in CORPUS}
+
+    parser_args = argparse.ArgumentParser(description="Extraer productos de una página HTML guardada")
+    parser_args.add_argument("archivo")
+    parser_args.add_argument("--tienda", default="wong", help="wong | metro | plazavea")
+    args = parser_args.parse_args()
+
+    scraper = tiendas[args.tienda.lower().replace(" ", "")]()
+    productos = extraer_productos(scraper, cargar_pagina(args.archivo))
+
+    print(json.dumps(productos, indent=2, ensure_ascii=False))
+    print(f"📦 {len(productos)} productos extraídos con {scraper.parser.nombre}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
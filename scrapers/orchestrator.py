@@ -0,0 +1,221 @@
+"""
+Orquestador - Ejecuta tiendas y categorías en paralelo
+"""
+import sys
+sys.path.append('.')
+
+import logging
+import time
+import pyodbc
+from multiprocessing import util as mp_util
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+from config.settings import (
+    DATABASE_URL, CATEGORIAS, FETCH_BACKEND, SCRAPER_POOL, SCRAPER_CONCURRENCIA_TIENDA, SCRAPER_CONCURRENCIA_POR_TIENDA
+)
+from scrapers.base_scraper import nombre_categoria, finalizar_scraping
+from scrapers.identidades import obtener_identidades
+from scrapers.browser_pool import BrowserPool
+from scrapers.wong import WongScraper
+from scrapers.metro import MetroScraper
+from scrapers.plaza_vea import PlazaVeaScraper
+
+logger = logging.getLogger(__name__)
+
+SCRAPERS = [WongScraper, MetroScraper, PlazaVeaScraper]
+
+CAMPOS_STATS = ('encontrados', 'nuevos', 'actualizados', 'errores')
+
+# Pool de navegadores propio de cada proceso worker (modo "process")
+_pool_proceso = None
+
+
+def _obtener_pool_proceso():
+    """Pool de un navegador por proceso worker, reutilizado entre las categorías que atiende"""
+    global _pool_proceso
+    if _pool_proceso is None:
+        _pool_proceso = BrowserPool(size=1)
+        # Cerrar Chrome cuando el executor termine el proceso worker
+        mp_util.Finalize(None, _pool_proceso.cerrar, exitpriority=10)
+    return _pool_proceso
+
+
+def _ejecutar_tienda(scraper_cls, categorias, pool=None):
+    """Ejecutar un grupo de categorías de una tienda con una sola instancia de scraper
+
+    Las categorías del grupo comparten conexión a BD y búsqueda de la tienda;
+    el cierre de la tienda lo hace el orquestador (finalizar_tienda). Es una
+    función de módulo para poder enviarse a un ProcessPoolExecutor. Sin pool
+    compartido (modo "process") usa el pool del proceso worker.
+
+    Retornar: dict {categoria_nombre: stats}
+    """
+    scraper = scraper_cls(pool=pool or _obtener_pool_proceso())
+    return scraper.run(categorias=categorias, finalizar=False)
+
+
+def finalizar_tienda(tienda, nuevos):
+    """Cerrar el scraping de una tienda una sola vez, cuando terminaron todos sus workers
+
+    Así los dashboards reciben un solo evento 'scraping' por tienda con el total
+    de precios nuevos, en vez de uno por cada grupo de categorías.
+    """
+    conn = None
+    try:
+        conn = pyodbc.connect(DATABASE_URL)
+        cursor = conn.cursor()
+        finalizar_scraping(cursor, obtener_identidades().tienda_id(cursor, tienda), nuevos)
+        conn.commit()
+    except Exception as e:
+        logger.error(f"❌ Error cerrando el scraping de {tienda}: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+
+def repartir_categorias(categorias, grupos):
+    """Repartir las categorías en `grupos` listas de tamaño parejo (round-robin)"""
+    return [categorias[i::grupos] for i in range(grupos) if categorias[i::grupos]]
+
+
+def concurrencia_tienda(tienda_nombre):
+    """Máximo de categorías simultáneas permitidas para una tienda"""
+    return max(1, SCRAPER_CONCURRENCIA_POR_TIENDA.get(tienda_nombre, SCRAPER_CONCURRENCIA_TIENDA))
+
+
+def ejecutar_scrapers(scrapers=None, categorias=None, pool=None, browser_pool=None, finalizar=finalizar_tienda):
+    """
+    Ejecutar todas las tiendas y sus categorías en paralelo
+
+    Cada tienda tiene su propio executor limitado a su concurrencia máxima,
+    así todas las tiendas avanzan a la vez y el tiempo total depende de la
+    tienda más lenta, no de la suma de todas. Las categorías de la tienda se
+    reparten entre sus workers y cada worker las recorre con un solo scraper
+    (una conexión a BD). En modo "thread" todos los workers arriendan
+    navegadores de un mismo BrowserPool caliente.
+
+    Args:
+        scrapers: Lista de clases de scraper (por defecto Wong, Metro y Plaza Vea)
+        categorias: Lista de paths de categorías (por defecto CATEGORIAS)
+        pool: "thread" o "process" (por defecto SCRAPER_POOL)
+        browser_pool: BrowserPool compartido en modo "thread" (por defecto uno nuevo)
+        finalizar: función (tienda, nuevos) llamada una vez por tienda con alguna
+            categoría exitosa, al terminar todos sus workers (por defecto finalizar_tienda)
+
+    Retornar: dict resumen con estadísticas por tienda y totales
+    """
+    scrapers = scrapers or SCRAPERS
+    categorias = categorias or CATEGORIAS
+    pool = pool or SCRAPER_POOL
+    executor_cls = ProcessPoolExecutor if pool == "process" else ThreadPoolExecutor
+
+    # Los drivers no se pueden compartir entre procesos: cada worker crea el suyo
+    pool_propio = pool != "process" and browser_pool is None
+    if pool_propio:
+        browser_pool = BrowserPool()
+        # Con el backend API los navegadores solo se crean si alguna categoría necesita respaldo
+        if FETCH_BACKEND == "selenium":
+            browser_pool.calentar()
+    elif pool == "process":
+        browser_pool = None
+
+    inicio = time.time()
+    resumen = {'tiendas': {}, 'totales': dict.fromkeys(CAMPOS_STATS, 0)}
+    executors = []
+    futures = {}
+    pendientes = {}
+
+    logger.info(f"🚀 Orquestando {len(scrapers)} tiendas x {len(categorias)} categorías (pool={pool})")
+
+    try:
+        for scraper_cls in scrapers:
+            tienda = scraper_cls.tienda_nombre
+            max_workers = min(concurrencia_tienda(tienda), len(categorias))
+            executor = executor_cls(max_workers=max_workers)
+            executors.append(executor)
+
+            resumen['tiendas'][tienda] = {
+                **dict.fromkeys(CAMPOS_STATS, 0),
+                'categorias': {},
+                'fallidas': 0,
+                'concurrencia': max_workers
+            }
+
+            # Un worker = un scraper con su conexión para todas las categorías de su grupo
+            for grupo in repartir_categorias(categorias, max_workers):
+                future = executor.submit(_ejecutar_tienda, scraper_cls, grupo, browser_pool)
+                futures[future] = (tienda, [nombre_categoria(path) for path in grupo])
+                pendientes[tienda] = pendientes.get(tienda, 0) + 1
+
+        for future in as_completed(futures):
+            tienda, nombres = futures[future]
+            resumen_tienda = resumen['tiendas'][tienda]
+
+            try:
+                resultados = future.result()
+            except Exception as e:
+                logger.error(f"❌ Error en {tienda} / {', '.join(nombres)}: {e}")
+                resultados = {}
+
+            for categoria in nombres:
+                stats = resultados.get(categoria)
+                resumen_tienda['categorias'][categoria] = stats
+
+                if not stats:
+                    resumen_tienda['fallidas'] += 1
+                    continue
+
+                for campo in CAMPOS_STATS:
+                    resumen_tienda[campo] += stats.get(campo, 0)
+                    resumen['totales'][campo] += stats.get(campo, 0)
+
+            pendientes[tienda] -= 1
+            if pendientes[tienda] == 0 and any(resumen_tienda['categorias'].values()):
+                finalizar(tienda, resumen_tienda['nuevos'])
+
+    finally:
+        for executor in executors:
+            executor.shutdown(wait=True)
+        if pool_propio:
+            browser_pool.cerrar()
+
+    resumen['totales']['fallidas'] = sum(t['fallidas'] for t in resumen['tiendas'].values())
+    resumen['navegadores'] = browser_pool.resumen_metricas() if browser_pool else None
+    resumen['tiempo_total'] = round(time.time() - inicio, 2)
+
+    for linea in formatear_resumen(resumen):
+        logger.info(linea)
+
+    return resumen
+
+
+def formatear_resumen(resumen):
+    """Convertir el resumen de ejecución en líneas de texto legibles"""
+    lineas = []
+
+    for tienda, stats in resumen['tiendas'].items():
+        lineas.append(
+            f"🏪 {tienda}: encontrados={stats['encontrados']} nuevos={stats['nuevos']} "
+            f"actualizados={stats['actualizados']} errores={stats['errores']} "
+            f"categorías fallidas={stats['fallidas']}"
+        )
+
+    totales = resumen['totales']
+    lineas.append(
+        f"📊 TOTAL: encontrados={totales['encontrados']} nuevos={totales['nuevos']} "
+        f"actualizados={totales['actualizados']} errores={totales['errores']} "
+        f"categorías fallidas={totales['fallidas']}"
+    )
+    navegadores = resumen.get('navegadores')
+    if navegadores:
+        lineas.append(
+            f"🌐 Navegadores [{navegadores['perfil']}]: {navegadores['sesiones']} sesiones, "
+            f"{navegadores['paginas_por_minuto']} pág/min, "
+            f"memoria promedio={navegadores['memoria_mb_promedio']} MB, máx={navegadores['memoria_mb_max']} MB"
+        )
+    lineas.append(f"⏱️ Tiempo total: {resumen['tiempo_total']}s")
+    return lineas
+
+
+if __name__ == "__main__":
+    ejecutar_scrapers()
@@ -0,0 +1,169 @@
+"""
+Parsing - Capa intercambiable para parsear tarjetas de productos
+
+Backends:
+    - bs4: BeautifulSoup con html.parser (Python puro, siempre disponible)
+    - lxml: parser en C de lxml + selectores CSS compilados a XPath con cssselect
+
+Cada tienda declara sus cadenas de selectores por campo (PLAN_EXTRACCION) y
+se compilan una sola vez por backend en un PlanExtraccion; extract_product_data
+solo interpreta los valores crudos que retorna el plan.
+"""
+import sys
+sys.path.append('.')
+
+import logging
+import threading
+from bs4 import BeautifulSoup
+
+from config.settings import PARSER_BACKEND
+
+# lxml y cssselect son opcionales: sin ellos se usa BeautifulSoup
+try:
+    import lxml.html
+    from lxml import etree
+    from cssselect import GenericTranslator
+except ImportError:
+    lxml = None
+
+logger = logging.getLogger(__name__)
+
+
+class ParserBS4:
+    """Backend BeautifulSoup (html.parser)"""
+
+    nombre = "bs4"
+
+    def tarjetas(self, fragmentos):
+        """Elementos raíz de una lista de outerHTML de tarjetas"""
+        return [BeautifulSoup(html, "html.parser").find(True) for html in fragmentos]
+
+    def contenedores(self, html, selector):
+        """Contenedores de productos de una página completa"""
+        return BeautifulSoup(html, "html.parser").select(selector)
+
+    def compilar(self, selector):
+        return selector
+
+    def primero(self, elemento, compilado):
+        return elemento.select_one(compilado)
+
+    def texto(self, elemento):
+        return elemento.get_text()
+
+    def atributo(self, elemento, nombre):
+        return elemento.get(nombre)
+
+
+class ParserLxml:
+    """Backend lxml: cada selector CSS se traduce una vez a un XPath compilado"""
+
+    nombre = "lxml"
+
+    def __init__(self):
+        self._traductor = GenericTranslator()
+
+    def tarjetas(self, fragmentos):
+        """Parsear todas las tarjetas de una tanda en una sola llamada al parser"""
+        if not fragmentos:
+            return []
+        contenedor = lxml.html.fragment_fromstring("".join(fragmentos), create_parent="div")
+        # Omitir comentarios entre tarjetas
+        return [elemento for elemento in contenedor if isinstance(elemento.tag, str)]
+
+    def contenedores(self, html, selector):
+        """Contenedores de productos de una página completa (sin recorrer el resto del DOM en Python)"""
+        return self.compilar(selector)(lxml.html.document_fromstring(html))
+
+    def compilar(self, selector):
+        # "descendant::" para no incluir al propio elemento, igual que select_one de bs4
+        return etree.XPath(self._traductor.css_to_xpath(selector, prefix="descendant::"))
+
+    def primero(self, elemento, compilado):
+        resultado = compilado(elemento)
+        return resultado[0] if resultado else None
+
+    def texto(self, elemento):
+        return elemento.text_content()
+
+    def atributo(self, elemento, nombre):
+        return elemento.get(nombre)
+
+
+BACKENDS = {'bs4': ParserBS4, 'lxml': ParserLxml}
+_parsers = {}
+
+
+def obtener_parser(nombre=PARSER_BACKEND):
+    """Retornar el parser del backend indicado (bs4 si lxml no está instalado)"""
+    if nombre not in BACKENDS:
+        raise ValueError(f"Backend de parsing desconocido: {nombre} (usar {', '.join(BACKENDS)})")
+
+    if nombre == "lxml" and lxml is None:
+        logger.warning("⚠️ lxml/cssselect no instalados, se usa BeautifulSoup")
+        nombre = "bs4"
+
+    if nombre not in _parsers:
+        _parsers[nombre] = BACKENDS[nombre]()
+    return _parsers[nombre]
+
+
+class PlanExtraccion:
+    """
+    Cadenas de selectores de una tienda compiladas para un backend
+
+    `campos` es un dict campo -> [selectores] (texto del primer elemento que
+    coincida) o campo -> ([selectores], (atributos)) (primer atributo no vacío
+    del primer elemento que coincida).
+    """
+
+    def __init__(self, campos, parser):
+        self.parser = parser
+        self.campos = []
+        for campo, definicion in campos.items():
+            selectores, atributos = definicion if isinstance(definicion, tuple) else (definicion, ())
+            if isinstance(atributos, str):
+                atributos = (atributos,)
+            compilados = tuple(parser.compilar(selector) for selector in selectores)
+            self.campos.append((campo, compilados, tuple(atributos)))
+
+    def extraer(self, elemento):
+        """Retornar dict campo -> valor crudo (sin los campos no encontrados)"""
+        parser = self.parser
+        valores = {}
+
+        for campo, compilados, atributos in self.campos:
+            encontrado = None
+            for compilado in compilados:
+                encontrado = parser.primero(elemento, compilado)
+                if encontrado is not None:
+                    break
+            if encontrado is None:
+                continue
+
+            if atributos:
+                for atributo in atributos:
+                    valor = parser.atributo(encontrado, atributo)
+                    if valor:
+                        valores[campo] = valor
+                        break
+            else:
+                valores[campo] = parser.texto(encontrado).strip()
+
+        return valores
+
+
+_planes = {}
+_planes_lock = threading.Lock()
+
+
+def obtener_plan(clave, campos, parser):
+    """Compilar el plan de una tienda una sola vez por backend"""
+    plan = _planes.get((clave, parser.nombre))
+    if plan is None:
+        with _planes_lock:
+            plan = _planes.get((clave, parser.nombre))
+            if plan is None:
+                plan = PlanExtraccion(campos, parser)
+                _planes[(clave, parser.nombre)] = plan
+    return plan
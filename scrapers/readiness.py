@@ -0,0 +1,79 @@
+"""
+Readiness - Espera basada en condiciones para saber cuándo una página terminó de renderizar sus productos
+"""
+import sys
+sys.path.append('.')
+
+import time
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+from config.settings import (
+    READINESS_TIMEOUT, READINESS_INTERVALO, READINESS_ESTABLE,
+    CRAWLER_MAX_TANDAS, CRAWLER_TIMEOUT_TANDA
+)
+
+# Perfil por defecto; cada tienda puede ajustarlo en get_perfil_carga()
+PERFIL_CARGA_DEFAULT = {
+    'timeout': READINESS_TIMEOUT,      # segundos máximos de espera antes de usar el delay fijo
+    'intervalo': READINESS_INTERVALO,  # frecuencia de sondeo del selector
+    'estable': READINESS_ESTABLE,      # segundos que el conteo debe mantenerse sin cambios
+    'minimo': 1,                       # productos mínimos para considerar la página lista
+    # Recorrido de la categoría (ver scrapers/crawler.py)
+    'paginacion': 'scroll',            # "scroll" (infinito / Mostrar más) o "paginas" (?page=N)
+    'max_tandas': CRAWLER_MAX_TANDAS,  # límite de tandas o páginas por categoría
+    'timeout_tanda': CRAWLER_TIMEOUT_TANDA,  # espera de nuevos productos tras cada scroll
+    'boton_mas': "div[class*='buttonShowMore'] button, button[class*='fetchMore'], a.load-more",
+    'liberar_dom': False               # vaciar en Chrome los contenedores ya procesados
+}
+
+
+class ConteoEstable:
+    """
+    Condición para WebDriverWait: el selector coincide con al menos `minimo`
+    nodos y el conteo no cambia durante `estable` segundos
+
+    Retorna el número de nodos cuando se cumple (False mientras no).
+    """
+
+    def __init__(self, selector, minimo=1, estable=1.0):
+        self.selector = selector
+        self.minimo = minimo
+        self.estable = estable
+        self.ultimo = None
+        self.desde = None
+
+    def __call__(self, driver):
+        total = len(driver.find_elements(By.CSS_SELECTOR, self.selector))
+        ahora = time.monotonic()
+
+        if total != self.ultimo:
+            self.ultimo = total
+            self.desde = ahora
+            return False
+
+        if total >= self.minimo and ahora - self.desde >= self.estable:
+            return total
+
+        return False
+
+
+def esperar_productos(driver, selector, perfil=None):
+    """
+    Esperar hasta que la página tenga un número estable de productos
+
+    Args:
+        driver: WebDriver de Selenium
+        selector: Selector CSS de los contenedores de productos
+        perfil: dict con timeout, intervalo, estable y minimo (ver PERFIL_CARGA_DEFAULT)
+
+    Retornar: (total_productos, segundos_hasta_listo)
+    Lanza TimeoutException si no se estabiliza dentro del timeout.
+    """
+    perfil = {**PERFIL_CARGA_DEFAULT, **(perfil or {})}
+    inicio = time.monotonic()
+
+    total = WebDriverWait(driver, perfil['timeout'], poll_frequency=perfil['intervalo']).until(
+        ConteoEstable(selector, perfil['minimo'], perfil['estable'])
+    )
+    return total, time.monotonic() - inicio
@@ -0,0 +1,167 @@
+"""
+VTEX Catalog API - Obtiene los productos de una categoría como JSON, sin navegador
+
+Wong, Metro y Plaza Vea son tiendas VTEX que exponen el endpoint público
+/api/catalog_system/pub/products/search. Cada página trae hasta 50 productos
+y el header `resources` ("0-49/523") indica el total de la categoría.
+"""
+import sys
+sys.path.append('.')
+
+import asyncio
+import logging
+import httpx
+
+from config.settings import (
+    TIMEOUT, VTEX_PAGE_SIZE, VTEX_MAX_PRODUCTOS, VTEX_MAX_CONEXIONES, VTEX_CONCURRENCIA
+)
+
+logger = logging.getLogger(__name__)
+
+SEARCH_PATH = "/api/catalog_system/pub/products/search/{categoria_path}"
+
+
+def mapear_producto(producto, base_url):
+    """Convertir un producto VTEX al mismo dict que retorna extract_product_data
+
+    Retornar None si el producto no tiene nombre o precio disponible.
+    """
+    items = producto.get('items') or []
+    item = items[0] if items else {}
+    sellers = item.get('sellers') or []
+    oferta = (sellers[0].get('commertialOffer') or {}) if sellers else {}
+
+    nombre = (producto.get('productName') or '').strip()
+    precio = oferta.get('Price')
+    if not nombre or not precio:
+        return None
+
+    data = {'nombre': nombre, 'precio': float(precio)}
+
+    link = producto.get('link') or (f"/{producto['linkText']}/p" if producto.get('linkText') else "")
+    data['url'] = link if not link or link.startswith('http') else f"{base_url}{link}"
+
+    imagenes = item.get('images') or []
+    if imagenes and imagenes[0].get('imageUrl'):
+        data['url_imagen'] = imagenes[0]['imageUrl']
+
+    if producto.get('brand'):
+        data['marca'] = producto['brand'].strip()
+
+    if oferta.get('AvailableQuantity') is not None:
+        data['stock'] = int(oferta['AvailableQuantity'])
+
+    return data
+
+
+def total_desde_resources(header):
+    """Leer el total de productos del header `resources` ("0-49/523")"""
+    try:
+        return int(header.split('/')[-1])
+    except (AttributeError, ValueError):
+        return None
+
+
+class VtexCatalogClient:
+    """
+    Cliente asíncrono del catálogo VTEX de una tienda
+
+    Mantiene un httpx.AsyncClient con pool de conexiones keep-alive sobre un
+    event loop propio. BaseScraper.run() crea uno por ejecución, así las
+    categorías que recorre un scraper (las de un worker del orquestador)
+    reutilizan las mismas conexiones. Las páginas de una categoría se piden en
+    paralelo. El loop es de un solo hilo: no se comparte entre workers.
+    """
+
+    def __init__(self, base_url, page_size=VTEX_PAGE_SIZE, max_productos=VTEX_MAX_PRODUCTOS,
+                 max_conexiones=VTEX_MAX_CONEXIONES, concurrencia=VTEX_CONCURRENCIA, timeout=TIMEOUT):
+        self.base_url = base_url.rstrip('/')
+        self.page_size = page_size
+        self.max_productos = max_productos
+        self.max_conexiones = max_conexiones
+        self.concurrencia = concurrencia
+        self.timeout = timeout
+        self._loop = asyncio.new_event_loop()
+        self._client = None
+
+    def _obtener_cliente(self):
+        """Crear el AsyncClient la primera vez (debe crearse dentro del loop)"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_conexiones,
+                    max_keepalive_connections=self.max_conexiones
+                ),
+                headers={'Accept': 'application/json'},
+                follow_redirects=True
+            )
+        return self._client
+
+    async def _obtener_pagina(self, categoria_path, desde):
+        """Obtener una página de productos. Retornar (productos, total)"""
+        client = self._obtener_cliente()
+        params = {
+            '_from': desde,
+            '_to': desde + self.page_size - 1,
+            'map': ','.join('c' for _ in categoria_path.strip('/').split('/'))
+        }
+        response = await client.get(SEARCH_PATH.format(categoria_path=categoria_path.strip('/')), params=params)
+
+        # VTEX responde 206 Partial Content cuando hay más páginas
+        if response.status_code not in (200, 206):
+            response.raise_for_status()
+
+        return response.json(), total_desde_resources(response.headers.get('resources'))
+
+    async def _obtener_ventana(self, categoria_path, desdes):
+        """Obtener varias páginas en paralelo sobre el mismo pool de conexiones"""
+        return await asyncio.gather(*(self._obtener_pagina(categoria_path, desde) for desde in desdes))
+
+    def _mapear_pagina(self, pagina):
+        """Mapear una página completa de productos VTEX"""
+        return [mapear_producto(producto, self.base_url) for producto in pagina]
+
+    def iterar_categoria(self, categoria_path):
+        """
+        Generador de los productos de una categoría, página por página
+
+        Tras la primera página (que trae el total en el header `resources`),
+        las siguientes se piden en ventanas de `concurrencia` páginas paralelas;
+        cada ventana se entrega antes de pedir la siguiente, así la memoria no
+        crece con el tamaño de la categoría.
+
+        Entrega el dict de cada producto (None para los que no tienen nombre o
+        precio, igual que extract_product_data).
+        """
+        ejecutar = self._loop.run_until_complete
+
+        pagina, total = ejecutar(self._obtener_pagina(categoria_path, 0))
+        yield from self._mapear_pagina(pagina)
+
+        if total is None:
+            # Sin header resources: avanzar página por página hasta una incompleta
+            desde = self.page_size
+            while len(pagina) == self.page_size and desde < self.max_productos:
+                pagina, _ = ejecutar(self._obtener_pagina(categoria_path, desde))
+                yield from self._mapear_pagina(pagina)
+                desde += self.page_size
+            return
+
+        desdes = list(range(self.page_size, min(total, self.max_productos), self.page_size))
+        for inicio in range(0, len(desdes), self.concurrencia):
+            ventana = desdes[inicio:inicio + self.concurrencia]
+            for pagina, _ in ejecutar(self._obtener_ventana(categoria_path, ventana)):
+                yield from self._mapear_pagina(pagina)
+
+    def obtener_categoria(self, categoria_path):
+        """Obtener todos los productos de una categoría como lista de dicts"""
+        return list(self.iterar_categoria(categoria_path))
+
+    def cerrar(self):
+        """Cerrar el cliente HTTP y su event loop"""
+        if self._client is not None:
+            self._loop.run_until_complete(self._client.aclose())
+            self._client = None
+        self._loop.close()
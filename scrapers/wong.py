@@ -11,8 +11,26 @@ from config.settings import WONG_BASE_URL
 class WongScraper(BaseScraper):
     """Scraper específico para Wong.pe"""
     
-    def __init__(self):
-        super().__init__("Wong", WONG_BASE_URL)
+    tienda_nombre = "Wong"
+    
+    # Selectores a intentar por campo (NOTA: pueden necesitar actualización)
+    PLAN_EXTRACCION = {
+        'nombre': [
+            "p.product-title", "h3.ProductCard__name", "h2.product-name",
+            "[data-test='product-name']", "a[class*='title']", "span[class*='name']"
+        ],
+        'precio': [
+            "span.product-prices__value", "span.ProductCard__price", "span[class*='price']",
+            "[data-test='product-price']", "div.price span"
+        ],
+        'url': (["a[href*='/p/']", "a.product-link", "a"], 'href'),
+        'url_imagen': (["img"], ('src', 'data-src', 'data-lazy-src')),
+        'marca': ["span.brand", "[data-test='product-brand']", "div.marca"],
+        'rating': ["span[class*='rating'], div.rating"]
+    }
+    
+    def __init__(self, driver=None, pool=None):
+        super().__init__(self.tienda_nombre, WONG_BASE_URL, driver=driver, pool=pool)
         
     def get_product_selector(self):
         """
@@ -22,37 +40,25 @@ class WongScraper(BaseScraper):
         # Intentar varios selectores comunes
         return "div.product-item, div.ProductCard, article.product, div[data-test='product-card']"
         
+    def get_perfil_carga(self):
+        """Perfil de espera de Wong: la grilla VTEX de Wong renderiza rápido"""
+        return {**super().get_perfil_carga(), 'timeout': 12, 'estable': 0.75}
+        
     def extract_product_data(self, producto_element):
         """Extraer datos de un producto de Wong"""
         try:
+            campos = self.plan.extraer(producto_element)
             data = {}
             
-            # Nombre - intentar varios selectores
-            nombre_elem = (
-                producto_element.select_one("p.product-title") or
-                producto_element.select_one("h3.ProductCard__name") or
-                producto_element.select_one("h2.product-name") or
-                producto_element.select_one("[data-test='product-name']") or
-                producto_element.select_one("a[class*='title']") or
-                producto_element.select_one("span[class*='name']")
-            )
-            
-            if nombre_elem:
-                data['nombre'] = nombre_elem.text.strip()
+            # Nombre
+            if campos.get('nombre'):
+                data['nombre'] = campos['nombre']
             else:
                 return None
                 
-            # Precio - intentar varios selectores
-            precio_elem = (
-                producto_element.select_one("span.product-prices__value") or
-                producto_element.select_one("span.ProductCard__price") or
-                producto_element.select_one("span[class*='price']") or
-                producto_element.select_one("[data-test='product-price']") or
-                producto_element.select_one("div.price span")
-            )
-            
-            if precio_elem:
-                precio_txt = precio_elem.text.replace("S/", "").replace("S/ ", "").replace(",", "").strip()
+            # Precio
+            if 'precio' in campos:
+                precio_txt = campos['precio'].replace("S/", "").replace("S/ ", "").replace(",", "").strip()
                 try:
                     data['precio'] = float(precio_txt)
                 except ValueError:
@@ -62,41 +68,26 @@ class WongScraper(BaseScraper):
                 return None
                 
             # URL del producto
-            link_elem = (
-                producto_element.select_one("a[href*='/p/']") or
-                producto_element.select_one("a.product-link") or
-                producto_element.find("a")
-            )
-            
-            if link_elem and link_elem.get('href'):
-                href = link_elem['href']
+            href = campos.get('url')
+            if href:
                 data['url'] = href if href.startswith('http') else f"{self.base_url}{href}"
             else:
                 data['url'] = ""
                 
             # Imagen
-            img_elem = producto_element.select_one("img")
-            if img_elem:
-                img_src = img_elem.get('src') or img_elem.get('data-src') or img_elem.get('data-lazy-src')
-                if img_src:
-                    data['url_imagen'] = img_src if img_src.startswith('http') else f"{self.base_url}{img_src}"
+            img_src = campos.get('url_imagen')
+            if img_src:
+                data['url_imagen'] = img_src if img_src.startswith('http') else f"{self.base_url}{img_src}"
                     
             # Marca (si está disponible)
-            marca_elem = (
-                producto_element.select_one("span.brand") or
-                producto_element.select_one("[data-test='product-brand']") or
-                producto_element.select_one("div.marca")
-            )
-            if marca_elem:
-                data['marca'] = marca_elem.text.strip()
+            if 'marca' in campos:
+                data['marca'] = campos['marca']
                 
             # Rating (si está disponible)
-            rating_elem = producto_element.select_one("span[class*='rating'], div.rating")
-            if rating_elem:
+            if 'rating' in campos:
                 try:
-                    rating_txt = rating_elem.text.strip()
-                    data['rating'] = float(rating_txt)
-                except:
+                    data['rating'] = float(campos['rating'])
+                except ValueError:
                     pass
                     
             return data
@@ -105,7 +96,6 @@ class WongScraper(BaseScraper):
             self.logger.error(f"Error extrayendo datos de producto Wong: {e}")
             return None
 
-
 if __name__ == "__main__":
     scraper = WongScraper()
     scraper.run()
@@ -8,6 +8,7 @@ sys.path.append('.')
 import pyodbc
 from config.settings import DATABASE_URL
 from services.notifications import enviar_email, crear_email_alerta
+from services.version_datos import incrementar_version, AMBITO_ALERTAS
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -32,25 +33,18 @@ def verificar_y_notificar_alertas():
                 a.precio_objetivo,
                 p.id as producto_id,
                 p.nombre as producto_nombre,
-                (SELECT TOP 1 pr.precio 
-                 FROM precios pr 
-                 INNER JOIN tiendas t ON pr.tienda_id = t.id
-                 WHERE pr.producto_id = p.id 
-                 AND pr.fecha = (SELECT MAX(fecha) FROM precios WHERE producto_id = p.id)
-                 ORDER BY pr.precio ASC) as precio_min_actual,
-                (SELECT TOP 1 t.nombre 
-                 FROM precios pr 
-                 INNER JOIN tiendas t ON pr.tienda_id = t.id
-                 WHERE pr.producto_id = p.id 
-                 AND pr.fecha = (SELECT MAX(fecha) FROM precios WHERE producto_id = p.id)
-                 ORDER BY pr.precio ASC) as tienda_mejor_precio,
-                (SELECT TOP 1 pr.url 
-                 FROM precios pr 
-                 WHERE pr.producto_id = p.id 
-                 AND pr.fecha = (SELECT MAX(fecha) FROM precios WHERE producto_id = p.id)
-                 ORDER BY pr.precio ASC) as url_producto
+                mejor.precio as precio_min_actual,
+                mejor.tienda as tienda_mejor_precio,
+                mejor.url as url_producto
             FROM alertas a
             INNER JOIN productos p ON a.producto_id = p.id
+            OUTER APPLY (
+                SELECT TOP 1 pa.precio, t.nombre as tienda, pa.url
+                FROM precios_actuales pa
+                INNER JOIN tiendas t ON pa.tienda_id = t.id
+                WHERE pa.producto_id = p.id
+                ORDER BY pa.precio ASC
+            ) mejor
             WHERE a.activa = 1 
             AND a.notificado = 0
         """
@@ -96,6 +90,9 @@ def verificar_y_notificar_alertas():
                     """, alerta_id)
                     
                     notificadas += 1
+        
+        if notificadas:
+            incrementar_version(cursor, AMBITO_ALERTAS)
                     
         conn.commit()
         cursor.close()
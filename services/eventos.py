@@ -0,0 +1,31 @@
+"""
+Eventos de precio - Outbox (tabla eventos_precio) del canal en vivo de la API
+
+Los cambios de precio los registran sp_ingesta_lote y sp_registrar_precio en
+la misma transacción que el precio; aquí están los que se escriben desde
+Python (scraping terminado) y la purga. La API los lee en api/eventos.py.
+"""
+import sys
+sys.path.append('.')
+
+from config.settings import EVENTOS_RETENCION_HORAS
+
+TIPO_PRECIO = "precio"
+TIPO_SCRAPING = "scraping"
+
+SQL_EVENTO_SCRAPING = """
+    INSERT INTO eventos_precio (tipo, tienda_id, cantidad) VALUES (?, ?, ?)
+"""
+
+SQL_PURGAR = "DELETE FROM eventos_precio WHERE fecha < DATEADD(hour, -?, GETDATE())"
+
+
+def registrar_fin_scraping(cursor, tienda_id, nuevos):
+    """Evento de scraping terminado con `nuevos` precios registrados (el commit queda a cargo de quien llama)"""
+    cursor.execute(SQL_EVENTO_SCRAPING, TIPO_SCRAPING, tienda_id, nuevos)
+
+
+def purgar_eventos(cursor, horas=EVENTOS_RETENCION_HORAS):
+    """Borrar los eventos más viejos que `horas` (ya no los pide ningún cliente que reconecta)"""
+    cursor.execute(SQL_PURGAR, horas)
+    return cursor.rowcount
@@ -0,0 +1,57 @@
+"""
+Servicio de Archivo de Precios
+Mueve los meses cerrados de precios a precios_archivo (columnstore) con sp_archivar_precios
+"""
+import sys
+sys.path.append('.')
+
+import pyodbc
+from datetime import timedelta
+from config.settings import DATABASE_URL, PRECIOS_MESES_ACTIVOS
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def archivar_particiones(meses_activos=PRECIOS_MESES_ACTIVOS):
+    """
+    Archivar las particiones mensuales de precios anteriores a los últimos `meses_activos` meses
+    
+    Retorna la lista de meses archivados como dicts (desde, hasta, filas).
+    """
+    logger.info(f"🗄️ Archivando meses de precios (se mantienen {meses_activos} activos)...")
+    
+    try:
+        conn = pyodbc.connect(DATABASE_URL, autocommit=True)
+        cursor = conn.cursor()
+        
+        cursor.execute("EXEC sp_archivar_precios ?", meses_activos)
+        archivados = [
+            {'desde': row[0], 'hasta': row[1], 'filas': row[2]}
+            for row in cursor.fetchall()
+        ]
+        
+        cursor.close()
+        conn.close()
+        
+        for mes in archivados:
+            etiqueta = (mes['hasta'] - timedelta(days=1)).strftime("%Y-%m")
+            logger.info(f"  📦 {etiqueta}: {mes['filas']} intervalos a columnstore")
+        logger.info(f"✅ Archivo completado: {len(archivados)} meses movidos")
+        return archivados
+        
+    except Exception as e:
+        logger.error(f"❌ Error archivando precios: {e}")
+        return []
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Archivar meses cerrados de precios')
+    parser.add_argument('--meses-activos', type=int, default=PRECIOS_MESES_ACTIVOS,
+                       help='Meses que se mantienen en la tabla precios')
+    
+    args = parser.parse_args()
+    archivar_particiones(args.meses_activos)
@@ -33,17 +33,12 @@ def generar_reporte_excel(archivo_salida="reporte_productos.xlsx"):
                 pr.precio as Precio,
                 pr.stock as Stock,
                 pr.rating as Rating,
-                pr.fecha as Fecha_Actualizacion
+                pr.fecha_actualizacion as Fecha_Actualizacion
             FROM productos p
             LEFT JOIN marcas m ON p.marca_id = m.id
             LEFT JOIN categorias c ON p.categoria_id = c.id
-            INNER JOIN precios pr ON p.id = pr.producto_id
+            INNER JOIN precios_actuales pr ON p.id = pr.producto_id
             INNER JOIN tiendas t ON pr.tienda_id = t.id
-            WHERE pr.fecha = (
-                SELECT MAX(fecha) 
-                FROM precios 
-                WHERE producto_id = p.id AND tienda_id = pr.tienda_id
-            )
             ORDER BY p.nombre, t.nombre
         """
         
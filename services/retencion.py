@@ -0,0 +1,64 @@
+"""
+Servicio de Retención de Precios
+Compacta el histórico antiguo en resúmenes semanales y mensuales con sp_compactar_precios
+"""
+import sys
+sys.path.append('.')
+
+import pyodbc
+from config.settings import DATABASE_URL, PRECIOS_RETENCION_DIAS, PRECIOS_RETENCION_SEMANAL_DIAS
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def compactar_precios(retencion_dias=PRECIOS_RETENCION_DIAS,
+                      retencion_semanal_dias=PRECIOS_RETENCION_SEMANAL_DIAS):
+    """
+    Resumir por semana los intervalos anteriores a `retencion_dias` y por mes las
+    semanas anteriores a `retencion_semanal_dias`
+    
+    Retorna un dict con el corte aplicado y las filas compactadas (None si falla).
+    """
+    logger.info(f"🧹 Compactando histórico de precios (retención {retencion_dias} días)...")
+    
+    try:
+        conn = pyodbc.connect(DATABASE_URL, autocommit=True)
+        cursor = conn.cursor()
+        
+        cursor.execute("EXEC sp_compactar_precios ?, ?", retencion_dias, retencion_semanal_dias)
+        row = cursor.fetchone()
+        resultado = {
+            'corte': row[0],
+            'intervalos_compactados': row[1],
+            'semanas_escritas': row[2],
+            'semanas_a_meses': row[3]
+        }
+        
+        cursor.close()
+        conn.close()
+        
+        logger.info(
+            f"✅ Compactación completada: {resultado['intervalos_compactados']} intervalos anteriores a "
+            f"{resultado['corte']:%Y-%m-%d} en {resultado['semanas_escritas']} semanas, "
+            f"{resultado['semanas_a_meses']} semanas pasadas a meses"
+        )
+        return resultado
+        
+    except Exception as e:
+        logger.error(f"❌ Error compactando precios: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Compactar el histórico de precios')
+    parser.add_argument('--retencion-dias', type=int, default=PRECIOS_RETENCION_DIAS,
+                       help='Días con resolución completa')
+    parser.add_argument('--retencion-semanal-dias', type=int, default=PRECIOS_RETENCION_SEMANAL_DIAS,
+                       help='Días con resúmenes semanales (más atrás quedan por mes)')
+    
+    args = parser.parse_args()
+    compactar_precios(args.retencion_dias, args.retencion_semanal_dias)
@@ -0,0 +1,23 @@
+"""
+Versión de los datos - Contadores por ámbito en la tabla version_datos
+
+Los procesos que escriben (scrapers, job de alertas, rutas de alertas de la API)
+suben la versión del ámbito que tocaron; la caché de respuestas de la API la
+incluye en sus claves, así que lo cacheado con una versión anterior deja de usarse.
+"""
+
+AMBITO_CATALOGO = "catalogo"   # productos, precios, categorías, marcas, tiendas
+AMBITO_ALERTAS = "alertas"
+
+SQL_INCREMENTAR = """
+    UPDATE version_datos
+    SET version = version + 1, fecha_actualizacion = GETDATE()
+    WHERE ambito = ?
+"""
+
+SQL_VERSIONES = "SELECT ambito, version FROM version_datos"
+
+
+def incrementar_version(cursor, ambito):
+    """Subir la versión de `ambito` con el cursor de quien escribió (el commit queda a su cargo)"""
+    cursor.execute(SQL_INCREMENTAR, ambito)
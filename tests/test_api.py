@@ -2,6 +2,7 @@
 Tests para API
 """
 import pytest
+from datetime import datetime, timedelta
 from fastapi.testclient import TestClient
 import sys
 sys.path.append('.')
@@ -42,5 +43,321 @@ def test_get_productos():
     assert isinstance(response.json(), list)
 
 
+def test_historico_expande_intervalos(monkeypatch):
+    """El histórico expande los intervalos de precio a un punto por día"""
+    from datetime import datetime, timedelta
+    import api.routes.productos as productos
+
+    hoy = datetime.now().replace(microsecond=0)
+    intervalos = [
+        {'fecha': hoy - timedelta(days=40), 'fecha_hasta': hoy - timedelta(days=3), 'precio': 10.0, 'tienda': 'Wong'},
+        {'fecha': hoy - timedelta(days=2), 'fecha_hasta': hoy, 'precio': 8.0, 'tienda': 'Wong'},
+        {'fecha': hoy - timedelta(days=1), 'fecha_hasta': hoy, 'precio': 9.0, 'tienda': 'Metro'},
+    ]
+    consultas = []
+
+    async def execute_query_async(query, params=None, **kwargs):
+        consultas.append((query, params))
+        return intervalos
+
+    monkeypatch.setattr(productos, "execute_query_async", execute_query_async)
+
+    response = client.get("/productos/1/historico?dias=5")
+    assert response.status_code == 200
+    data = response.json()
+
+    # Filtra por el mes de inicio para que SQL Server lea solo esas particiones
+    query, params = consultas[0]
+    assert "pr.fecha >= ?" in query
+    assert params[1] == params[2].replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    wong = [item for item in data if item["tienda"] == "Wong"]
+    assert [item["precio"] for item in wong] == [8.0, 8.0, 8.0, 10.0, 10.0]
+    assert wong[2]["variacion_porcentual"] == -20.0
+    assert wong[0]["variacion_porcentual"] == 0.0
+    assert [item["precio"] for item in data if item["tienda"] == "Metro"] == [9.0, 9.0]
+    assert data == sorted(data, key=lambda item: item["fecha"], reverse=True)
+
+
+def test_historico_largo_usa_resumenes(monkeypatch):
+    """Más allá de la retención el histórico se arma por semana con los resúmenes compactados"""
+    from datetime import date, datetime, timedelta
+    import api.routes.productos as productos
+
+    hoy = datetime.now().replace(microsecond=0)
+    lunes = productos.lunes(hoy.date())
+    intervalos = [{'fecha': datetime.combine(lunes, datetime.min.time()), 'fecha_hasta': hoy,
+                   'precio': 10.0, 'tienda': 'Wong'}]
+    resumenes = [
+        {'resolucion': 'semanal', 'fecha': lunes - timedelta(days=7), 'precio_min': 11.0, 'precio_max': 13.0,
+         'precio_promedio': 12.0, 'dias': 7, 'tienda': 'Wong'},
+        {'resolucion': 'mensual', 'fecha': date(hoy.year - 4, 1, 1), 'precio_min': 14.0, 'precio_max': 16.0,
+         'precio_promedio': 15.0, 'dias': 31, 'tienda': 'Wong'},
+    ]
+
+    async def execute_query_async(query, params=None, **kwargs):
+        return resumenes if "precios_semanales" in query else intervalos
+
+    monkeypatch.setattr(productos, "execute_query_async", execute_query_async)
+
+    response = client.get(f"/productos/1/historico?dias={productos.PRECIOS_RETENCION_DIAS + 1500}")
+    assert response.status_code == 200
+    data = response.json()
+
+    assert [item["resolucion"] for item in data] == ["semanal", "semanal", "mensual"]
+    assert [item["precio"] for item in data] == [10.0, 12.0, 15.0]
+    assert data[1]["precio_min"] == 11.0 and data[1]["precio_max"] == 13.0
+    assert data[0]["variacion_porcentual"] == round((10.0 - 12.0) / 12.0 * 100, 2)
+
+
+def test_historico_valida_rango_de_dias():
+    """dias fuera de [1, HISTORICO_MAX_DIAS] se rechaza antes de consultar"""
+    from api.routes.productos import HISTORICO_MAX_DIAS
+
+    assert client.get("/productos/1/historico?dias=0").status_code == 422
+    assert client.get("/productos/1/historico?dias=-5").status_code == 422
+    assert client.get(f"/productos/1/historico?dias={HISTORICO_MAX_DIAS + 1}").status_code == 422
+
+
+def test_productos_paginacion_por_cursor(monkeypatch):
+    """La primera página devuelve X-Next-Cursor y la siguiente sigue desde el último id (sin OFFSET)"""
+    from datetime import datetime
+    import api.routes.productos as productos
+
+    consultas = []
+
+    async def execute_query_async(query, params=None, **kwargs):
+        consultas.append((query, params))
+        primero = params[-2] if "p.id < ?" in query else 100
+        return [{'id': id_, 'nombre': f"Producto {id_}", 'fecha_creacion': datetime(2024, 1, 1),
+                 'ultima_actualizacion': datetime(2024, 1, 1)}
+                for id_ in range(primero - 1, primero - 4, -1)]
+
+    monkeypatch.setattr(productos, "execute_query_async", execute_query_async)
+
+    response = client.get("/productos/?limit=3")
+    assert response.status_code == 200
+    assert [p["id"] for p in response.json()] == [99, 98, 97]
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get(f"/productos/?limit=3&cursor={cursor}")
+    assert [p["id"] for p in response.json()] == [96, 95, 94]
+    query, params = consultas[-1]
+    assert "p.id < ?" in query and params == [97, 3]
+
+    assert client.get("/productos/?cursor=no-es-un-cursor").status_code == 400
+
+
+def test_detalle_en_un_solo_lote(monkeypatch):
+    """El detalle arma producto, precios, histórico y comparación con un solo lote de consultas"""
+    from datetime import datetime, timedelta
+    import api.cache as cache
+    import api.routes.productos as productos
+    from api.cache import CacheLocal, CacheRespuestas, VersionesDatos
+
+    hoy = datetime.now().replace(microsecond=0)
+    consultas = []
+
+    async def versiones(query, params=None, **kwargs):
+        return [{'ambito': 'catalogo', 'version': 1}]
+
+    async def execute_query_async(query, params=None, fetchsets=False, **kwargs):
+        consultas.append((query, params, fetchsets))
+        producto = [{'id': 7, 'nombre': 'Leche Gloria', 'marca': 'Gloria', 'categoria': 'Lácteos',
+                     'fecha_creacion': hoy, 'ultima_actualizacion': hoy}] if params[0] == 7 else []
+        precios = [{'id': 1, 'precio': 4.2, 'tienda': 'Metro', 'fecha': hoy}]
+        comparacion = [{'producto_id': 7, 'producto': 'Leche Gloria', 'marca': 'Gloria', 'categoria': 'Lácteos',
+                        'precio_wong': 4.5, 'precio_metro': 4.2, 'precio_plaza_vea': None,
+                        'precio_minimo': 4.2, 'precio_maximo': 4.5}]
+        intervalos = [{'fecha': hoy - timedelta(days=10), 'fecha_hasta': hoy, 'precio': 4.2, 'tienda': 'Metro'}]
+        return [producto, precios, comparacion, intervalos]
+
+    monkeypatch.setattr(cache, "execute_query_async", versiones)
+    monkeypatch.setattr(productos, "execute_query_async", execute_query_async)
+    monkeypatch.setattr(cache, "_cache", CacheRespuestas(CacheLocal(), VersionesDatos(revision_seg=0)))
+
+    response = client.get("/productos/7/detalle?dias=3")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["nombre"] == "Leche Gloria"
+    assert data["precios_actuales"][0]["tienda"] == "Metro"
+    assert data["comparacion"]["mejor_tienda"] == "Metro" and data["comparacion"]["ahorro_maximo"] == 0.3
+    assert [item["precio"] for item in data["historico"]] == [4.2] * 3
+
+    assert len(consultas) == 1
+    query, params, fetchsets = consultas[0]
+    assert fetchsets and query.startswith("SET NOCOUNT ON;")
+    assert "vw_comparacion_tiendas" in query and "precios_semanales" not in query
+
+    assert client.get("/productos/8/detalle").status_code == 404
+
+
+def test_productos_lote_en_orden(monkeypatch):
+    """El lote resuelve todos los ids en una consulta y respeta el orden pedido"""
+    import json
+    from datetime import datetime
+    import api.routes.productos as productos
+
+    consultas = []
+
+    async def execute_query_async(query, params=None, fetchsets=False, **kwargs):
+        consultas.append((query, params, fetchsets))
+        ids = json.loads(params[0])
+        filas = [{'id': id_, 'nombre': f"Producto {id_}", 'fecha_creacion': datetime(2024, 1, 1),
+                  'ultima_actualizacion': datetime(2024, 1, 1)} for id_ in ids if id_ != 404]
+        precios = [{'producto_id': id_, 'id': id_ * 10, 'precio': 1.5, 'tienda': 'Wong',
+                    'fecha': datetime(2024, 1, 1)} for id_ in reversed(ids) if id_ != 404]
+        return [filas, precios]
+
+    monkeypatch.setattr(productos, "execute_query_async", execute_query_async)
+
+    response = client.post("/productos/lote", json={"ids": [5, 3, 404, 9, 3]})
+    assert response.status_code == 200
+    data = response.json()
+    assert [p["id"] for p in data] == [5, 3, 9]
+    assert [p["precios_actuales"][0]["id"] for p in data] == [50, 30, 90]
+
+    assert len(consultas) == 1
+    query, params, fetchsets = consultas[0]
+    assert fetchsets and "OPENJSON(?)" in query and "#ids" in query
+    assert json.loads(params[0]) == [5, 3, 404, 9]
+
+    monkeypatch.setattr(productos, "PRODUCTOS_LOTE_MAX", 2)
+    assert client.post("/productos/lote", json={"ids": [1, 2, 3]}).status_code == 400
+    assert client.post("/productos/lote", json={"ids": []}).status_code == 422
+
+
+class CursorExportacion:
+    """Cursor pyodbc falso que entrega 5 filas por fetchmany"""
+
+    description = [("producto_id",), ("tienda",), ("precio",), ("fecha",)]
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self.filas = [(i, "Wong", 1.5 + i, datetime(2024, 1, i + 1)) for i in range(5)]
+
+    def execute(self, query, *params):
+        self.conexion.consultas.append((query, params))
+
+    def fetchmany(self, n):
+        self.conexion.lecturas.append(n)
+        bloque, self.filas = self.filas[:2], self.filas[2:]
+        return bloque
+
+    def cancel(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ConexionExportacion:
+    def __init__(self):
+        self.consultas, self.lecturas, self.cerrada = [], [], False
+
+    def cursor(self):
+        return CursorExportacion(self)
+
+    def close(self):
+        self.cerrada = True
+
+
+def test_exportar_historico_en_streaming(monkeypatch):
+    """La exportación lee por bloques con fetchmany y escribe NDJSON o CSV"""
+    import json
+    import api.routes.exportar as exportar
+
+    conexiones = []
+    monkeypatch.setattr(exportar, "get_db_connection", lambda: conexiones.append(ConexionExportacion()) or conexiones[-1])
+
+    response = client.get("/exportar/historico?tienda=Wong&desde=2024-01-02")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    filas = [json.loads(linea) for linea in response.text.splitlines()]
+    assert [fila["producto_id"] for fila in filas] == [0, 1, 2, 3, 4]
+    assert filas[1] == {"producto_id": 1, "tienda": "Wong", "precio": 2.5, "fecha": "2024-01-02T00:00:00"}
+
+    conexion = conexiones[0]
+    query, params = conexion.consultas[0]
+    assert "fecha_hasta >= ?" in query and params[0] == "Wong"
+    assert len(conexion.lecturas) == 4 and conexion.cerrada
+
+    response = client.get("/exportar/precios-actuales?formato=csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="precios_actuales.csv"'
+    lineas = response.text.splitlines()
+    assert lineas[0] == "producto_id,tienda,precio,fecha" and len(lineas) == 6
+
+    assert client.get("/exportar/historico?formato=xml").status_code == 422
+
+
+def test_serializacion_rapida_mismo_json_y_gzip(monkeypatch):
+    """RespuestaRapida da el mismo JSON que la ruta validada y se comprime si el cliente acepta gzip"""
+    from decimal import Decimal
+    import api.routes.productos as productos
+
+    columnas = ['id', 'nombre', 'descripcion', 'url_imagen', 'marca', 'categoria',
+                'fecha_creacion', 'ultima_actualizacion']
+    filas = [(100 - i, f"Producto {i}", None, None, "Gloria", "Lácteos",
+              datetime(2024, 1, 1, 8, 30), datetime(2024, 2, 1)) for i in range(60)]
+    hoy = datetime.now().replace(microsecond=0)
+    intervalos = [{'fecha': hoy - timedelta(days=20), 'fecha_hasta': hoy, 'precio': Decimal("4.50"), 'tienda': 'Wong'}]
+
+    async def execute_query_async(query, params=None, fetchtuplas=False, **kwargs):
+        if "vw_precios_historial" in query:
+            return intervalos
+        if fetchtuplas:
+            return columnas, filas[:params[-1]]
+        return [dict(zip(columnas, fila)) for fila in filas[:params[-1]]]
+
+    monkeypatch.setattr(productos, "execute_query_async", execute_query_async)
+
+    for ruta in ("/productos/?limit=50", "/productos/1/historico?dias=10"):
+        normal = client.get(ruta)
+        monkeypatch.setattr(productos, "API_SERIALIZACION_RAPIDA", True)
+        rapida = client.get(ruta)
+        monkeypatch.setattr(productos, "API_SERIALIZACION_RAPIDA", False)
+        assert rapida.status_code == 200
+        assert rapida.json() == normal.json()
+        assert rapida.headers.get("X-Next-Cursor") == normal.headers.get("X-Next-Cursor")
+
+    assert client.get("/productos/?limit=50", headers={"Accept-Encoding": "gzip"}).headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in client.get("/productos/?limit=50", headers={"Accept-Encoding": "identity"}).headers
+
+
+def test_solo_pool_agotado_responde_503(monkeypatch):
+    """Un timeout cualquiera (asyncio, anyio) no se reporta como pool agotado"""
+    import asyncio
+    import api.routes.productos as productos
+    from api.pool import PoolAgotado
+
+    errores = iter([PoolAgotado("No hay conexiones libres tras 5s"), asyncio.TimeoutError()])
+
+    async def execute_query_async(query, params=None, **kwargs):
+        raise next(errores)
+
+    monkeypatch.setattr(productos, "execute_query_async", execute_query_async)
+    cliente = TestClient(app, raise_server_exceptions=False)
+
+    assert cliente.get("/productos/").status_code == 503
+    assert cliente.get("/productos/").status_code == 500
+
+
+def test_gzip_excluye_eventos():
+    """El stream de /eventos nunca pasa por gzip, aunque Starlette no excluya su content-type"""
+    from fastapi import FastAPI
+    from fastapi.responses import PlainTextResponse
+    from api.main import GZipSinEventos
+
+    mini = FastAPI()
+    mini.add_middleware(GZipSinEventos, minimum_size=10)
+    mini.get("/eventos/")(lambda: PlainTextResponse("data: x\n\n" * 100))
+    mini.get("/productos/")(lambda: PlainTextResponse("producto " * 100))
+
+    cliente = TestClient(mini)
+    gzip = {"Accept-Encoding": "gzip"}
+    assert "content-encoding" not in cliente.get("/eventos/", headers=gzip).headers
+    assert cliente.get("/productos/", headers=gzip).headers["content-encoding"] == "gzip"
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
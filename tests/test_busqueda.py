@@ -0,0 +1,94 @@
+"""
+Tests del índice de búsqueda de productos
+"""
+import pytest
+import sys
+sys.path.append('.')
+
+from api.search import IndiceBusqueda, normalizar, tokenizar
+
+FILAS = [
+    (1, "Paracetamol 500mg x 100 Tabletas", "Genfar", "Salud"),
+    (2, "Pañales Huggies Active Sec Talla G x 52", "Huggies", "Bebé"),
+    (3, "Leche Gloria Entera x 400g", "Gloria", "Lácteos"),
+    (4, "Leche Evaporada Laive Sin Lactosa x 400g", "Laive", "Lácteos"),
+    (5, "Yogurt Gloria Fresa x 1L", "Gloria", "Lácteos"),
+    (6, "Galletas de Leche", "Costeño", "Abarrotes"),
+    (7, "Panetón Clásico", "Bells", "Abarrotes"),
+]
+
+
+@pytest.fixture(scope="module")
+def indice():
+    return IndiceBusqueda(FILAS)
+
+
+def ids(resultados):
+    return [resultado['id'] for resultado in resultados]
+
+
+def test_normalizar_y_tokenizar():
+    assert normalizar("Pañales BEBÉ Pingüino") == "panales bebe pinguino"
+    assert tokenizar("Leche  Gloria-Entera x400g!") == ["leche", "gloria", "entera", "x400g"]
+    assert tokenizar("") == []
+
+
+def test_sin_tildes_ni_mayusculas(indice):
+    assert ids(indice.buscar("PANALES")) == [2]
+    assert ids(indice.buscar("paracetamol")) == [1]
+
+
+def test_prefijo_mientras_se_escribe(indice):
+    assert ids(indice.buscar("parac")) == [1]
+    # "pan" es prefijo de "panales" y "paneton"; un solo carácter no es prefijo de nada
+    assert set(ids(indice.buscar("pan"))) == {2, 7}
+    assert indice.buscar("p") == []
+
+
+def test_subcadena_con_trigramas(indice):
+    assert ids(indice.buscar("cetamol")) == [1]
+    assert indice.buscar("zzz") == []
+
+
+def test_ranking_nombre_antes_que_marca_y_nombre_corto_primero(indice):
+    # "Galletas de Leche" (nombre corto) gana entre las coincidencias en nombre
+    assert ids(indice.buscar("leche")) == [6, 3, 4]
+    # "gloria" está en el nombre y en la marca de 3 y 5: mismo puntaje, desempata el largo
+    resultados = indice.buscar("gloria")
+    assert ids(resultados) == [5, 3]
+    assert resultados[0]['score'] == resultados[1]['score']
+
+
+def test_todos_los_terminos(indice):
+    assert ids(indice.buscar("leche laive")) == [4]
+    # "lact" es prefijo de "lactosa" (nombre de 4) y de "lacteos" (categoría de 3)
+    assert ids(indice.buscar("leche lact")) == [4, 3]
+    assert indice.buscar("leche huggies") == []
+
+
+def test_filtros_y_paginacion(indice):
+    assert ids(indice.buscar("leche", marca="glor")) == [3]
+    assert ids(indice.buscar("leche", categoria="lacteos")) == [3, 4]
+    assert ids(indice.buscar("leche", limit=1, skip=1)) == [3]
+
+
+def test_endpoint_buscar(monkeypatch):
+    from fastapi.testclient import TestClient
+    from api.main import app
+    import api.routes.productos as productos
+
+    class Buscador:
+        def obtener(self):
+            return IndiceBusqueda(FILAS)
+
+    monkeypatch.setattr(productos, "obtener_buscador", Buscador)
+
+    response = TestClient(app).get("/productos/buscar?q=Leche Gloria")
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["id"] for item in data] == [3]
+    assert data[0]["marca"] == "Gloria" and data[0]["score"] > 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
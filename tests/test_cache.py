@@ -0,0 +1,88 @@
+"""
+Tests de la caché de respuestas (backend local, base de datos simulada)
+"""
+import pytest
+import time
+import sys
+sys.path.append('.')
+
+from fastapi.testclient import TestClient
+
+import api.cache as cache
+from api.cache import CacheLocal, CacheRespuestas, VersionesDatos
+from api.main import app
+
+client = TestClient(app)
+
+
+def test_lru_desaloja_la_menos_usada():
+    local = CacheLocal(max_entradas=2, ttl=60)
+    local.guardar("a", b"1")
+    local.guardar("b", b"2")
+    local.obtener("a")
+    local.guardar("c", b"3")
+    assert local.obtener("b") is None
+    assert local.obtener("a") == b"1" and local.obtener("c") == b"3"
+
+
+def test_ttl_vence():
+    local = CacheLocal(max_entradas=10, ttl=0.05)
+    local.guardar("a", b"1")
+    time.sleep(0.06)
+    assert local.obtener("a") is None
+    assert len(local) == 0
+
+
+@pytest.fixture
+def base(monkeypatch):
+    """Versiones y consultas de /productos/{id}/comparar simuladas"""
+    import api.routes.productos as productos
+
+    estado = {'versiones': {'catalogo': 1, 'alertas': 1}, 'consultas': 0}
+
+    async def versiones(query, params=None, **kwargs):
+        return [{'ambito': ambito, 'version': version} for ambito, version in estado['versiones'].items()]
+
+    async def execute_query_async(query, params=None, **kwargs):
+        estado['consultas'] += 1
+        return [{'producto_id': params[0], 'producto': 'Leche Gloria', 'marca': 'Gloria', 'categoria': 'Lácteos',
+                 'precio_wong': 4.5, 'precio_metro': 4.2, 'precio_plaza_vea': None,
+                 'precio_minimo': 4.2, 'precio_maximo': 4.5}]
+
+    monkeypatch.setattr(cache, "execute_query_async", versiones)
+    monkeypatch.setattr(productos, "execute_query_async", execute_query_async)
+    monkeypatch.setattr(cache, "_cache", CacheRespuestas(CacheLocal(), VersionesDatos(revision_seg=0)))
+    return estado
+
+
+def test_respuesta_cacheada_etag_e_invalidacion(base):
+    primera = client.get("/productos/7/comparar")
+    assert primera.status_code == 200
+    assert primera.headers["X-Cache"] == "MISS"
+    assert primera.json()["mejor_tienda"] == "Metro"
+
+    segunda = client.get("/productos/7/comparar")
+    assert segunda.headers["X-Cache"] == "HIT"
+    assert segunda.json() == primera.json()
+    assert base['consultas'] == 1
+
+    etag = primera.headers["ETag"]
+    assert client.get("/productos/7/comparar", headers={"If-None-Match": etag}).status_code == 304
+
+    # Un scraping sube la versión del catálogo: cambia el ETag y se vuelve a consultar
+    base['versiones']['catalogo'] = 2
+    tercera = client.get("/productos/7/comparar", headers={"If-None-Match": etag})
+    assert tercera.status_code == 200 and tercera.headers["X-Cache"] == "MISS"
+    assert tercera.headers["ETag"] != etag
+    assert base['consultas'] == 2
+
+    # Subir la versión de alertas no afecta al catálogo
+    base['versiones']['alertas'] = 2
+    assert client.get("/productos/7/comparar").headers["X-Cache"] == "HIT"
+
+    metricas = client.get("/estadisticas/cache").json()
+    assert metricas['aciertos'] == 2 and metricas['fallos'] == 2 and metricas['no_modificados'] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
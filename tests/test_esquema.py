@@ -0,0 +1,73 @@
+"""
+Tests de los scripts SQL (sin base de datos: comparan el texto de schema.sql y las migraciones)
+"""
+import re
+import pytest
+import sys
+sys.path.append('.')
+
+from pathlib import Path
+
+DATABASE = Path(__file__).resolve().parent.parent / "database"
+
+
+def bloque_particiones(ruta):
+    """DDL de pf_precios_mes y ps_precios_mes (hasta el GO del esquema de particiones)"""
+    texto = ruta.read_text(encoding="utf-8")
+    inicio = texto.index("IF NOT EXISTS (SELECT * FROM sys.partition_functions WHERE name = 'pf_precios_mes')")
+    fin = texto.index("GO", texto.index("CREATE PARTITION SCHEME ps_precios_mes", inicio))
+    return texto[inicio:fin]
+
+
+def test_particiones_iguales_en_esquema_y_migracion():
+    esquema = bloque_particiones(DATABASE / "schema.sql")
+    migracion = bloque_particiones(DATABASE / "migrations" / "002_precios_particiones.sql")
+    assert esquema == migracion
+
+    # Cada límite va entre comillas dentro del SQL dinámico (una N suelta es un nombre de columna)
+    assert "+ N'''' + CONVERT(NCHAR(8), @mes, 112) + N''''" in esquema
+    assert not re.search(r"\+ N(\s|;|$)", esquema)
+
+
+def procedimiento(nombre):
+    texto = (DATABASE / "schema.sql").read_text(encoding="utf-8")
+    inicio = texto.index(f"CREATE PROCEDURE {nombre}")
+    return texto[inicio:texto.index("\nGO", inicio)]
+
+
+def test_ingesta_busca_intervalos_por_id_y_fecha():
+    """PK_precios es (id, fecha) por partición mensual: sin la fecha se recorren todas las particiones"""
+    registrar = procedimiento("sp_registrar_precio")
+    assert "WHERE id = @id AND fecha = @vigente_desde" in registrar
+    assert "FROM precios WHERE id = @id AND fecha = @vigente_desde" in registrar
+    assert not re.search(r"WHERE id = @id;", registrar)
+
+    lote = procedimiento("sp_ingesta_lote")
+    assert lote.count("pr.fecha = l.vigente_desde") == 2
+    assert not re.search(r"(l\.intervalo_id = pr\.id|pr\.id = l\.intervalo_id)\s*\n", lote)
+
+
+
+def test_ingesta_informa_productos_repetidos():
+    """Las filas que resuelven a un mismo producto se descartan a propósito y se informan"""
+    lote = procedimiento("sp_ingesta_lote")
+    assert "PARTITION BY producto_id ORDER BY fila DESC" in lote
+    assert "OUTPUT deleted.nombre INTO @descartados" in lote
+    assert "(SELECT COUNT(*) FROM @descartados) AS descartados" in lote
+
+
+
+def test_nuevo_solo_si_cambia_el_precio():
+    """Reabrir el mismo precio (cambio de mes o hueco) no es un precio nuevo ni un evento"""
+    cambio = "@precio_vigente IS NULL OR @precio_vigente <> @precio"
+    registrar = procedimiento("sp_registrar_precio")
+    assert f"IF {cambio}\n            SET @nuevo = 1;" in registrar
+    assert "IF @nuevo = 1\n            INSERT INTO eventos_precio" in registrar
+
+    lote = procedimiento("sp_ingesta_lote")
+    assert "@@ROWCOUNT" not in lote
+    assert lote.count("WHERE l.precio_vigente IS NULL OR l.precio_vigente <> l.precio;") == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,133 @@
+"""
+Tests del canal en vivo de precios (broker y flujo SSE, base de datos simulada)
+"""
+import asyncio
+import json
+import pytest
+import sys
+sys.path.append('.')
+
+from datetime import datetime
+from decimal import Decimal
+
+import api.eventos as eventos
+from api.eventos import BrokerEventos
+from api.routes.eventos import flujo_eventos
+
+
+def fila(id_, tipo="precio", producto_id=7, categoria="Lácteos"):
+    return {'id': id_, 'tipo': tipo, 'producto_id': producto_id if tipo == "precio" else None,
+            'producto': 'Leche Gloria', 'categoria': categoria if tipo == "precio" else None,
+            'tienda': 'Wong', 'precio': Decimal("4.20"), 'precio_anterior': Decimal("4.50"),
+            'cantidad': None, 'fecha': datetime(2024, 5, 1, 9, 0)}
+
+
+@pytest.fixture
+def base(monkeypatch):
+    """eventos_precio simulada: ya tiene hasta el id 10 y luego llegan las filas de `pendientes`
+    (con su antigüedad en `edades`, por defecto recién insertadas)"""
+    estado = {'pendientes': [], 'edades': {}, 'consultas': 0}
+
+    async def execute_query_async(query, params=None, **kwargs):
+        estado['consultas'] += 1
+        if "MAX(id)" in query:
+            return (10,)
+        if "OPENJSON" in query:
+            ids = json.loads(params[0])
+            return [f for f in estado['pendientes'] if f['id'] in ids]
+        if "edad_ms" in query:
+            return [{'id': f['id'], 'edad_ms': estado['edades'].get(f['id'], 0)}
+                    for f in sorted(estado['pendientes'], key=lambda f: f['id'])
+                    if params[0] < f['id'] <= params[1]]
+        return [f for f in estado['pendientes'] if f['id'] > params[0]]
+
+    monkeypatch.setattr(eventos, "execute_query_async", execute_query_async)
+    return estado
+
+
+def test_reparte_segun_filtro(base):
+    async def escenario():
+        broker = BrokerEventos(revision_seg=0.01)
+        todos = broker.suscribir()
+        leche = broker.suscribir(productos=[7])
+        limpieza = broker.suscribir(categorias=["limpieza"])
+        await asyncio.sleep(0.03)
+
+        base['pendientes'] = [fila(11), fila(12, producto_id=8, categoria="Limpieza"), fila(13, tipo="scraping")]
+        await asyncio.sleep(0.05)
+
+        recibidos = {nombre: [s.cola.get_nowait()['id'] for _ in range(s.cola.qsize())]
+                     for nombre, s in (("todos", todos), ("leche", leche), ("limpieza", limpieza))}
+        for s in (todos, leche, limpieza):
+            broker.desuscribir(s)
+        await asyncio.sleep(0.03)
+        return broker, recibidos
+
+    broker, recibidos = asyncio.run(escenario())
+    assert recibidos == {"todos": [11, 12, 13], "leche": [11, 13], "limpieza": [12, 13]}
+    # Sin suscriptores deja de consultar
+    assert not broker.metricas()['leyendo']
+
+
+def test_reparte_eventos_que_confirman_tarde(base):
+    """Un lote que confirma después de que se leyó un id mayor igual se reparte, una sola vez"""
+    async def escenario():
+        broker = BrokerEventos(revision_seg=0.01, gracia_seg=30)
+        todos = broker.suscribir()
+        await asyncio.sleep(0.03)
+
+        # El 12 todavía no confirmó cuando se leen el 11 y el 13
+        base['pendientes'] = [fila(11), fila(13)]
+        await asyncio.sleep(0.05)
+        base['pendientes'].append(fila(12))
+        await asyncio.sleep(0.05)
+
+        # Pasada la gracia el lector deja de revisar detrás del 13
+        base['edades'] = {11: 31000, 12: 31000, 13: 31000}
+        await asyncio.sleep(0.05)
+
+        recibidos = [todos.cola.get_nowait()['id'] for _ in range(todos.cola.qsize())]
+        metricas = broker.metricas()
+        broker.desuscribir(todos)
+        await asyncio.sleep(0.03)
+        return recibidos, metricas
+
+    recibidos, metricas = asyncio.run(escenario())
+    assert recibidos == [11, 13, 12]
+    assert metricas['tardios'] == 1
+    assert metricas['estable'] == 13
+
+
+def test_flujo_sse_reanuda_con_last_event_id_y_resync(base):
+    async def escenario():
+        broker = BrokerEventos(revision_seg=60)
+        for id_ in (11, 12, 13):
+            broker.publicar(eventos.compactar(fila(id_)))
+
+        suscripcion = broker.suscribir(productos=[7], desde_id=11)
+        flujo = flujo_eventos(broker, suscripcion, ping_seg=0.01)
+        mensajes = [await flujo.__anext__() for _ in range(4)]
+
+        # Cliente lento: la cola se llena y recibe resync en vez de los eventos perdidos
+        for id_ in range(14, 14 + suscripcion.cola.maxsize + 1):
+            broker.publicar(eventos.compactar(fila(id_)))
+        resync = await flujo.__anext__()
+        ping = await flujo.__anext__()
+
+        await flujo.aclose()
+        await broker.cerrar()
+        return broker, suscripcion, mensajes, resync, ping
+
+    broker, suscripcion, mensajes, resync, ping = asyncio.run(escenario())
+    assert mensajes[0].startswith("retry:")
+    assert mensajes[1].startswith("id: 12\nevent: precio\n")
+    datos = json.loads(mensajes[1].split("data: ", 1)[1])
+    assert datos['precio'] == 4.2 and datos['fecha'] == "2024-05-01T09:00:00" and 'cantidad' not in datos
+    assert mensajes[2].startswith("id: 13\n") and mensajes[3] == ": ping\n\n"
+    assert resync.startswith("event: resync")
+    assert ping == ": ping\n\n"
+    assert suscripcion not in broker.suscripciones
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,74 @@
+"""
+Tests de extracción offline sobre páginas de categoría guardadas (tests/fixtures/html)
+"""
+import pytest
+import sys
+sys.path.append('.')
+
+from scrapers.offline import CORPUS, cargar_pagina, extraer_pagina, extraer_productos
+from scrapers.parsing import obtener_parser
+from scrapers.wong import WongScraper
+from scrapers.metro import MetroScraper
+from scrapers.plaza_vea import PlazaVeaScraper
+
+BACKENDS = ["bs4", "lxml"]
+
+
+def scraper_con(scraper_cls, backend):
+    scraper = scraper_cls()
+    scraper.parser = obtener_parser(backend)
+    return scraper
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_wong_salud(backend):
+    """Test de la página de Wong: un producto agotado y una tarjeta repetida"""
+    scraper = scraper_con(WongScraper, backend)
+    html = cargar_pagina("wong_salud.html")
+    
+    assert len(scraper.get_tarjetas(html)) == 25
+    productos = extraer_productos(scraper, html)
+    assert len(productos) == 23
+    assert productos[0] == {
+        'nombre': "Paracetamol 500mg Caja 100 Tabletas",
+        'precio': 20.29,
+        'url': "https://www.wong.pe/paracetamol-500mg-caja-100-tabletas/p",
+        'url_imagen': "https://wongfood.vteximg.com.br/arquivos/ids/9000-500-500/paracetamol-500mg-caja-100-tabletas.jpg",
+        'marca': "Bayer",
+        'rating': 3.8
+    }
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_metro_cuidado_personal(backend):
+    """Test de la página de Metro: el nombre sale del selector data-test y hay dos sin precio"""
+    scraper = scraper_con(MetroScraper, backend)
+    productos = extraer_productos(scraper, cargar_pagina("metro_cuidado_personal.html"))
+    
+    assert len(productos) == 22
+    assert all(p['url'].startswith("https://www.metro.pe/") for p in productos)
+    assert any(p.get('marca') == "Head & Shoulders" for p in productos)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_plaza_vea_precio_con_miles(backend):
+    """Test de la página de Plaza Vea: URLs absolutas e imagen relativa, precio con separador de miles"""
+    scraper = scraper_con(PlazaVeaScraper, backend)
+    productos = extraer_productos(scraper, cargar_pagina("plaza_vea_alimentos_organicos.html"))
+    
+    assert len(productos) == 24
+    assert productos[9]['precio'] == 1299.0
+    assert productos[0]['url_imagen'].startswith("https://www.plazavea.com.pe/arquivos/ids/")
+
+
+@pytest.mark.parametrize("scraper_cls", list(CORPUS))
+def test_backends_coinciden_en_el_corpus(scraper_cls):
+    """Test que bs4 y lxml extraen exactamente lo mismo de cada página del corpus"""
+    for archivo in CORPUS[scraper_cls]:
+        html = cargar_pagina(archivo)
+        assert extraer_pagina(scraper_con(scraper_cls, "bs4"), html) == \
+            extraer_pagina(scraper_con(scraper_cls, "lxml"), html)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
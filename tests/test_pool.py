@@ -0,0 +1,148 @@
+"""
+Tests del pool de conexiones de la API (con conexiones falsas, sin base de datos)
+"""
+import asyncio
+import pytest
+import threading
+import time
+import sys
+sys.path.append('.')
+
+import api.database as database
+from api.pool import ConexionPool, PoolAgotado
+
+
+class ConexionFalsa:
+    def __init__(self):
+        self.cerrada = False
+        self.caida = False
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, *params):
+        if self.caida:
+            raise RuntimeError("conexión caída")
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        self.cerrada = True
+
+
+def crear_pool(**kwargs):
+    creadas = []
+
+    def factory():
+        creadas.append(ConexionFalsa())
+        return creadas[-1]
+
+    opciones = dict(minimo=1, maximo=2, espera=0.2, inactividad=60, verificar_seg=0)
+    opciones.update(kwargs)
+    return ConexionPool(factory=factory, **opciones), creadas
+
+
+def test_reutiliza_conexiones():
+    pool, creadas = crear_pool()
+    for _ in range(5):
+        with pool.conexion() as conn:
+            assert conn is creadas[0]
+    assert len(creadas) == 1
+    assert pool.metricas()['arriendos'] == 5
+
+
+def test_maximo_y_timeout():
+    pool, _ = crear_pool()
+    a, b = pool.adquirir(), pool.adquirir()
+    with pytest.raises(PoolAgotado):
+        pool.adquirir()
+    assert pool.metricas()['timeouts'] == 1
+
+    # Una devolución desde otro hilo destraba la espera
+    threading.Timer(0.05, pool.liberar, [a]).start()
+    pool.espera = 2
+    assert pool.adquirir() is a
+    pool.liberar(b)
+    assert pool.metricas()['esperas'] == 2
+
+
+def test_descarta_conexion_caida():
+    pool, creadas = crear_pool()
+    with pool.conexion():
+        pass
+    creadas[0].caida = True
+
+    with pool.conexion() as conn:
+        assert conn is creadas[1]
+    assert creadas[0].cerrada
+    assert pool.metricas()['descartadas'] == 1
+
+
+def test_cierra_inactivas_sobre_el_minimo():
+    pool, creadas = crear_pool(inactividad=0)
+    a, b = pool.adquirir(), pool.adquirir()
+    pool.liberar(a)
+    pool.liberar(b)
+    assert pool.metricas()['abiertas'] == pool.minimo == 1
+    assert sum(conn.cerrada for conn in creadas) == 1
+
+
+class ConexionLenta(ConexionFalsa):
+    """La "consulta" es la cantidad de segundos que tarda; cancel() la corta"""
+
+    def __init__(self):
+        super().__init__()
+        self.timeout = 0
+        self.cancelada = threading.Event()
+
+    def execute(self, query, *params):
+        if query != "SELECT 1" and self.cancelada.wait(float(query)):
+            raise RuntimeError("Operation canceled")
+
+    def fetchall(self):
+        return [(1,)]
+
+    @property
+    def description(self):
+        return [("valor",)]
+
+    def cancel(self):
+        self.cancelada.set()
+
+
+@pytest.fixture
+def pool_lento(monkeypatch):
+    pool, creadas = crear_pool(maximo=4)
+    pool.factory = lambda: creadas.append(ConexionLenta()) or creadas[-1]
+    monkeypatch.setattr(database, "obtener_pool", lambda: pool)
+    return pool, creadas
+
+
+def test_consultas_async_en_paralelo(pool_lento):
+    async def varias():
+        return await asyncio.gather(*(database.execute_query_async("0.3", fetchall=True) for _ in range(3)))
+
+    inicio = time.monotonic()
+    resultados = asyncio.run(varias())
+    assert resultados == [[{'valor': 1}]] * 3
+    assert time.monotonic() - inicio < 0.8
+
+
+def test_consulta_async_timeout_cancela(pool_lento):
+    pool, creadas = pool_lento
+    inicio = time.monotonic()
+    with pytest.raises(database.ConsultaTimeout):
+        asyncio.run(database.execute_query_async("5", fetchall=True, timeout=0.2))
+    assert time.monotonic() - inicio < 1
+
+    assert creadas[0].cancelada.wait(1)
+    for _ in range(50):
+        if pool.metricas()['en_uso'] == 0:
+            break
+        time.sleep(0.02)
+    assert pool.metricas()['en_uso'] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -3,11 +3,22 @@ Tests para scrapers
 """
 import pytest
 import sys
+import time
 sys.path.append('.')
 
 from scrapers.wong import WongScraper
 from scrapers.metro import MetroScraper
 from scrapers.plaza_vea import PlazaVeaScraper
+from scrapers import base_scraper
+from scrapers.base_scraper import nombre_categoria
+from scrapers.orchestrator import ejecutar_scrapers, repartir_categorias
+from scrapers.browser_pool import BrowserPool
+from scrapers.readiness import esperar_productos
+from scrapers.crawler import JS_FRAGMENTOS
+from scrapers.ingesta import IngestaMasiva, huella_producto
+from scrapers.identidades import MapaIdentidades
+from scrapers.parsing import obtener_parser, obtener_plan
+from selenium.common.exceptions import TimeoutException
 
 
 def test_wong_scraper_init():
@@ -38,5 +49,555 @@ def test_wong_product_selector():
     assert "product" in selector.lower()
 
 
+class FakeDriver:
+    """Driver mínimo para probar el pool sin Chrome"""
+    
+    def __init__(self, perfil=None):
+        self.perfil = perfil
+        self.vivo = True
+        self.cerrado = False
+        
+    def execute_script(self, script):
+        if not self.vivo:
+            raise RuntimeError("driver caído")
+        return 1
+        
+    def quit(self):
+        self.cerrado = True
+
+
+class FakeScraper(WongScraper):
+    """Scraper sin navegador ni BD que simula una categoría lenta"""
+    
+    instancias = 0
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        type(self).instancias += 1
+    
+    def run(self, categorias=None, finalizar=True):
+        time.sleep(0.2 * len(categorias))
+        return {nombre_categoria(path): {'encontrados': 2, 'nuevos': 1, 'actualizados': 1, 'errores': 0}
+                for path in categorias}
+
+
+class FakeMetroScraper(FakeScraper):
+    tienda_nombre = "Metro"
+
+
+class FailingScraper(FakeScraper):
+    tienda_nombre = "Plaza Vea"
+    
+    def run(self, categorias=None, finalizar=True):
+        raise RuntimeError("fallo simulado")
+
+
+def test_nombre_categoria():
+    """Test nombre legible desde el path de categoría"""
+    assert nombre_categoria("higiene-salud-y-belleza/cuidado-personal") == "Cuidado Personal"
+
+
+def test_orchestrator_paralelo():
+    """Test que tiendas y categorías corren en paralelo y se agregan las stats"""
+    categorias = ["a/uno", "a/dos"]
+    inicio = time.time()
+    resumen = ejecutar_scrapers([FakeScraper, FakeMetroScraper], categorias, pool="thread",
+                                browser_pool=BrowserPool(factory=FakeDriver), finalizar=lambda *args: None)
+    duracion = time.time() - inicio
+    
+    # 2 tiendas x 2 categorías de 0.2s cada una: en serie serían 0.8s
+    assert duracion < 0.6
+    assert resumen['totales']['encontrados'] == 8
+    assert resumen['totales']['nuevos'] == 4
+    assert set(resumen['tiendas']) == {"Wong", "Metro"}
+    assert resumen['tiendas']["Wong"]['categorias']["Uno"]['encontrados'] == 2
+
+
+def test_orchestrator_un_scraper_por_worker():
+    """Test que cada worker recorre su grupo de categorías con una sola instancia"""
+    assert repartir_categorias(["a", "b", "c", "d", "e"], 2) == [["a", "c", "e"], ["b", "d"]]
+    assert repartir_categorias(["a"], 3) == [["a"]]
+    
+    FakeScraper.instancias = 0
+    finalizadas = []
+    resumen = ejecutar_scrapers([FakeScraper], ["a/uno", "a/dos", "a/tres", "a/cuatro"], pool="thread",
+                                browser_pool=BrowserPool(factory=FakeDriver),
+                                finalizar=lambda tienda, nuevos: finalizadas.append((tienda, nuevos)))
+    # Concurrencia 2: dos scrapers (dos conexiones) para las cuatro categorías
+    assert FakeScraper.instancias == resumen['tiendas']["Wong"]['concurrencia'] == 2
+    assert len(resumen['tiendas']["Wong"]['categorias']) == 4
+    assert resumen['totales']['encontrados'] == 8
+    # Un solo cierre (un evento 'scraping') por tienda, con el total de nuevos
+    assert finalizadas == [("Wong", 4)]
+
+
+def test_run_un_cliente_vtex_por_ejecucion(monkeypatch):
+    """Test que las categorías de una ejecución comparten un solo cliente del catálogo"""
+    clientes = []
+    
+    class FakeCliente:
+        def __init__(self, base_url):
+            self.cerrado = False
+            clientes.append(self)
+            
+        def cerrar(self):
+            self.cerrado = True
+    
+    monkeypatch.setattr(base_scraper, "VtexCatalogClient", FakeCliente)
+    usados = []
+    scraper = WongScraper()
+    scraper.fetch_backend = "api"
+    scraper.connect_db = lambda: None
+    scraper.scrape_categoria = lambda path, nombre: usados.append(scraper.api) or None
+    
+    scraper.run(categorias=["a/uno", "a/dos", "a/tres"], finalizar=False)
+    assert len(clientes) == 1
+    assert usados == clientes * 3
+    assert clientes[0].cerrado and scraper.api is None
+
+
+def test_orchestrator_fallos():
+    """Test que una tienda con error no detiene a las demás"""
+    finalizadas = []
+    resumen = ejecutar_scrapers([FakeScraper, FailingScraper], ["a/uno"], pool="thread",
+                                browser_pool=BrowserPool(factory=FakeDriver),
+                                finalizar=lambda tienda, nuevos: finalizadas.append(tienda))
+    assert finalizadas == ["Wong"]
+    assert resumen['tiendas']["Plaza Vea"]['fallidas'] == 1
+    assert resumen['tiendas']["Wong"]['fallidas'] == 0
+    assert resumen['totales']['fallidas'] == 1
+
+
+
+def test_browser_pool_reutiliza_y_recicla():
+    """Test que el pool reutiliza drivers y los recicla tras K páginas"""
+    pool = BrowserPool(size=1, max_paginas=2, factory=FakeDriver)
+    
+    with pool.sesion() as sesion:
+        primero = sesion.driver
+        sesion.registrar_pagina()
+    with pool.sesion() as sesion:
+        assert sesion.driver is primero
+        sesion.registrar_pagina()
+    
+    # Alcanzó 2 páginas: el siguiente arriendo recibe un driver nuevo
+    with pool.sesion() as sesion:
+        assert sesion.driver is not primero
+    assert primero.cerrado
+    assert pool.stats['recicladas'] == 1
+    pool.cerrar()
+
+
+def test_browser_pool_descarta_driver_caido():
+    """Test health check: un driver que no responde se reemplaza"""
+    pool = BrowserPool(size=1, factory=FakeDriver)
+    with pool.sesion() as sesion:
+        caido = sesion.driver
+    caido.vivo = False
+    
+    with pool.sesion() as sesion:
+        assert sesion.driver is not caido
+    assert pool.stats['descartadas'] == 1
+
+
+def test_scraper_acepta_driver_arrendado():
+    """Test que un scraper con driver externo no lo considera propio"""
+    driver = FakeDriver()
+    scraper = MetroScraper(driver=driver)
+    assert scraper.driver is driver
+    assert not scraper.driver_propio
+
+
+
+def test_browser_pool_metricas():
+    """Test métricas de páginas por minuto por perfil de navegador"""
+    pool = BrowserPool(size=1, perfil="ligero", factory=FakeDriver)
+    with pool.sesion() as sesion:
+        assert sesion.driver.perfil == "ligero"
+        sesion.registrar_pagina()
+        sesion.registrar_pagina()
+        time.sleep(0.05)
+    pool.cerrar()
+    
+    resumen = pool.resumen_metricas()
+    assert resumen['perfil'] == "ligero"
+    assert resumen['paginas'] == 2
+    assert resumen['paginas_por_minuto'] > 0
+
+
+
+class GridDriver:
+    """Driver falso cuya grilla renderiza productos en tandas"""
+    
+    def __init__(self, tandas):
+        self.tandas = list(tandas)
+        
+    def find_elements(self, by, selector):
+        total = self.tandas.pop(0) if len(self.tandas) > 1 else self.tandas[0]
+        return [object()] * total
+
+
+def test_readiness_espera_conteo_estable():
+    """Test que la página está lista cuando el conteo deja de crecer"""
+    driver = GridDriver([0, 0, 12, 24, 24])
+    perfil = {'timeout': 2, 'intervalo': 0.01, 'estable': 0.05}
+    total, segundos = esperar_productos(driver, "div.product-item", perfil)
+    assert total == 24
+    assert segundos < 1
+
+
+def test_readiness_timeout_sin_productos():
+    """Test que sin productos se lanza TimeoutException (y se usa el delay fijo)"""
+    driver = GridDriver([0])
+    with pytest.raises(TimeoutException):
+        esperar_productos(driver, "div.product-item", {'timeout': 0.1, 'intervalo': 0.01, 'estable': 0.01})
+
+
+def test_perfil_carga_por_tienda():
+    """Test que cada tienda tiene su propio perfil de espera"""
+    assert PlazaVeaScraper().get_perfil_carga()['timeout'] > WongScraper().get_perfil_carga()['timeout']
+    assert MetroScraper().get_perfil_carga()['minimo'] == 1
+
+
+
+def tarjeta_wong(numero, slug=None):
+    """HTML de una tarjeta de producto con los selectores de Wong"""
+    slug = slug or f"producto-{numero}"
+    return (
+        f'<div class="product-item"><p class="product-title">Producto {numero}</p>'
+        f'<span class="product-prices__value">S/ {numero}.50</span>'
+        f'<a href="/{slug}/p">Ver</a></div>'
+    )
+
+
+class ScrollDriver:
+    """Driver falso con scroll infinito: cada scroll carga 10 tarjetas más"""
+    
+    def __init__(self, tarjetas, por_tanda=10):
+        self.tarjetas = tarjetas
+        self.por_tanda = por_tanda
+        self.cargadas = min(por_tanda, len(tarjetas))
+        self.consultas = []
+        
+    def get(self, url):
+        pass
+        
+    def find_elements(self, by, selector):
+        # Sin botón "Mostrar más": solo responde al selector de productos
+        return [object()] * self.cargadas if "product-item" in selector else []
+        
+    def execute_script(self, script, *args):
+        if script == JS_FRAGMENTOS:
+            self.consultas.append(args[1])
+            return self.tarjetas[args[1]:self.cargadas]
+        if "scrollTo" in script:
+            self.cargadas = min(self.cargadas + self.por_tanda, len(self.tarjetas))
+
+
+class PaginasDriver(ScrollDriver):
+    """Driver falso con ?page=N que repite la última página fuera de rango"""
+    
+    def get(self, url):
+        pagina = int(url.split("page=")[1]) if "page=" in url else 1
+        inicio = min(pagina - 1, (len(self.tarjetas) - 1) // self.por_tanda) * self.por_tanda
+        self.actual = self.tarjetas[inicio:inicio + self.por_tanda]
+        self.cargadas = len(self.actual)
+        
+    def execute_script(self, script, *args):
+        if script == JS_FRAGMENTOS:
+            return self.actual[args[1]:]
+
+
+class CrawlerWongScraper(WongScraper):
+    def __init__(self, driver, paginacion='scroll'):
+        super().__init__(driver=driver)
+        self.paginacion = paginacion
+        
+    def get_perfil_carga(self):
+        return {**super().get_perfil_carga(), 'timeout': 0.2, 'timeout_tanda': 0.2,
+                'intervalo': 0.01, 'estable': 0.02, 'paginacion': self.paginacion}
+
+
+def test_crawler_scroll_infinito():
+    """Test que se recorren todas las tandas leyendo solo las tarjetas nuevas"""
+    driver = ScrollDriver([tarjeta_wong(n) for n in range(1, 26)])
+    productos = list(CrawlerWongScraper(driver).obtener_productos("a/salud"))
+    
+    assert len(productos) == 25
+    assert productos[-1]['nombre'] == "Producto 25"
+    # Cada tanda pide solo desde el último índice visto
+    assert driver.consultas[:3] == [0, 10, 20]
+
+
+def test_crawler_deduplica_por_url():
+    """Test que un producto repetido en otra tanda se entrega una sola vez"""
+    tarjetas = [tarjeta_wong(n) for n in range(1, 11)] + [tarjeta_wong(99, slug="producto-1")]
+    productos = list(CrawlerWongScraper(ScrollDriver(tarjetas)).obtener_productos("a/salud"))
+    
+    assert len(productos) == 10
+
+
+def test_crawler_paginas():
+    """Test que la paginación ?page=N se detiene al repetirse la última página"""
+    driver = PaginasDriver([tarjeta_wong(n) for n in range(1, 24)])
+    productos = list(CrawlerWongScraper(driver, paginacion='paginas').obtener_productos("a/salud"))
+    
+    assert len(productos) == 23
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.fast_executemany = False
+        
+    def executemany(self, sql, filas):
+        if self.conn.falla:
+            raise RuntimeError("staging no disponible")
+        self.conn.idas.append(('executemany', self.fast_executemany, len(filas)))
+        self.filas = filas
+        
+    def execute(self, sql, *params):
+        self.conn.idas.append(('execute', sql))
+        
+    def fetchone(self):
+        return (len(self.filas) - 1 - self.conn.descartados, 1, self.conn.descartados)
+        
+    def nextset(self):
+        self.resultados = self.conn.resultados.pop(0) if self.conn.resultados else None
+        return self.resultados is not None
+        
+    def fetchall(self):
+        return self.resultados
+        
+    def close(self):
+        pass
+
+
+class FakeConexion:
+    def __init__(self, falla=False, resultados=None, descartados=0):
+        self.falla = falla
+        self.descartados = descartados
+        self.idas = []
+        self.resultados = list(resultados or [])
+        
+    def cursor(self):
+        return FakeCursor(self)
+        
+    def commit(self):
+        self.idas.append(('commit',))
+        
+    def rollback(self):
+        pass
+
+
+def producto(numero):
+    return {'nombre': f"Producto {numero}", 'precio': 1.0 + numero, 'url': f"https://www.wong.pe/p{numero}/p"}
+
+
+def test_ingesta_masiva_por_lotes():
+    """Test que cada lote son 3 idas a la BD (staging, procedimiento, commit)"""
+    conn = FakeConexion()
+    ingesta = IngestaMasiva(conn, 1, "Salud", tamano_lote=100)
+    
+    for numero in range(250):
+        ingesta.agregar(producto(numero))
+    ingesta.volcar()
+    
+    assert ingesta.stats['lotes'] == 3
+    assert len(conn.idas) == 9
+    assert [ida[2] for ida in conn.idas if ida[0] == 'executemany'] == [100, 100, 50]
+    assert all(ida[1] for ida in conn.idas if ida[0] == 'executemany')
+    assert ingesta.stats['nuevos'] == 247
+    assert ingesta.stats['actualizados'] == 3
+
+
+def test_ingesta_masiva_cuenta_descartados():
+    """Test que las filas que el procedimiento descarta por repetir producto cuentan como errores"""
+    ingesta = IngestaMasiva(FakeConexion(descartados=2), 1, "Salud", tamano_lote=10)
+    for numero in range(10):
+        ingesta.agregar(producto(numero))
+    
+    assert ingesta.stats['nuevos'] == 7
+    assert ingesta.stats['actualizados'] == 1
+    assert ingesta.stats['errores'] == 2
+
+
+def test_ingesta_masiva_respaldo_por_fila():
+    """Test que si el lote falla se guarda producto por producto"""
+    guardados = []
+    
+    def respaldo(data):
+        guardados.append(data['nombre'])
+        return None if data['nombre'] == "Producto 2" else True
+    
+    ingesta = IngestaMasiva(FakeConexion(falla=True), 1, "Salud", respaldo=respaldo, tamano_lote=10)
+    for numero in range(5):
+        ingesta.agregar(producto(numero))
+    ingesta.volcar()
+    
+    assert len(guardados) == 5
+    assert ingesta.stats['nuevos'] == 4
+    assert ingesta.stats['errores'] == 1
+
+
+
+class CatalogoCursor:
+    """Cursor con el catálogo de la BD que cuenta las consultas"""
+    
+    TABLAS = {
+        'tiendas': [(1, "Wong"), (2, "Metro")],
+        'categorias': [(1, "Salud")],
+        'marcas': [(7, "Portugal")],
+        'productos': [(10, "Producto 1", "SKU1", None), (11, "Producto 2", None, None)]
+    }
+    
+    def __init__(self):
+        self.consultas = []
+        
+    def execute(self, sql, *params):
+        self.consultas.append(sql)
+        self.tabla = sql.split("FROM ")[1].split()[0]
+        self.params = params
+        
+    def fetchall(self):
+        return self.TABLAS[self.tabla]
+        
+    def fetchone(self):
+        return (3,) if self.params == ("Plaza Vea",) else None
+
+
+def test_identidades_precarga_y_fallos():
+    """Test que tras precargar solo se consulta la BD ante un fallo"""
+    cursor = CatalogoCursor()
+    identidades = MapaIdentidades()
+    identidades.calentar(cursor)
+    identidades.calentar(cursor)
+    assert len(cursor.consultas) == 4
+    
+    assert identidades.tienda_id(cursor, "Wong") == 1
+    assert identidades.categoria_id(cursor, "Salud") == 1
+    assert identidades.producto_id("Producto 2") == 11
+    assert identidades.producto_id("Otro nombre", "SKU1") == 10
+    assert identidades.marca_id("Portugal") == 7
+    assert len(cursor.consultas) == 4
+    
+    assert identidades.tienda_id(cursor, "Plaza Vea") == 3
+    assert identidades.tienda_id(cursor, "Plaza Vea") == 3
+    assert identidades.categoria_id(cursor, "Inexistente") is None
+    assert len(cursor.consultas) == 6
+    
+    resumen = identidades.resumen()
+    assert resumen['consultas'] == 6
+    assert resumen['por_tipo']['tiendas'] == {'aciertos': 2, 'fallos': 1}
+    assert resumen['por_tipo']['categorias'] == {'aciertos': 1, 'fallos': 1}
+
+
+def test_ingesta_registra_identidades():
+    """Test que la ingesta envía los IDs conocidos y aprende los que crea el procedimiento"""
+    identidades = MapaIdentidades()
+    identidades.registrar_producto(10, "Producto 1")
+    conn = FakeConexion(resultados=[[(20, "Producto 2", None)], [(8, "Gloria")]])
+    
+    ingesta = IngestaMasiva(conn, 1, "Salud", identidades=identidades)
+    ingesta.agregar(producto(1))
+    ingesta.agregar({**producto(2), 'marca': "Gloria"})
+    ingesta.volcar()
+    
+    assert identidades.producto_id("Producto 2") == 20
+    assert identidades.marca_id("Gloria") == 8
+    assert identidades.stats['productos'] == {'aciertos': 2, 'fallos': 1}
+
+
+
+def test_huella_solo_cambia_con_el_catalogo():
+    """Test que precio y stock no alteran la huella, pero la imagen o la categoría sí"""
+    base = {**producto(1), 'marca': "Gloria", 'url_imagen': "https://img/1.jpg"}
+    assert huella_producto(base, "Salud") == huella_producto({**base, 'precio': 99.0, 'stock': 3}, "Salud")
+    assert huella_producto(base, "Salud") != huella_producto({**base, 'url_imagen': "https://img/2.jpg"}, "Salud")
+    assert huella_producto(base, "Salud") != huella_producto(base, "Cuidado Personal")
+
+
+def test_ingesta_cuenta_productos_sin_cambios():
+    """Test que en la segunda corrida los productos con la misma huella se cuentan sin cambios"""
+    identidades = MapaIdentidades()
+    for numero in range(3):
+        identidades.registrar_producto(100 + numero, f"Producto {numero}")
+    
+    primera = IngestaMasiva(FakeConexion(), 1, "Salud", identidades=identidades)
+    for numero in range(3):
+        primera.agregar(producto(numero))
+    primera.volcar()
+    assert primera.stats['sin_cambios'] == 0
+    
+    segunda = IngestaMasiva(FakeConexion(), 1, "Salud", identidades=identidades)
+    for numero in range(2):
+        segunda.agregar({**producto(numero), 'precio': 5.0})
+    segunda.agregar({**producto(2), 'url_imagen': "https://img/nueva.jpg"})
+    segunda.volcar()
+    assert segunda.stats['sin_cambios'] == 2
+
+
+def test_guardar_producto_omite_upsert_sin_cambios():
+    """Test que sin cambios de catálogo solo se registra el precio"""
+    llamadas = []
+    
+    class ScraperSinBD(WongScraper):
+        def upsert_producto(self, data, categoria_nombre, huella=None):
+            llamadas.append('upsert')
+            self.identidades.registrar_producto(500, data['nombre'], None, huella)
+            return 500
+            
+        def insert_precio(self, producto_id, data):
+            llamadas.append(('precio', producto_id))
+            return True
+    
+    scraper = ScraperSinBD()
+    scraper.identidades = MapaIdentidades()
+    data = producto(7)
+    
+    assert scraper.guardar_producto(data, "Salud") is True
+    assert scraper.guardar_producto({**data, 'precio': 2.0}, "Salud") is True
+    assert llamadas == ['upsert', ('precio', 500), ('precio', 500)]
+
+
+TARJETA_COMPLETA = (
+    '<div class="product-item"><!-- tarjeta -->'
+    '<a class="product-link" href="/leche-gloria-azul/p"><img data-src="/arquivos/ids/1.jpg"></a>'
+    '<h3 class="ProductCard__name"> Leche <b>Gloria</b> Azul </h3>'
+    '<div class="price"><span>S/ 4.20</span></div>'
+    '<span class="brand">Gloria</span><div class="rating">4.5</div></div>'
+)
+
+
+@pytest.mark.parametrize("backend", ["bs4", "lxml"])
+def test_parsers_extraen_lo_mismo(backend):
+    """Test que ambos backends producen el mismo dict con las cadenas de respaldo"""
+    scraper = WongScraper()
+    scraper.parser = obtener_parser(backend)
+    
+    elementos = scraper.parser.tarjetas([TARJETA_COMPLETA, tarjeta_wong(2)])
+    assert len(elementos) == 2
+    assert scraper.extract_product_data(elementos[0]) == {
+        'nombre': "Leche Gloria Azul",
+        'precio': 4.2,
+        'url': "https://www.wong.pe/leche-gloria-azul/p",
+        'url_imagen': "https://www.wong.pe/arquivos/ids/1.jpg",
+        'marca': "Gloria",
+        'rating': 4.5
+    }
+    assert scraper.extract_product_data(elementos[1])['nombre'] == "Producto 2"
+    
+    pagina = f"<html><body><div id='grilla'>{TARJETA_COMPLETA}{tarjeta_wong(3)}</div></body></html>"
+    assert len(scraper.get_tarjetas(pagina)) == 2
+
+
+def test_plan_se_compila_una_vez():
+    """Test que el plan de cada tienda se compila una sola vez por backend"""
+    parser = obtener_parser("lxml")
+    assert WongScraper().plan is WongScraper().plan
+    assert obtener_plan(MetroScraper, MetroScraper.PLAN_EXTRACCION, parser) is not \
+        obtener_plan(WongScraper, WongScraper.PLAN_EXTRACCION, parser)
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,138 @@
+"""
+Tests para el backend de catálogo VTEX contra un servidor HTTP local con JSON grabado
+"""
+import json
+import os
+import threading
+import pytest
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+sys.path.append('.')
+
+from scrapers.vtex_api import VtexCatalogClient, mapear_producto, total_desde_resources
+from scrapers.wong import WongScraper
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "vtex", "wong_salud.json")
+
+with open(FIXTURE, encoding="utf-8") as f:
+    PRODUCTOS_GRABADOS = json.load(f)
+
+
+class VtexStandIn(BaseHTTPRequestHandler):
+    """Imita /api/catalog_system/pub/products/search con paginación _from/_to"""
+
+    peticiones = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        VtexStandIn.peticiones.append(self.path)
+
+        if not url.path.endswith("/higiene-salud-y-belleza/salud"):
+            self.send_response(500)
+            self.end_headers()
+            return
+
+        params = parse_qs(url.query)
+        desde = int(params["_from"][0])
+        hasta = int(params["_to"][0])
+        pagina = PRODUCTOS_GRABADOS[desde:hasta + 1]
+        total = len(PRODUCTOS_GRABADOS)
+
+        cuerpo = json.dumps(pagina).encode("utf-8")
+        self.send_response(206 if hasta + 1 < total else 200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("resources", f"{desde}-{hasta}/{total}")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def vtex_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), VtexStandIn)
+    hilo = threading.Thread(target=server.serve_forever, daemon=True)
+    hilo.start()
+    VtexStandIn.peticiones = []
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_mapear_producto():
+    """Test que el JSON VTEX produce el mismo dict que extract_product_data"""
+    data = mapear_producto(PRODUCTOS_GRABADOS[0], "https://www.wong.pe")
+    assert data == {
+        'nombre': "Paracetamol 500mg Caja 100 Tabletas",
+        'precio': 12.9,
+        'url': "https://www.wong.pe/paracetamol-500mg-caja-100-tabletas/p",
+        'url_imagen': "https://wongfood.vteximg.com.br/arquivos/ids/9001/paracetamol-500mg-caja-100-tabletas.jpg",
+        'marca': "Portugal",
+        'stock': 40
+    }
+
+
+def test_mapear_producto_sin_precio():
+    """Test que un producto sin precio se descarta"""
+    assert mapear_producto(PRODUCTOS_GRABADOS[-1], "https://www.wong.pe") is None
+
+
+def test_total_desde_resources():
+    assert total_desde_resources("0-49/523") == 523
+    assert total_desde_resources(None) is None
+
+
+def test_cliente_pagina_toda_la_categoria(vtex_server):
+    """Test que se piden todas las páginas usando el header resources"""
+    cliente = VtexCatalogClient(vtex_server, page_size=3)
+    try:
+        productos = cliente.obtener_categoria("higiene-salud-y-belleza/salud")
+    finally:
+        cliente.cerrar()
+
+    assert len(productos) == len(PRODUCTOS_GRABADOS)
+    assert len(VtexStandIn.peticiones) == 3
+    assert all("map=c,c" in unquote(peticion) for peticion in VtexStandIn.peticiones)
+    assert sum(1 for p in productos if p) == len(PRODUCTOS_GRABADOS) - 1
+
+
+def test_scraper_usa_api(vtex_server):
+    """Test que el scraper obtiene la categoría por API sin abrir navegador"""
+    scraper = WongScraper()
+    scraper.api = VtexCatalogClient(vtex_server, page_size=50)
+    try:
+        productos = list(scraper.obtener_productos("higiene-salud-y-belleza/salud"))
+    finally:
+        scraper.api.cerrar()
+
+    assert scraper.driver is None
+    assert productos[0]['nombre'] == "Paracetamol 500mg Caja 100 Tabletas"
+
+
+def test_scraper_fallback_selenium(vtex_server):
+    """Test que si la API falla en una categoría se usa Selenium solo para esa categoría"""
+    usadas = []
+
+    class ScraperSinNavegador(WongScraper):
+        def obtener_productos_selenium(self, categoria_path):
+            usadas.append(categoria_path)
+            yield {'nombre': "Desde HTML", 'precio': 1.0, 'url': ""}
+
+    scraper = ScraperSinNavegador()
+    scraper.api = VtexCatalogClient(vtex_server)
+    try:
+        productos = list(scraper.obtener_productos("bebes-y-ninos/alimentos-organicos"))
+        assert productos[0]['nombre'] == "Desde HTML"
+        assert usadas == ["bebes-y-ninos/alimentos-organicos"]
+
+        list(scraper.obtener_productos("higiene-salud-y-belleza/salud"))
+        assert usadas == ["bebes-y-ninos/alimentos-organicos"]
+    finally:
+        scraper.api.cerrar()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])